@@ -0,0 +1,88 @@
+"""Content-addressed blob store for session attachments.
+
+Images are stored once under ``data_dir/blobs/<aa>/<sha256>`` as raw bytes and
+referenced from session transcripts by digest, so identical screenshots are
+deduplicated and transcripts stay small.
+"""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import os
+import re
+import tempfile
+from collections import OrderedDict
+from pathlib import Path
+
+_DIGEST_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+class BlobStore:
+    def __init__(self, root: Path, max_cached: int = 16):
+        self.root = root
+        self.max_cached = max_cached
+        # digest -> base64 text, for images hydrated on consecutive turns
+        self._b64_cache: OrderedDict[str, str] = OrderedDict()
+
+    def path_for(self, digest: str) -> Path:
+        if not _DIGEST_RE.match(digest):
+            raise ValueError(f"Invalid blob digest: {digest!r}")
+        return self.root / digest[:2] / digest
+
+    def exists(self, digest: str) -> bool:
+        return self.path_for(digest).exists()
+
+    def put(self, data: bytes) -> str:
+        """Store ``data`` and return its SHA-256 hex digest. Existing blobs are reused."""
+        digest = hashlib.sha256(data).hexdigest()
+        dest = self.path_for(digest)
+        if dest.exists():
+            return digest
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=dest.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, dest)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+        return digest
+
+    def put_base64(self, b64: str) -> str:
+        """Store base64 ``b64``; raises ``binascii.Error`` if it is not valid base64."""
+        digest = self.put(base64.b64decode(b64, validate=True))
+        self._remember(digest, b64)
+        return digest
+
+    def get(self, digest: str) -> bytes:
+        return self.path_for(digest).read_bytes()
+
+    def get_base64(self, digest: str) -> str:
+        cached = self._b64_cache.get(digest)
+        if cached is not None:
+            self._b64_cache.move_to_end(digest)
+            return cached
+        b64 = base64.b64encode(self.get(digest)).decode()
+        self._remember(digest, b64)
+        return b64
+
+    def _remember(self, digest: str, b64: str) -> None:
+        if self.max_cached <= 0:
+            return
+        self._b64_cache[digest] = b64
+        self._b64_cache.move_to_end(digest)
+        while len(self._b64_cache) > self.max_cached:
+            self._b64_cache.popitem(last=False)
+
+
+_stores: dict[Path, BlobStore] = {}
+
+
+def get_blob_store(root: Path) -> BlobStore:
+    """Return the shared BlobStore for ``root`` (one per directory per process)."""
+    store = _stores.get(root)
+    if store is None:
+        store = _stores[root] = BlobStore(root)
+    return store
@@ -0,0 +1,110 @@
+"""Rolling summarization of messages that fall out of the context window.
+
+When a turn loads only the tail of a session, the older messages are folded
+into ``<id>.summary.json`` in the background. Each pass only summarizes the
+messages added since the previous pass, so later turns send
+``summary + recent tail`` instead of dropping history.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from typing import Any
+
+from rovot.agent.context import Message
+from rovot.agent.sessions import Session, SessionSummary
+from rovot.providers.base import Provider
+
+logger = logging.getLogger(__name__)
+
+# Messages folded into the summary per model call.
+BATCH_MESSAGES = 40
+# Per-message cap when rendering the transcript for the summarizer.
+MAX_MESSAGE_CHARS = 2000
+
+_SUMMARIZE_PROMPT = """\
+You maintain a running summary of a conversation between a user and Rovot, an AI \
+agent with tools. Update the summary with the new messages below. Keep facts, \
+decisions, file paths, results of tool calls (so they need not be repeated) and open \
+tasks. Drop small talk. Reply with the updated summary only, at most {max_words} words."""
+
+# Session path -> in-flight compaction task.
+_inflight: dict[str, asyncio.Task[SessionSummary]] = {}
+
+
+def _render(messages: list[Message]) -> str:
+    lines: list[str] = []
+    for m in messages:
+        content = m.content
+        if len(content) > MAX_MESSAGE_CHARS:
+            content = content[:MAX_MESSAGE_CHARS] + " …[truncated]"
+        if m.role == "assistant" and m.tool_calls:
+            calls = ", ".join(
+                f"{tc.get('name', '?')}({json.dumps(tc.get('arguments', {}), default=str)})"
+                for tc in m.tool_calls
+            )
+            lines.append(f"assistant called: {calls}")
+            if content:
+                lines.append(f"assistant: {content}")
+        elif m.role == "tool":
+            lines.append(f"tool result: {content}")
+        else:
+            lines.append(f"{m.role}: {content}")
+    return "\n".join(lines)
+
+
+async def compact(
+    session: Session, provider: Provider, upto: int, *, max_words: int = 300
+) -> SessionSummary:
+    """Fold messages ``[summary.covered, upto)`` into the session summary."""
+    summary = session.read_summary()
+    while summary.covered < upto:
+        stop = min(upto, summary.covered + BATCH_MESSAGES)
+        batch = session.range(summary.covered, stop)
+        if not batch:
+            break
+        user: dict[str, Any] = {
+            "role": "user",
+            "content": (
+                f"Current summary:\n{summary.text or '(none yet)'}\n\n"
+                f"New messages:\n{_render(batch)}"
+            ),
+        }
+        resp = await provider.chat(
+            [{"role": "system", "content": _SUMMARIZE_PROMPT.format(max_words=max_words)}, user]
+        )
+        text = (resp.content or "").strip()
+        if not text:
+            break
+        summary = SessionSummary(covered=stop, text=text)
+        # Written per batch so an interrupted catch-up resumes where it stopped.
+        session.write_summary(summary)
+    return summary
+
+
+def schedule_compaction(session: Session, provider: Provider, upto: int) -> None:
+    """Start ``compact`` in the background unless one is already running for ``session``."""
+    key = str(session.path)
+    running = _inflight.get(key)
+    if running is not None and not running.done():
+        return
+
+    async def _run() -> SessionSummary:
+        try:
+            return await compact(session, provider, upto)
+        except Exception:
+            logger.warning("Compaction failed for session %s", session.id, exc_info=True)
+            return session.read_summary()
+        finally:
+            _inflight.pop(key, None)
+
+    _inflight[key] = asyncio.get_running_loop().create_task(_run())
+
+
+async def wait_for_compaction(session: Session) -> None:
+    """Wait for ``session``'s background compaction, if any (used by tests and shutdown)."""
+    task = _inflight.get(str(session.path))
+    if task is not None:
+        await task
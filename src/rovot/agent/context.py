@@ -1,16 +1,28 @@
 from __future__ import annotations
 
-from dataclasses import dataclass, field
+import logging
+from dataclasses import dataclass, field, replace
 from pathlib import Path
 from typing import Any
 
+from rovot.agent.blobs import BlobStore
+from rovot.agent.tokens import TokenBudgeter
+
+logger = logging.getLogger(__name__)
+
 
 @dataclass
 class ImageContent:
-    """Base64-encoded image for vision-capable models."""
+    """Base64-encoded image for vision-capable models.
+
+    Images read back from a session transcript only carry their blob ``sha256``;
+    ``ContextBuilder.build`` fills in ``base64_data`` for messages that survive
+    trimming.
+    """
 
-    base64_data: str
+    base64_data: str = ""
     media_type: str = "image/png"  # image/png | image/jpeg | image/webp
+    sha256: str | None = None
 
 
 @dataclass
@@ -58,6 +70,11 @@ with write operations), always explain what you're about to do BEFORE triggering
 """
 
 
+def custom_system_prompt_path() -> Path:
+    """User override for the default system prompt."""
+    return Path.home() / ".rovot" / "system_prompt.txt"
+
+
 def estimate_tokens(messages: list[Message]) -> int:
     """Rough estimate: 1 token ≈ 4 chars."""
     return sum(len(m.content) for m in messages) // 4
@@ -69,14 +86,20 @@ class ContextBuilder:
         system_prompt: str | None = None,
         workspace_dir: Path | str | None = None,
         max_context_messages: int = 40,
+        blobs: BlobStore | None = None,
+        budgeter: TokenBudgeter | None = None,
+        memory_top_k: int = 5,
     ):
         workspace = str(workspace_dir) if workspace_dir else "~/rovot-workspace"
+        self._blobs = blobs
+        self._budgeter = budgeter
+        self._memory_top_k = memory_top_k
         self._system_prompt = system_prompt or _DEFAULT_SYSTEM_PROMPT.format(
             workspace_dir=workspace
         )
         self._max_context_messages = max_context_messages
 
-        custom_prompt_file = Path.home() / ".rovot" / "system_prompt.txt"
+        custom_prompt_file = custom_system_prompt_path()
         if custom_prompt_file.exists():
             try:
                 user_prompt = custom_prompt_file.read_text("utf-8").strip()
@@ -85,28 +108,64 @@ class ContextBuilder:
             except Exception:
                 pass  # fall back to default silently
 
-        # Inject persistent memory files into the system prompt
+    async def recall(self, history: list[Message]) -> str:
+        """Persistent-memory block for the latest user message in ``history``."""
+        if self._memory_top_k <= 0:
+            return ""
+        query = next((m.content for m in reversed(history) if m.role == "user"), "")
         try:
-            from rovot.agent.memory import build_memory_context
+            from rovot.agent.memory import recall_memory
 
-            memory_context = build_memory_context()
-            if memory_context:
-                self._system_prompt = self._system_prompt + memory_context
+            return await recall_memory(query, self._memory_top_k)
         except Exception:
-            pass  # memory directory may not exist yet
+            logger.debug("Memory recall failed", exc_info=True)
+            return ""  # memory directory may not exist yet
 
     def build(
-        self, history: list[Message], tool_definitions: list[dict[str, Any]] | None
+        self,
+        history: list[Message],
+        tool_definitions: list[dict[str, Any]] | None,
+        *,
+        omitted: int = 0,
+        summary: str = "",
+        covered: int | None = None,
+        memory: str = "",
     ) -> Context:
+        """Build the model context from ``history``.
+
+        ``omitted`` is the number of older session messages the caller already
+        left out (e.g. when it loaded only ``Session.tail()``); ``summary`` is a
+        rolling summary of the first ``covered`` of them (default: all), sent in
+        place of the bare omission marker. Omitted messages it does not cover
+        yet, or ones trimmed here, are still marked.
+        ``memory`` is the block returned by ``recall``. With a ``budgeter``, the
+        newest messages that fit its token budget (after the system prompt,
+        memory, summary and tool schemas) are kept.
+        """
         msgs = list(history)
-        trimmed = False
+        trimmed = omitted > 0
+        # Messages between what ``summary`` covers and what is sent.
+        gap = covered is not None and covered < omitted
         if len(msgs) > self._max_context_messages:
             msgs = msgs[-self._max_context_messages :]
-            trimmed = True
-
-        system = self._system_prompt
-        if trimmed:
+            trimmed = gap = True
+        base = self._system_prompt + memory
+        if summary:
+            base += "\n\n[Summary of earlier conversation]\n" + summary
+        if self._budgeter is not None:
+            fitted = self._budgeter.fit(base, tool_definitions, msgs)
+            if len(fitted) < len(msgs):
+                msgs = fitted
+                trimmed = gap = True
+
+        if self._blobs is not None:
+            msgs = [self._hydrate(m) for m in msgs]
+
+        system = base
+        if trimmed and not summary:
             system = "[Earlier conversation omitted]\n\n" + system
+        elif gap and summary:
+            system += "\n\n[Messages after this summary omitted]"
 
         return Context(
             system_prompt=system,
@@ -114,14 +173,32 @@ class ContextBuilder:
             tool_definitions=tool_definitions or [],
         )
 
+    def _hydrate(self, msg: Message) -> Message:
+        """Return ``msg`` with blob-referenced images loaded (cached history is untouched)."""
+        if not any(img.sha256 and not img.base64_data for img in msg.images):
+            return msg
+        images: list[ImageContent] = []
+        for img in msg.images:
+            if img.base64_data or not img.sha256:
+                images.append(img)
+                continue
+            try:
+                data = self._blobs.get_base64(img.sha256)  # type: ignore[union-attr]
+            except (OSError, ValueError) as exc:
+                logger.warning("Dropping image %s from context: %s", img.sha256, exc)
+                continue
+            images.append(replace(img, base64_data=data))
+        return replace(msg, images=images)
+
     @staticmethod
     def to_provider_messages(ctx: Context) -> list[dict[str, Any]]:
         msgs: list[dict[str, Any]] = [{"role": "system", "content": ctx.system_prompt}]
         for m in ctx.messages:
-            if m.images:
+            images = [img for img in m.images if img.base64_data]
+            if images:
                 # Multi-modal content array format (OpenAI vision API)
                 content_parts: list[dict[str, Any]] = [{"type": "text", "text": m.content}]
-                for img in m.images:
+                for img in images:
                     content_parts.append(
                         {
                             "type": "image_url",
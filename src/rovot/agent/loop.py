@@ -1,15 +1,15 @@
 from __future__ import annotations
 
 import asyncio
-from collections.abc import AsyncIterator
+from collections.abc import AsyncIterator, Callable
 from dataclasses import dataclass, field
 from typing import Any
 
 from rovot.agent.context import ContextBuilder, Message
-from rovot.agent.tools.registry import ToolRegistry
-from rovot.policy.approvals import ApprovalRequired
+from rovot.agent.tools.registry import ToolRegistry, tool_progress
+from rovot.policy.approvals import Approval, ApprovalRequired
 from rovot.policy.engine import AuthContext
-from rovot.providers.base import Provider
+from rovot.providers.base import ChatResponse, Provider, ToolCallAssembler
 
 
 @dataclass
@@ -19,6 +19,41 @@ class AgentResponse:
     pending_approval_id: str | None = None
 
 
+def _approval_notifier(
+    notices: asyncio.Queue[dict[str, Any]],
+) -> Callable[[Approval], None]:
+    """``on_approval`` callback that turns approval transitions into stream events."""
+
+    def _notify(approval: Approval) -> None:
+        if approval.status == "pending":
+            notices.put_nowait(
+                {"type": "approval_required", "approval_id": approval.id, "waiting": True}
+            )
+        else:
+            notices.put_nowait(
+                {
+                    "type": "approval_resolved",
+                    "approval_id": approval.id,
+                    "decision": approval.status,
+                }
+            )
+
+    return _notify
+
+
+def _progress_notifier(
+    notices: asyncio.Queue[dict[str, Any]], name: str, step_index: int
+) -> Callable[[dict[str, Any]], None]:
+    """``tool_progress`` callback that turns a tool's incremental output into stream events."""
+
+    def _notify(payload: dict[str, Any]) -> None:
+        notices.put_nowait(
+            {"type": "tool_progress", "name": name, "step_index": step_index, **payload}
+        )
+
+    return _notify
+
+
 class AgentLoop:
     def __init__(
         self,
@@ -26,19 +61,84 @@ class AgentLoop:
         tools: ToolRegistry,
         ctx_builder: ContextBuilder,
         max_iterations: int = 25,
+        max_parallel_tools: int = 4,
     ):
         self._provider = provider
         self._tools = tools
         self._ctx = ctx_builder
         self._max_iterations = max_iterations
+        self._max_parallel_tools = max(1, max_parallel_tools)
+
+    @property
+    def provider(self) -> Provider:
+        return self._provider
+
+    def _batches(self, tool_calls: list[dict[str, Any]]) -> list[list[tuple[int, dict[str, Any]]]]:
+        """Group tool calls into batches that may run concurrently.
+
+        Consecutive read-only calls share a batch; any call that writes or needs
+        approval runs alone, so ordering relative to side effects is preserved.
+        """
+        batches: list[list[tuple[int, dict[str, Any]]]] = []
+        prev_parallel = False
+        for i, tc in enumerate(tool_calls):
+            parallel = self._tools.is_read_only(tc.get("name") or "")
+            if parallel and prev_parallel:
+                batches[-1].append((i, tc))
+            else:
+                batches.append([(i, tc)])
+            prev_parallel = parallel
+        return batches
+
+    async def _invoke(
+        self,
+        sem: asyncio.Semaphore,
+        auth: AuthContext,
+        session_id: str,
+        index: int,
+        tc: dict[str, Any],
+        on_approval: Callable[[Approval], None] | None = None,
+        on_progress: Callable[[dict[str, Any]], None] | None = None,
+    ) -> tuple[int, Any]:
+        """Run one tool call, returning ``(index, result_or_exception)``."""
+        # Each call runs in its own task, so this only affects this call.
+        tool_progress.set(on_progress)
+        async with sem:
+            try:
+                result = await self._tools.invoke(
+                    auth,
+                    session_id,
+                    tc.get("name") or "",
+                    tc.get("arguments") or {},
+                    tool_call_id=tc.get("id") or None,
+                    on_approval=on_approval,
+                )
+            except Exception as exc:
+                return index, exc
+        return index, result
 
     async def run(
-        self, *, auth: AuthContext, session_id: str, history: list[Message]
+        self,
+        *,
+        auth: AuthContext,
+        session_id: str,
+        history: list[Message],
+        omitted: int = 0,
+        summary: str = "",
+        covered: int | None = None,
     ) -> AgentResponse:
         all_tool_calls: list[dict[str, Any]] = []
         msgs = list(history)
+        memory = await self._ctx.recall(msgs)
         for _ in range(self._max_iterations):
-            ctx = self._ctx.build(msgs, self._tools.definitions())
+            ctx = self._ctx.build(
+                msgs,
+                self._tools.definitions(),
+                omitted=omitted,
+                summary=summary,
+                covered=covered,
+                memory=memory,
+            )
             response = await self._provider.chat(
                 messages=ContextBuilder.to_provider_messages(ctx),
                 tools=ctx.tool_definitions or None,
@@ -46,25 +146,25 @@ class AgentLoop:
             if not response.tool_calls:
                 return AgentResponse(reply=response.content, tool_calls=all_tool_calls)
             msgs.append(Message(role="assistant", content=response.content or "", tool_calls=response.tool_calls))
-            for tc in response.tool_calls:
-                all_tool_calls.append(tc)
-                try:
-                    result = await self._tools.invoke(
-                        auth,
-                        session_id,
-                        tc.get("name") or "",
-                        tc.get("arguments") or {},
-                        tool_call_id=tc.get("id") or None,
-                    )
+            sem = asyncio.Semaphore(self._max_parallel_tools)
+            for batch in self._batches(response.tool_calls):
+                outcomes = await asyncio.gather(
+                    *(self._invoke(sem, auth, session_id, i, tc) for i, tc in batch)
+                )
+                # Tool messages must follow the order of the model's tool_calls.
+                for (_, tc), (_, result) in zip(batch, outcomes):
+                    all_tool_calls.append(tc)
+                    if isinstance(result, ApprovalRequired):
+                        return AgentResponse(
+                            reply=str(result),
+                            tool_calls=all_tool_calls,
+                            pending_approval_id=result.approval_id,
+                        )
+                    if isinstance(result, Exception):
+                        raise result
                     msgs.append(
                         Message(role="tool", content=str(result), tool_call_id=tc.get("id"))
                     )
-                except ApprovalRequired as ar:
-                    return AgentResponse(
-                        reply=str(ar),
-                        tool_calls=all_tool_calls,
-                        pending_approval_id=ar.approval_id,
-                    )
         return AgentResponse(
             reply="Reached maximum iterations without a final answer.",
             tool_calls=all_tool_calls,
@@ -76,41 +176,63 @@ class AgentLoop:
         auth: AuthContext,
         session_id: str,
         history: list[Message],
+        omitted: int = 0,
+        summary: str = "",
+        covered: int | None = None,
+        wait_for_approval: bool = False,
     ) -> AsyncIterator[dict[str, Any]]:
-        """Stream agent execution as SSE events using a single model call per turn."""
+        """Stream agent execution as SSE events using a single model call per iteration.
+
+        With ``wait_for_approval``, a tool call that needs approval is parked
+        until the user resolves it (``approval_required`` then ``approval_resolved``
+        events) and the turn continues, instead of ending with a pending approval.
+        """
         all_tool_calls: list[dict[str, Any]] = []
         msgs = list(history)
+        memory = await self._ctx.recall(msgs)
+        notices: asyncio.Queue[dict[str, Any]] = asyncio.Queue()
+        on_approval = _approval_notifier(notices) if wait_for_approval else None
 
         for _ in range(self._max_iterations):
-            ctx = self._ctx.build(msgs, self._tools.definitions())
+            ctx = self._ctx.build(
+                msgs,
+                self._tools.definitions(),
+                omitted=omitted,
+                summary=summary,
+                covered=covered,
+                memory=memory,
+            )
             provider_msgs = ContextBuilder.to_provider_messages(ctx)
             tool_defs = ctx.tool_definitions or None
 
             try:
-                if hasattr(self._provider, "stream") and self._provider.supports_streaming():
-                    # True token-by-token streaming from the provider
+                if hasattr(self._provider, "stream_events") and self._provider.supports_streaming():
+                    # One request per iteration: text deltas are forwarded as they
+                    # arrive and tool calls are assembled from the same stream.
                     full_content = ""
-                    async for chunk in self._provider.stream(
+                    assembler = ToolCallAssembler()
+                    usage: dict[str, int] = {}
+                    async for event in self._provider.stream_events(
                         messages=provider_msgs, tools=tool_defs
                     ):
-                        full_content += chunk
-                        yield {"type": "token", "content": chunk}
-                        await asyncio.sleep(0)
-                    # After streaming, do a non-streaming call only when tool
-                    # use is possible (external providers); InternalProvider
-                    # has supports_tools()=False so we skip the second call.
-                    if tool_defs and self._provider.supports_tools():
+                        if event.type == "text":
+                            full_content += event.text
+                            yield {"type": "token", "content": event.text}
+                            await asyncio.sleep(0)
+                        elif event.type == "tool_call":
+                            assembler.add(event)
+                        elif event.type == "usage":
+                            usage = event.usage
+                    response = ChatResponse(
+                        content=full_content, tool_calls=assembler.tool_calls(), usage=usage
+                    )
+                    if not full_content and not response.tool_calls:
+                        # Server produced an empty stream; retry once without streaming.
                         response = await self._provider.chat(
                             messages=provider_msgs, tools=tool_defs
                         )
-                    else:
-                        if not full_content:
-                            response = await self._provider.chat(
-                                messages=provider_msgs, tools=None
-                            )
-                            full_content = response.content or ""
-                        # Lightweight response object; tool_calls is always []
-                        response = type("_R", (), {"content": full_content, "tool_calls": []})()
+                        if response.content:
+                            yield {"type": "token", "content": response.content}
                 else:
                     # Fallback: non-streaming providers (word-split fake stream)
                     response = await self._provider.chat(
@@ -124,7 +246,11 @@ class AgentLoop:
                             yield {"type": "token", "content": chunk}
                             await asyncio.sleep(0)
             except Exception as exc:
-                yield {"type": "error", "message": str(exc)}
+                error: dict[str, Any] = {"type": "error", "message": str(exc)}
+                retry_after = getattr(exc, "retry_after", None)
+                if retry_after is not None:
+                    error["retry_after"] = retry_after
+                yield error
                 return
 
             if not response.tool_calls:
@@ -138,37 +264,78 @@ class AgentLoop:
 
             # Tool calls: emit events and execute
             msgs.append(Message(role="assistant", content=response.content or "", tool_calls=response.tool_calls))
-            tool_call_index = 0
-            for tc in response.tool_calls:
-                all_tool_calls.append(tc)
-                yield {
-                    "type": "tool_call",
-                    "name": tc.get("name", ""),
-                    "args": tc.get("arguments", {}),
-                }
-                try:
-                    result = await self._tools.invoke(
-                        auth,
-                        session_id,
-                        tc.get("name") or "",
-                        tc.get("arguments") or {},
-                        tool_call_id=tc.get("id") or None,
+            sem = asyncio.Semaphore(self._max_parallel_tools)
+            # The desktop numbers tool steps across the whole turn, not per model call.
+            step_base = len(all_tool_calls)
+            for batch in self._batches(response.tool_calls):
+                for _, tc in batch:
+                    all_tool_calls.append(tc)
+                    yield {
+                        "type": "tool_call",
+                        "name": tc.get("name", ""),
+                        "args": tc.get("arguments", {}),
+                    }
+                tasks = [
+                    asyncio.ensure_future(
+                        self._invoke(
+                            sem,
+                            auth,
+                            session_id,
+                            i,
+                            tc,
+                            on_approval,
+                            _progress_notifier(notices, tc.get("name", ""), step_base + i),
+                        )
                     )
-                    summary = str(result)[:200]
+                    for i, tc in batch
+                ]
+                results: dict[int, Any] = {}
+                running = set(tasks)
+                notice: asyncio.Future[dict[str, Any]] | None = None
+                try:
+                    while running or not notices.empty() or (notice and notice.done()):
+                        if notice is None:
+                            notice = asyncio.ensure_future(notices.get())
+                        done, _ = await asyncio.wait(
+                            {*running, notice}, return_when=asyncio.FIRST_COMPLETED
+                        )
+                        if notice in done:
+                            yield notice.result()
+                            notice = None
+                        for task in done & running:
+                            running.discard(task)
+                            index, result = task.result()
+                            results[index] = result
+                            if not isinstance(result, Exception):
+                                tc = response.tool_calls[index]
+                                yield {
+                                    "type": "tool_result",
+                                    "name": tc.get("name", ""),
+                                    "summary": str(result)[:200],
+                                    "step_index": step_base + index,
+                                }
+                finally:
+                    for task in tasks:
+                        task.cancel()
+                    if notice is not None:
+                        notice.cancel()
+
+                for i, tc in batch:
+                    result = results[i]
+                    if isinstance(result, ApprovalRequired):
+                        yield {"type": "approval_required", "approval_id": result.approval_id}
+                        yield {
+                            "type": "done",
+                            "session_id": session_id,
+                            "pending_approval_id": result.approval_id,
+                            "tool_calls": all_tool_calls,
+                        }
+                        return
+                    if isinstance(result, Exception):
+                        raise result
                     msgs.append(
                         Message(role="tool", content=str(result), tool_call_id=tc.get("id"))
                     )
-                    yield {"type": "tool_result", "name": tc.get("name", ""), "summary": summary, "step_index": tool_call_index}
-                    tool_call_index += 1
-                except ApprovalRequired as ar:
-                    yield {"type": "approval_required", "approval_id": ar.approval_id}
-                    yield {
-                        "type": "done",
-                        "session_id": session_id,
-                        "pending_approval_id": ar.approval_id,
-                        "tool_calls": all_tool_calls,
-                    }
-                    return
             # Continue loop with updated history
 
         yield {
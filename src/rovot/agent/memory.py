@@ -1,14 +1,28 @@
 """Local workspace memory — persistent markdown files the agent reads each session.
 
 Inspired by Claude Managed Agents' memory stores, but running entirely locally.
-Files live in ~/.rovot/memory/ and are injected into the system prompt context.
+Files live in ~/.rovot/memory/. They are indexed by ``MemoryIndex`` and only the
+chunks relevant to the current user message are injected into the system prompt.
 """
 from __future__ import annotations
 
 from pathlib import Path
 
+from rovot.agent.memory_index import MemoryHit, MemoryIndex
+
 MEMORY_DIR = Path.home() / ".rovot" / "memory"
 MAX_MEMORY_TOKENS = 2000  # rough limit to avoid bloating context
+MAX_LISTED_FILES = 50
+
+_index: MemoryIndex | None = None
+
+
+def get_memory_index() -> MemoryIndex:
+    """Shared index over ``MEMORY_DIR``."""
+    global _index
+    if _index is None or _index.root != MEMORY_DIR:
+        _index = MemoryIndex(MEMORY_DIR)
+    return _index
 
 
 def ensure_memory_dir() -> Path:
@@ -17,19 +31,31 @@ def ensure_memory_dir() -> Path:
     return MEMORY_DIR
 
 
-def list_memories() -> list[dict]:
-    """List all memory files with metadata."""
+def list_memories(prefix: str = "", offset: int = 0, limit: int | None = None) -> dict:
+    """List memory files from the index manifest, optionally filtered and paged.
+
+    Only files changed since the last call are read; the rest come from the
+    manifest's cached size, mtime, preview and hash.
+    """
     ensure_memory_dir()
-    memories = []
-    for f in sorted(MEMORY_DIR.glob("**/*.md")):
-        memories.append(
+    index = get_memory_index()
+    index.refresh()
+    files = index.files(prefix)
+    end = len(files) if limit is None else offset + limit
+    return {
+        "memories": [
             {
-                "path": str(f.relative_to(MEMORY_DIR)),
-                "size_bytes": f.stat().st_size,
-                "content_preview": f.read_text("utf-8")[:200],
+                "path": f.path,
+                "size_bytes": f.size_bytes,
+                "mtime": f.mtime_ns / 1e9,
+                "sha256": f.sha256,
+                "content_preview": f.preview,
             }
-        )
-    return memories
+            for f in files[offset:end]
+        ],
+        "total": len(files),
+        "next_offset": end if end < len(files) else None,
+    }
 
 
 def read_memory(path: str) -> str:
@@ -47,6 +73,7 @@ def write_memory(path: str, content: str) -> None:
         raise ValueError("Path escapes memory directory")
     p.parent.mkdir(parents=True, exist_ok=True)
     p.write_text(content, "utf-8")
+    get_memory_index().update(str(p.relative_to(MEMORY_DIR)))
 
 
 def delete_memory(path: str) -> None:
@@ -56,36 +83,42 @@ def delete_memory(path: str) -> None:
         raise ValueError("Path escapes memory directory")
     if p.exists():
         p.unlink()
+        get_memory_index().remove(str(p.relative_to(MEMORY_DIR)))
 
 
-def build_memory_context() -> str:
-    """Load all memory files and return them as a context block.
-
-    Injected into the agent's system prompt when memory files exist.
-    Truncated to MAX_MEMORY_TOKENS worth of characters.
-    """
-    ensure_memory_dir()
-    files = sorted(MEMORY_DIR.glob("**/*.md"))
-    if not files:
+def format_memory_context(hits: list[MemoryHit], paths: list[str]) -> str:
+    """Render retrieved chunks as a system-prompt block, within MAX_MEMORY_TOKENS."""
+    if not paths:
         return ""
-
+    listed = ", ".join(paths[:MAX_LISTED_FILES])
+    if len(paths) > MAX_LISTED_FILES:
+        listed += f", … ({len(paths) - MAX_LISTED_FILES} more)"
     parts = [
         "\n\n## Persistent Memory\n",
-        "The following information persists across sessions:\n",
+        f"Memory files (read with memory.read): {listed}\n",
     ]
+    if hits:
+        parts.append("Excerpts relevant to the current request:\n")
     total_chars = 0
     char_budget = MAX_MEMORY_TOKENS * 4  # ~4 chars per token
+    for hit in hits:
+        title = f"{hit.path} › {hit.heading}" if hit.heading else hit.path
+        chunk = f"### {title}\n{hit.text}\n"
+        if total_chars + len(chunk) > char_budget:
+            break
+        parts.append(chunk)
+        total_chars += len(chunk)
+    return "".join(parts)
 
-    for f in files:
-        try:
-            text = f.read_text("utf-8")
-            header = f"### {f.relative_to(MEMORY_DIR)}\n"
-            chunk = header + text + "\n"
-            if total_chars + len(chunk) > char_budget:
-                break
-            parts.append(chunk)
-            total_chars += len(chunk)
-        except Exception:
-            continue
 
-    return "".join(parts)
+async def recall_memory(query: str, k: int = 5) -> str:
+    """Memory block for ``query``: the file list plus its top ``k`` chunks.
+
+    Ranks by BM25, blended with embeddings when the index has an embedder.
+    """
+    ensure_memory_dir()
+    index = get_memory_index()
+    if not query.strip():
+        index.refresh()
+        return format_memory_context([], index.paths())
+    return format_memory_context(await index.search_async(query, k), index.paths())
@@ -0,0 +1,475 @@
+"""Retrieval index over the persistent memory files.
+
+Memory files are split into heading/paragraph chunks and indexed with BM25.
+The inverted index is persisted next to the files (``.index.json``) together
+with a manifest of each file's size, mtime, preview and content hash, so only
+new or changed files are re-read and listings never open the files.
+``rovot.agent.memory`` keeps it current on every write and delete; those
+single-file changes are appended to ``.index.log`` and folded back into
+``.index.json`` once the log grows as large as the index.
+
+With an ``Embedder`` (e.g. a built-in embedding model loaded alongside chat),
+chunks are also embedded lazily and ranking blends BM25 with cosine
+similarity.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Protocol
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILENAME = ".index.json"
+LOG_FILENAME = ".index.log"
+_INDEX_VERSION = 2
+
+# Target chunk size; paragraphs are packed up to this many characters.
+CHUNK_CHARS = 800
+# BM25 parameters.
+K1 = 1.5
+B = 0.75
+# Weight of the embedding score when an embedder is available.
+EMBEDDING_WEIGHT = 0.5
+PREVIEW_CHARS = 200
+# Log entries always allowed before compaction; past this the log may grow to
+# the number of indexed files, keeping the rewrites amortized O(1) per write.
+COMPACT_MIN_ENTRIES = 32
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_HEADING_RE = re.compile(r"^#{1,6}\s+(.*)$")
+_STOPWORDS = frozenset(
+    "a an and are as at be but by do for from has have how i if in is it its me my "
+    "no not of on or our so that the their them then there these they this to was "
+    "we were what when where which who why will with you your".split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in _STOPWORDS]
+
+
+def chunk_markdown(text: str, max_chars: int = CHUNK_CHARS) -> list[tuple[str, str]]:
+    """Split ``text`` into ``(heading, body)`` chunks of roughly ``max_chars``."""
+    chunks: list[tuple[str, str]] = []
+    heading = ""
+    parts: list[str] = []
+    size = 0
+
+    def flush() -> None:
+        nonlocal parts, size
+        body = "\n\n".join(parts).strip()
+        if body:
+            chunks.append((heading, body))
+        parts, size = [], 0
+
+    for para in re.split(r"\n\s*\n", text):
+        para = para.strip()
+        if not para:
+            continue
+        first, _, rest = para.partition("\n")
+        match = _HEADING_RE.match(first)
+        if match:
+            flush()
+            heading = match.group(1).strip()
+            para = rest.strip()
+            if not para:
+                continue
+        while len(para) > max_chars:
+            flush()
+            cut = para.rfind(" ", 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            parts, size = [para[:cut]], cut
+            flush()
+            para = para[cut:].strip()
+        if size and size + len(para) > max_chars:
+            flush()
+        parts.append(para)
+        size += len(para)
+    flush()
+    return chunks
+
+
+class Embedder(Protocol):
+    @property
+    def name(self) -> str:
+        """Identifies the embedding model; stored vectors are keyed on it."""
+        ...
+
+    async def embed(self, texts: list[str]) -> list[list[float]] | None:
+        """Vectors for ``texts``, or None when embeddings are unavailable."""
+        ...
+
+
+class InternalEmbedder:
+    """Embeds with the built-in embedding model (``load_embedding_model``)."""
+
+    @property
+    def name(self) -> str:
+        from rovot.internal_model import get_internal_provider
+
+        return f"llama:{get_internal_provider().embedding_model_name() or '-'}"
+
+    async def embed(self, texts: list[str]) -> list[list[float]] | None:
+        from rovot.internal_model import get_internal_provider
+
+        return await get_internal_provider().embed(texts)
+
+
+@dataclass
+class MemoryFile:
+    """Manifest entry for one memory file."""
+
+    path: str
+    size_bytes: int
+    mtime_ns: int
+    preview: str
+    sha256: str
+
+
+@dataclass
+class MemoryHit:
+    path: str
+    heading: str
+    text: str
+    score: float
+
+
+@dataclass
+class _Chunk:
+    path: str
+    heading: str
+    text: str
+    terms: dict[str, int]
+    length: int
+    vector: list[float] | None = None
+
+
+def _cosine(a: list[float], b: list[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    na = math.sqrt(sum(x * x for x in a))
+    nb = math.sqrt(sum(y * y for y in b))
+    return dot / (na * nb) if na and nb else 0.0
+
+
+class MemoryIndex:
+    def __init__(self, root: Path, embedder: Embedder | None = None):
+        self.root = root
+        self.index_path = root / INDEX_FILENAME
+        self.log_path = root / LOG_FILENAME
+        self.embedder = embedder
+        # path -> manifest entry of the indexed version
+        self._files: dict[str, MemoryFile] = {}
+        self._chunks: dict[str, list[_Chunk]] = {}
+        # term -> {(path, chunk number): term frequency}
+        self._postings: dict[str, dict[tuple[str, int], int]] = {}
+        self._total_length = 0
+        self._embedder_name = ""
+        self._log_entries = 0
+        self._loaded = False
+
+    # ── persistence ───────────────────────────────────────────────────────
+
+    def _load(self) -> None:
+        self._loaded = True
+        try:
+            raw = json.loads(self.index_path.read_text("utf-8"))
+        except OSError:
+            raw = {"version": _INDEX_VERSION}
+        except ValueError:
+            return
+        if raw.get("version") != _INDEX_VERSION:
+            return
+        self._embedder_name = raw.get("embedder", "")
+        for path, entry in raw.get("files", {}).items():
+            self._add(*self._from_entry(path, entry))
+        self._replay_log()
+
+    def _replay_log(self) -> None:
+        try:
+            lines = self.log_path.read_text("utf-8").splitlines()
+        except OSError:
+            return
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # torn last line from an interrupted append
+            self._log_entries += 1
+            self._remove(record["path"])
+            if "file" in record:
+                self._add(*self._from_entry(record["path"], record["file"]))
+
+    @staticmethod
+    def _from_entry(path: str, entry: dict[str, Any]) -> tuple[MemoryFile, list[_Chunk]]:
+        meta = MemoryFile(
+            path=path,
+            size_bytes=entry["size"],
+            mtime_ns=entry["mtime_ns"],
+            preview=entry["preview"],
+            sha256=entry["sha256"],
+        )
+        chunks = [
+            _Chunk(
+                path=path,
+                heading=c["heading"],
+                text=c["text"],
+                terms=c["terms"],
+                length=c["length"],
+                vector=c.get("vector"),
+            )
+            for c in entry["chunks"]
+        ]
+        return meta, chunks
+
+    def _entry(self, path: str) -> dict[str, Any]:
+        meta = self._files[path]
+        return {
+            "mtime_ns": meta.mtime_ns,
+            "size": meta.size_bytes,
+            "preview": meta.preview,
+            "sha256": meta.sha256,
+            "chunks": [
+                {
+                    "heading": c.heading,
+                    "text": c.text,
+                    "terms": c.terms,
+                    "length": c.length,
+                    **({"vector": c.vector} if c.vector is not None else {}),
+                }
+                for c in self._chunks[path]
+            ],
+        }
+
+    def _save(self) -> None:
+        """Rewrite ``.index.json`` with the whole index and clear the log."""
+        data = {
+            "version": _INDEX_VERSION,
+            "embedder": self._embedder_name,
+            "files": {path: self._entry(path) for path in self._chunks},
+        }
+        try:
+            self.root.mkdir(parents=True, exist_ok=True)
+            tmp = self.index_path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(data, ensure_ascii=False), "utf-8")
+            os.replace(tmp, self.index_path)
+            self.log_path.unlink(missing_ok=True)
+            self._log_entries = 0
+        except OSError:
+            logger.warning("Could not save memory index to %s", self.index_path, exc_info=True)
+
+    def _save_file(self, path: str) -> None:
+        """Persist the change to one file by appending it to the log."""
+        if self._log_entries >= max(COMPACT_MIN_ENTRIES, len(self._files)):
+            self._save()
+            return
+        record: dict[str, Any] = {"path": path}
+        if path in self._files:
+            record["file"] = self._entry(path)
+        try:
+            self.root.mkdir(parents=True, exist_ok=True)
+            with self.log_path.open("a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._log_entries += 1
+        except OSError:
+            logger.warning("Could not append to memory index log %s", self.log_path, exc_info=True)
+
+    def _ensure_loaded(self) -> None:
+        if not self._loaded:
+            self._load()
+
+    # ── incremental maintenance ───────────────────────────────────────────
+
+    def _add(self, meta: MemoryFile, chunks: list[_Chunk]) -> None:
+        path = meta.path
+        self._files[path] = meta
+        self._chunks[path] = chunks
+        for i, chunk in enumerate(chunks):
+            self._total_length += chunk.length
+            for term, tf in chunk.terms.items():
+                self._postings.setdefault(term, {})[(path, i)] = tf
+
+    def _remove(self, path: str) -> bool:
+        chunks = self._chunks.pop(path, None)
+        self._files.pop(path, None)
+        if chunks is None:
+            return False
+        for i, chunk in enumerate(chunks):
+            self._total_length -= chunk.length
+            for term in chunk.terms:
+                postings = self._postings.get(term)
+                if postings is not None:
+                    postings.pop((path, i), None)
+                    if not postings:
+                        del self._postings[term]
+        return True
+
+    def _index_file(self, path: str, force: bool = False) -> bool:
+        """(Re)index ``path`` if it changed since it was last indexed."""
+        file = self.root / path
+        try:
+            st = file.stat()
+            known = self._files.get(path)
+            stamp = (st.st_mtime_ns, st.st_size)
+            if not force and known and (known.mtime_ns, known.size_bytes) == stamp:
+                return False
+            data = file.read_bytes()
+            text = data.decode("utf-8")
+        except (OSError, UnicodeDecodeError):
+            return self._remove(path)
+        self._remove(path)
+        meta = MemoryFile(
+            path=path,
+            size_bytes=st.st_size,
+            mtime_ns=st.st_mtime_ns,
+            preview=text[:PREVIEW_CHARS],
+            sha256=hashlib.sha256(data).hexdigest(),
+        )
+        chunks = []
+        for heading, body in chunk_markdown(text):
+            tokens = tokenize(f"{path} {heading} {body}")
+            chunks.append(
+                _Chunk(
+                    path=path,
+                    heading=heading,
+                    text=body,
+                    terms=dict(Counter(tokens)),
+                    length=len(tokens),
+                )
+            )
+        self._add(meta, chunks)
+        return True
+
+    def update(self, path: str) -> None:
+        """Re-index one memory file after it was written."""
+        self._ensure_loaded()
+        if self._index_file(path, force=True):
+            self._save_file(path)
+
+    def remove(self, path: str) -> None:
+        """Drop one memory file from the index after it was deleted."""
+        self._ensure_loaded()
+        if self._remove(path):
+            self._save_file(path)
+
+    def refresh(self) -> int:
+        """Pick up files added, edited or deleted outside ``rovot.agent.memory``.
+
+        Returns how many files were re-indexed or dropped.
+        """
+        self._ensure_loaded()
+        on_disk = (
+            {str(f.relative_to(self.root)) for f in self.root.glob("**/*.md")}
+            if self.root.is_dir()
+            else set()
+        )
+        changed = sum(self._remove(path) for path in set(self._files) - on_disk)
+        changed += sum(self._index_file(path) for path in sorted(on_disk))
+        if changed:
+            self._save()
+        return changed
+
+    def paths(self) -> list[str]:
+        self._ensure_loaded()
+        return sorted(self._files)
+
+    def files(self, prefix: str = "") -> list[MemoryFile]:
+        """Manifest entries whose path starts with ``prefix``, sorted by path."""
+        self._ensure_loaded()
+        return [self._files[p] for p in sorted(self._files) if p.startswith(prefix)]
+
+    # ── retrieval ─────────────────────────────────────────────────────────
+
+    def _bm25(self, query_terms: list[str]) -> dict[tuple[str, int], float]:
+        n = sum(len(c) for c in self._chunks.values())
+        if not n:
+            return {}
+        avg_len = self._total_length / n or 1.0
+        scores: dict[tuple[str, int], float] = {}
+        for term in set(query_terms):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for key, tf in postings.items():
+                length = self._chunks[key[0]][key[1]].length
+                norm = tf * (K1 + 1) / (tf + K1 * (1 - B + B * length / avg_len))
+                scores[key] = scores.get(key, 0.0) + idf * norm
+        return scores
+
+    def search(self, query: str, k: int = 5) -> list[MemoryHit]:
+        """Top ``k`` chunks for ``query`` by BM25."""
+        self.refresh()
+        scores = self._bm25(tokenize(query))
+        return self._hits(scores, k)
+
+    async def search_async(self, query: str, k: int = 5) -> list[MemoryHit]:
+        """Like ``search``, blending in embedding similarity when available."""
+        self.refresh()
+        scores = self._bm25(tokenize(query))
+        if self.embedder is not None and self._chunks:
+            try:
+                similarity = await self._similarity(query)
+            except Exception:
+                logger.warning("Memory embedding failed; using BM25 only", exc_info=True)
+                similarity = None
+            if similarity:
+                top = max(scores.values(), default=0.0) or 1.0
+                scores = {
+                    key: (1 - EMBEDDING_WEIGHT) * scores.get(key, 0.0) / top
+                    + EMBEDDING_WEIGHT * max(sim, 0.0)
+                    for key, sim in similarity.items()
+                }
+        return self._hits(scores, k)
+
+    async def _similarity(self, query: str) -> dict[tuple[str, int], float] | None:
+        embedder = self.embedder
+        assert embedder is not None
+        if self._embedder_name != embedder.name:
+            for chunks in self._chunks.values():
+                for chunk in chunks:
+                    chunk.vector = None
+            self._embedder_name = embedder.name
+        missing = [c for chunks in self._chunks.values() for c in chunks if c.vector is None]
+        if missing:
+            vectors = await embedder.embed([f"{c.heading}\n{c.text}" for c in missing])
+            if vectors is None:
+                return None
+            for chunk, vector in zip(missing, vectors):
+                chunk.vector = list(vector)
+            self._save()
+        query_vec = await embedder.embed([query])
+        if not query_vec:
+            return None
+        return {
+            (path, i): _cosine(query_vec[0], c.vector or [])
+            for path, chunks in self._chunks.items()
+            for i, c in enumerate(chunks)
+        }
+
+    def _hits(self, scores: dict[tuple[str, int], float], k: int) -> list[MemoryHit]:
+        ranked = sorted(
+            ((s, key) for key, s in scores.items() if s > 0), key=lambda item: (-item[0], item[1])
+        )
+        hits = []
+        for score, (path, i) in ranked[:k]:
+            chunk = self._chunks[path][i]
+            hits.append(MemoryHit(path=path, heading=chunk.heading, text=chunk.text, score=score))
+        return hits
+
+    def stats(self) -> dict[str, Any]:
+        self._ensure_loaded()
+        return {
+            "files": len(self._files),
+            "chunks": sum(len(c) for c in self._chunks.values()),
+            "terms": len(self._postings),
+            "embedder": self._embedder_name or None,
+        }
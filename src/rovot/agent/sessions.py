@@ -1,69 +1,358 @@
+"""Append-only JSONL session transcripts.
+
+Each session is stored as ``<id>.jsonl`` with a binary sidecar ``<id>.idx``
+holding one fixed-size record per message (byte offset into the JSONL file and
+content length). The index lets callers count messages and read the last N
+without parsing the whole transcript; decoded histories are additionally kept
+in a small in-memory LRU shared by every ``SessionStore``.
+
+When a ``BlobStore`` is configured, images are written to it and transcripts
+only keep ``{"sha256", "media_type"}`` references.
+
+A rolling summary of the oldest messages lives in ``<id>.summary.json``; see
+``rovot.agent.compaction``.
+"""
+
 from __future__ import annotations
 
 import json
+import os
+import struct
 import time
 import uuid
-from dataclasses import dataclass
+from collections import OrderedDict
+from dataclasses import dataclass, field, replace
 from pathlib import Path
 
+from rovot.agent.blobs import BlobStore
 from rovot.agent.context import ImageContent, Message
 
+# (byte offset of the line in the JSONL file, len(message.content))
+_IDX_RECORD = struct.Struct("<QQ")
+
+
+def _externalize(msg: Message, blobs: BlobStore | None) -> Message:
+    """Move inline image data into ``blobs``, returning a reference-only copy."""
+    if blobs is None or not any(img.base64_data for img in msg.images):
+        return msg
+    images = [
+        ImageContent(
+            media_type=img.media_type,
+            sha256=blobs.put_base64(img.base64_data) if img.base64_data else img.sha256,
+        )
+        for img in msg.images
+    ]
+    return replace(msg, images=images)
+
+
+def _encode_image(img: ImageContent) -> dict:
+    if img.sha256 and not img.base64_data:
+        return {"sha256": img.sha256, "media_type": img.media_type}
+    return {"base64_data": img.base64_data, "media_type": img.media_type}
+
+
+def _encode(msg: Message) -> bytes:
+    rec = {
+        "ts": int(time.time() * 1000),
+        "role": msg.role,
+        "content": msg.content,
+        "images": [_encode_image(img) for img in msg.images],
+        "tool_call_id": msg.tool_call_id,
+        "tool_calls": msg.tool_calls,
+    }
+    return (json.dumps(rec, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def _decode(line: bytes) -> Message:
+    rec = json.loads(line)
+    images = [
+        ImageContent(
+            base64_data=img.get("base64_data", ""),
+            media_type=img.get("media_type", "image/png"),
+            sha256=img.get("sha256"),
+        )
+        for img in rec.get("images") or []
+    ]
+    return Message(
+        role=rec["role"],
+        content=rec["content"],
+        images=images,
+        tool_call_id=rec.get("tool_call_id"),
+        tool_calls=rec.get("tool_calls") or [],
+    )
+
+
+@dataclass
+class _CachedHistory:
+    messages: list[Message]
+    size: int  # JSONL size the cached list corresponds to
+
+
+class SessionCache:
+    """LRU of decoded session histories keyed by transcript path."""
+
+    def __init__(self, max_sessions: int = 32):
+        self.max_sessions = max_sessions
+        self._entries: OrderedDict[str, _CachedHistory] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path: Path, size: int) -> list[Message] | None:
+        key = str(path)
+        entry = self._entries.get(key)
+        if entry is None or entry.size != size:
+            # Missing, or the file changed behind our back.
+            self._entries.pop(key, None)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry.messages
+
+    def put(self, path: Path, messages: list[Message], size: int) -> None:
+        key = str(path)
+        self._entries[key] = _CachedHistory(messages=messages, size=size)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_sessions:
+            self._entries.popitem(last=False)
+
+    def extend(self, path: Path, msg: Message, old_size: int, new_size: int) -> None:
+        """Append to a cached history in place if it is still current."""
+        key = str(path)
+        entry = self._entries.get(key)
+        if entry is None:
+            if old_size == 0:
+                # Brand-new transcript: seed the cache so the next read is free.
+                self.put(path, [msg], new_size)
+            return
+        if entry.size != old_size:
+            del self._entries[key]
+            return
+        entry.messages.append(msg)
+        entry.size = new_size
+
+    def invalidate(self, path: Path) -> None:
+        self._entries.pop(str(path), None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+_default_cache = SessionCache()
+
+
+@dataclass
+class SessionSummary:
+    """Summary of the first ``covered`` messages of a session."""
+
+    covered: int = 0
+    text: str = ""
+
 
 @dataclass
 class Session:
     id: str
     path: Path
+    cache: SessionCache | None = field(default=None, repr=False, compare=False)
+    blobs: BlobStore | None = field(default=None, repr=False, compare=False)
+
+    @property
+    def index_path(self) -> Path:
+        return self.path.with_suffix(".idx")
+
+    @property
+    def summary_path(self) -> Path:
+        return self.path.with_suffix(".summary.json")
+
+    def read_summary(self) -> SessionSummary:
+        try:
+            raw = json.loads(self.summary_path.read_text("utf-8"))
+            return SessionSummary(covered=int(raw["covered"]), text=str(raw["text"]))
+        except (OSError, ValueError, KeyError, TypeError):
+            return SessionSummary()
+
+    def write_summary(self, summary: SessionSummary) -> None:
+        tmp = self.summary_path.with_suffix(".tmp")
+        data = {"covered": summary.covered, "text": summary.text, "ts": int(time.time() * 1000)}
+        tmp.write_text(json.dumps(data, ensure_ascii=False), "utf-8")
+        os.replace(tmp, self.summary_path)
+
+    def _size(self) -> int:
+        try:
+            return self.path.stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    # ── Writing ───────────────────────────────────────────────────────────
 
     def append(self, msg: Message) -> None:
         self.path.parent.mkdir(parents=True, exist_ok=True)
-        rec = {
-            "ts": int(time.time() * 1000),
-            "role": msg.role,
-            "content": msg.content,
-            "images": [
-                {"base64_data": img.base64_data, "media_type": img.media_type}
-                for img in msg.images
-            ],
-            "tool_call_id": msg.tool_call_id,
-            "tool_calls": msg.tool_calls,
-        }
-        with self.path.open("a", encoding="utf-8") as f:
-            f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+        # Make sure legacy transcripts get an index before we extend it.
+        self._ensure_index()
+        msg = _externalize(msg, self.blobs)
+        data = _encode(msg)
+        with self.path.open("ab") as f:
+            offset = f.tell()
+            f.write(data)
+        with self.index_path.open("ab") as f:
+            f.write(_IDX_RECORD.pack(offset, len(msg.content)))
+        if self.cache is not None:
+            self.cache.extend(self.path, msg, offset, offset + len(data))
+
+    # ── Index ─────────────────────────────────────────────────────────────
+
+    def _rebuild_index(self) -> None:
+        records: list[tuple[int, int]] = []
+        messages: list[Message] = []
+        offset = 0
+        if self.path.exists():
+            with self.path.open("rb") as f:
+                for line in f:
+                    if line.strip():
+                        msg = _decode(line)
+                        messages.append(msg)
+                        records.append((offset, len(msg.content)))
+                    offset += len(line)
+        if records or self.index_path.exists():
+            self.index_path.write_bytes(b"".join(_IDX_RECORD.pack(*r) for r in records))
+        if self.cache is not None and messages:
+            self.cache.put(self.path, messages, offset)
+
+    def _index_valid(self, size: int, idx_size: int) -> bool:
+        if idx_size % _IDX_RECORD.size:
+            return False
+        if idx_size == 0:
+            return size == 0
+        with self.index_path.open("rb") as f:
+            f.seek(idx_size - _IDX_RECORD.size)
+            last_offset, _ = _IDX_RECORD.unpack(f.read(_IDX_RECORD.size))
+        if last_offset >= size:
+            return False
+        # The last indexed line must end exactly at EOF.
+        with self.path.open("rb") as f:
+            f.seek(last_offset)
+            line = f.readline()
+        return last_offset + len(line) == size and line.endswith(b"\n")
+
+    def _ensure_index(self) -> None:
+        """Validate the sidecar index, rebuilding it from the transcript if stale."""
+        try:
+            idx_size = self.index_path.stat().st_size
+        except FileNotFoundError:
+            idx_size = -1
+        if idx_size < 0 or not self._index_valid(self._size(), idx_size):
+            self._rebuild_index()
+
+    def _index_count(self) -> int:
+        self._ensure_index()
+        try:
+            return self.index_path.stat().st_size // _IDX_RECORD.size
+        except FileNotFoundError:
+            return 0
+
+    def _index_records(self, start: int, stop: int | None) -> list[tuple[int, int]]:
+        """Read index records ``[start:stop]`` by seeking into the sidecar."""
+        window = range(self._index_count())[start:stop]
+        if not window:
+            return []
+        with self.index_path.open("rb") as f:
+            f.seek(window.start * _IDX_RECORD.size)
+            raw = f.read(len(window) * _IDX_RECORD.size)
+        return list(_IDX_RECORD.iter_unpack(raw))
+
+    def _read_at(self, offsets: list[int]) -> list[Message]:
+        out: list[Message] = []
+        if not offsets:
+            return out
+        with self.path.open("rb") as f:
+            for off in offsets:
+                f.seek(off)
+                out.append(_decode(f.readline()))
+        return out
+
+    # ── Reading ───────────────────────────────────────────────────────────
+
+    def _cached(self) -> list[Message] | None:
+        if self.cache is None:
+            return None
+        return self.cache.get(self.path, self._size())
 
     def read_all(self) -> list[Message]:
+        cached = self._cached()
+        if cached is not None:
+            return list(cached)
         if not self.path.exists():
             return []
+        size = self._size()
         out: list[Message] = []
-        for line in self.path.read_text("utf-8").splitlines():
-            if not line.strip():
-                continue
-            rec = json.loads(line)
-            images = [
-                ImageContent(
-                    base64_data=img["base64_data"],
-                    media_type=img.get("media_type", "image/png"),
-                )
-                for img in rec.get("images") or []
-            ]
-            out.append(
-                Message(
-                    role=rec["role"],
-                    content=rec["content"],
-                    images=images,
-                    tool_call_id=rec.get("tool_call_id"),
-                    tool_calls=rec.get("tool_calls") or [],
-                )
-            )
-        return out
+        with self.path.open("rb") as f:
+            for line in f:
+                if line.strip():
+                    out.append(_decode(line))
+        if self.cache is not None:
+            self.cache.put(self.path, out, size)
+        return list(out)
+
+    def count(self) -> int:
+        cached = self._cached()
+        if cached is not None:
+            return len(cached)
+        if not self.path.exists():
+            return 0
+        return self._index_count()
+
+    def range(self, start: int, stop: int | None = None) -> list[Message]:
+        """Return messages ``[start:stop]`` (slice semantics, negatives allowed)."""
+        cached = self._cached()
+        if cached is not None:
+            return cached[start:stop]
+        if not self.path.exists():
+            return []
+        return self._read_at([off for off, _ in self._index_records(start, stop)])
+
+    def tail(self, n: int) -> list[Message]:
+        """Return the last ``n`` messages, seeking from the index instead of parsing."""
+        if n <= 0:
+            return []
+        return self.range(-n)
+
+    def content_chars(self) -> int:
+        """Total characters of message content, read from the index."""
+        cached = self._cached()
+        if cached is not None:
+            return sum(len(m.content) for m in cached)
+        if not self.path.exists():
+            return 0
+        return sum(length for _, length in self._index_records(0, None))
 
 
 class SessionStore:
-    def __init__(self, root: Path):
+    def __init__(
+        self,
+        root: Path,
+        cache: SessionCache | None = None,
+        blobs: BlobStore | None = None,
+    ):
         self._root = root
+        self._cache = cache if cache is not None else _default_cache
+        self._blobs = blobs
 
     def create(self) -> Session:
-        sid = str(uuid.uuid4())
-        return Session(id=sid, path=self._root / f"{sid}.jsonl")
+        return self.get(str(uuid.uuid4()))
 
     def get(self, session_id: str) -> Session:
-        return Session(id=session_id, path=self._root / f"{session_id}.jsonl")
+        return Session(
+            id=session_id,
+            path=self._root / f"{session_id}.jsonl",
+            cache=self._cache,
+            blobs=self._blobs,
+        )
+
+    def tail(self, session_id: str, n: int) -> list[Message]:
+        return self.get(session_id).tail(n)
+
+    def count(self, session_id: str) -> int:
+        return self.get(session_id).count()
+
+    def range(self, session_id: str, start: int, stop: int | None = None) -> list[Message]:
+        return self.get(session_id).range(start, stop)
@@ -0,0 +1,188 @@
+"""Token counting and context budgeting.
+
+``TokenBudgeter`` counts the system prompt, tool schemas and messages with the
+active model's tokenizer (falling back to a character heuristic) and keeps the
+newest messages that fit. Per-message counts are memoized, so each turn only
+tokenizes messages it has not seen before.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import TYPE_CHECKING, Any, Protocol
+
+if TYPE_CHECKING:
+    from rovot.agent.context import Message
+
+# Chat-template framing per message (role markers, separators).
+MESSAGE_OVERHEAD = 4
+# Typical cost of one image for vision models (OpenAI "high detail" tile average).
+IMAGE_TOKENS = 765
+
+
+class Tokenizer(Protocol):
+    @property
+    def name(self) -> str:
+        """Identifies the vocabulary; memoized counts are keyed on it."""
+        ...
+
+    def count(self, text: str) -> int: ...
+
+
+class CharTokenizer:
+    """Heuristic: about four characters per token."""
+
+    name = "chars/4"
+
+    def count(self, text: str) -> int:
+        return math.ceil(len(text) / 4)
+
+
+class TiktokenTokenizer:
+    def __init__(self, model: str):
+        import tiktoken
+
+        try:
+            self._enc = tiktoken.encoding_for_model(model)
+        except KeyError:
+            self._enc = tiktoken.get_encoding("cl100k_base")
+        self.name = f"tiktoken:{self._enc.name}"
+
+    def count(self, text: str) -> int:
+        return len(self._enc.encode(text, disallowed_special=()))
+
+
+class InternalTokenizer:
+    """Uses whichever built-in llama.cpp model is active at call time."""
+
+    @property
+    def name(self) -> str:
+        from rovot.internal_model import get_internal_provider
+
+        return f"llama:{get_internal_provider().loaded_model_name() or '-'}"
+
+    def count(self, text: str) -> int:
+        from rovot.internal_model import get_internal_provider
+
+        llm = get_internal_provider()._llm  # noqa: SLF001
+        if llm is None or not hasattr(llm, "tokenize"):
+            return CharTokenizer().count(text)
+        return len(llm.tokenize(text.encode("utf-8"), add_bos=False, special=True))
+
+
+# Model-name prefix -> tokenizer factory, for OpenAI-compatible servers.
+_TOKENIZER_FACTORIES: dict[str, Callable[[str], Tokenizer]] = {}
+
+
+def register_tokenizer(model_prefix: str, factory: Callable[[str], Tokenizer]) -> None:
+    """Use ``factory(model)`` for models whose name starts with ``model_prefix``."""
+    _TOKENIZER_FACTORIES[model_prefix] = factory
+
+
+def tokenizer_for_model(model: str) -> Tokenizer:
+    """Best available tokenizer for an OpenAI-compatible ``model`` name."""
+    for prefix in sorted(_TOKENIZER_FACTORIES, key=len, reverse=True):
+        if model.startswith(prefix):
+            return _TOKENIZER_FACTORIES[prefix](model)
+    if model.startswith(("gpt-", "o1", "o3", "o4")):
+        try:
+            return TiktokenTokenizer(model)
+        except ImportError:
+            pass
+    return CharTokenizer()
+
+
+def _message_key(msg: Message) -> tuple[Any, ...]:
+    calls = json.dumps(msg.tool_calls, sort_keys=True, default=str) if msg.tool_calls else ""
+    return (msg.role, msg.content, msg.tool_call_id, calls, len(msg.images))
+
+
+class TokenBudgeter:
+    def __init__(
+        self,
+        tokenizer: Tokenizer | None = None,
+        max_tokens: int = 8192,
+        max_cached: int = 4096,
+    ):
+        self.tokenizer = tokenizer or CharTokenizer()
+        self.max_tokens = max_tokens
+        self._max_cached = max_cached
+        self._counts: OrderedDict[tuple[Any, ...], int] = OrderedDict()
+        self.tokenized = 0  # messages actually run through the tokenizer
+
+    def _memo(self, key: tuple[Any, ...], compute: Callable[[], int]) -> int:
+        full_key = (self.tokenizer.name, *key)
+        n = self._counts.get(full_key)
+        if n is not None:
+            self._counts.move_to_end(full_key)
+            return n
+        n = compute()
+        self._counts[full_key] = n
+        if len(self._counts) > self._max_cached:
+            self._counts.popitem(last=False)
+        return n
+
+    def text_tokens(self, text: str) -> int:
+        return self._memo(("text", text), lambda: self.tokenizer.count(text))
+
+    def tools_tokens(self, tool_definitions: list[dict[str, Any]] | None) -> int:
+        if not tool_definitions:
+            return 0
+        payload = json.dumps(tool_definitions, sort_keys=True)
+        return self._memo(("tools", payload), lambda: self.tokenizer.count(payload))
+
+    def message_tokens(self, msg: Message) -> int:
+        key = _message_key(msg)
+
+        def _compute() -> int:
+            self.tokenized += 1
+            n = MESSAGE_OVERHEAD + self.tokenizer.count(msg.content)
+            if key[3]:
+                n += self.tokenizer.count(key[3])
+            return n + IMAGE_TOKENS * len(msg.images)
+
+        return self._memo(("msg", *key), _compute)
+
+    def fit(
+        self,
+        system_prompt: str,
+        tool_definitions: list[dict[str, Any]] | None,
+        messages: list[Message],
+    ) -> list[Message]:
+        """Newest suffix of ``messages`` that fits alongside the prompt and tools.
+
+        The latest message is always kept. A kept prefix never starts with a
+        ``tool`` result whose call was cut off.
+        """
+        budget = (
+            self.max_tokens
+            - self.text_tokens(system_prompt)
+            - MESSAGE_OVERHEAD
+            - self.tools_tokens(tool_definitions)
+        )
+        start = len(messages)
+        for i in range(len(messages) - 1, -1, -1):
+            cost = self.message_tokens(messages[i])
+            if budget - cost < 0 and start < len(messages):
+                break
+            budget -= cost
+            start = i
+        while start < len(messages) - 1 and messages[start].role == "tool":
+            start += 1
+        return messages[start:]
+
+    def count(
+        self,
+        system_prompt: str,
+        tool_definitions: list[dict[str, Any]] | None,
+        messages: list[Message],
+    ) -> int:
+        return (
+            self.text_tokens(system_prompt)
+            + MESSAGE_OVERHEAD
+            + self.tools_tokens(tool_definitions)
+            + sum(self.message_tokens(m) for m in messages)
+        )
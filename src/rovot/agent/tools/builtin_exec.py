@@ -3,10 +3,13 @@ from __future__ import annotations
 import asyncio
 import os
 import shlex
-from dataclasses import dataclass
+import uuid
+from dataclasses import dataclass, field
 from pathlib import Path
 
-from rovot.agent.tools.registry import Tool
+from rovot.agent.tools.exec_runner import ExecLimits, LineSink, run_bounded
+from rovot.agent.tools.registry import Tool, tool_progress
+from rovot.agent.tools.sandbox_pool import SandboxPool
 from rovot.utils_paths import resolve_in_workspace
 
 
@@ -14,30 +17,35 @@ from rovot.utils_paths import resolve_in_workspace
 class ExecConfig:
     workspace: Path
     security_mode: str
+    limits: ExecLimits = field(default_factory=ExecLimits)
+    # Container mode only: run in warm containers instead of one `docker run` per command.
+    pool: SandboxPool | None = None
 
 
-async def _run_host(command: str, cwd: Path) -> dict:
+def _progress_sink() -> LineSink | None:
+    """Forward output lines as ``tool_progress`` when the caller is streaming."""
+    report = tool_progress.get()
+    if report is None:
+        return None
+    return lambda stream, lines: report({"stream": stream, "lines": lines})
+
+
+async def _run_host(command: str, cwd: Path, limits: ExecLimits) -> dict:
     args = shlex.split(command)
-    p = await asyncio.create_subprocess_exec(
-        *args,
-        cwd=str(cwd),
-        stdout=asyncio.subprocess.PIPE,
-        stderr=asyncio.subprocess.PIPE,
-        env={**os.environ},
+    return await run_bounded(
+        args, limits=limits, cwd=cwd, env={**os.environ}, on_lines=_progress_sink()
     )
-    out, err = await p.communicate()
-    return {
-        "exit_code": p.returncode,
-        "stdout": out.decode("utf-8", "ignore"),
-        "stderr": err.decode("utf-8", "ignore"),
-    }
 
 
-async def _run_docker(command: str, workspace: Path) -> dict:
+async def _run_docker(command: str, workspace: Path, limits: ExecLimits) -> dict:
+    # Named so a timed-out container can be killed; killing the CLI alone leaves it running.
+    name = f"rovot-exec-{uuid.uuid4().hex[:12]}"
     args = [
         "docker",
         "run",
         "--rm",
+        "--name",
+        name,
         "--network",
         "none",
         "--read-only",
@@ -50,22 +58,27 @@ async def _run_docker(command: str, workspace: Path) -> dict:
         "-lc",
         command,
     ]
-    p = await asyncio.create_subprocess_exec(
-        *args, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+
+    async def _kill_container() -> None:
+        p = await asyncio.create_subprocess_exec(
+            "docker", "kill", name,
+            stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL,
+        )
+        await p.wait()
+
+    return await run_bounded(
+        args, limits=limits, on_lines=_progress_sink(), on_kill=_kill_container
     )
-    out, err = await p.communicate()
-    return {
-        "exit_code": p.returncode,
-        "stdout": out.decode("utf-8", "ignore"),
-        "stderr": err.decode("utf-8", "ignore"),
-    }
 
 
 def register_exec_tool(registry, cfg: ExecConfig) -> None:
     registry.register(
         Tool(
             name="exec.run",
-            description="Run a shell command (high risk; requires approval).",
+            description=(
+                "Run a shell command (high risk; requires approval). Long output is "
+                "truncated to its beginning and end; commands are killed on timeout."
+            ),
             parameters={
                 "type": "object",
                 "properties": {
@@ -86,5 +99,7 @@ def register_exec_tool(registry, cfg: ExecConfig) -> None:
 async def _exec_impl(cfg: ExecConfig, command: str, cwd: str = ".") -> dict:
     cwd_abs = resolve_in_workspace(cfg.workspace, cwd)
     if cfg.security_mode == "container":
-        return await _run_docker(command, cfg.workspace)
-    return await _run_host(command, cwd_abs)
+        if cfg.pool is not None:
+            return await cfg.pool.run(command, cfg.limits, _progress_sink())
+        return await _run_docker(command, cfg.workspace, cfg.limits)
+    return await _run_host(command, cwd_abs, cfg.limits)
@@ -1,31 +1,71 @@
-"""Register tools from active MCP clients into the ToolRegistry."""
+"""Register tools from supervised MCP servers into the ToolRegistry."""
 from __future__ import annotations
 
+import weakref
+from typing import Any
+
 from rovot.agent.tools.registry import Tool, ToolRegistry
-from rovot.connectors.mcp_client import McpClient
-
-
-def register_mcp_tools(registry: ToolRegistry, clients: list[McpClient]) -> None:
-    """Register all tools from all connected MCP clients."""
-    for client in clients:
-        for t in client._tools:
-            tool_name = f"mcp_{client.config.name}__{t['name']}"
-            captured_client = client
-            captured_t_name = t["name"]
-
-            async def _invoke(
-                _client: McpClient = captured_client,
-                _t_name: str = captured_t_name,
-                **kwargs: object,
-            ) -> object:
-                return await _client.call_tool(_t_name, kwargs)
-
-            registry.register(
-                Tool(
-                    name=tool_name,
-                    description=f"[{client.config.name}] {t.get('description', '')}",
-                    parameters=t.get("inputSchema", {"type": "object", "properties": {}}),
-                    fn=_invoke,
-                    requires_approval=False,
-                )
+from rovot.connectors.mcp_supervisor import McpSupervisor
+
+
+def _prefix(server: str) -> str:
+    return f"mcp_{server}__"
+
+
+def _sync_server_tools(
+    registry: ToolRegistry,
+    supervisor: McpSupervisor,
+    server: str,
+    tools: list[dict[str, Any]],
+) -> None:
+    """Make ``registry`` hold exactly ``tools`` for ``server``, leaving other tools alone."""
+    prefix = _prefix(server)
+    keep = {prefix + t["name"] for t in tools}
+    for name in registry.names():
+        if name.startswith(prefix) and name not in keep:
+            registry.unregister(name)
+    for t in tools:
+        captured_t_name = t["name"]
+
+        async def _invoke(
+            _server: str = server,
+            _t_name: str = captured_t_name,
+            **kwargs: object,
+        ) -> object:
+            return await supervisor.call_tool(_server, _t_name, kwargs)
+
+        registry.register(
+            Tool(
+                name=prefix + t["name"],
+                description=f"[{server}] {t.get('description', '')}",
+                parameters=t.get("inputSchema", {"type": "object", "properties": {}}),
+                fn=_invoke,
+                requires_approval=False,
             )
+        )
+
+
+def register_mcp_tools(
+    registry: ToolRegistry,
+    supervisor: McpSupervisor,
+    catalog: dict[str, list[dict[str, Any]]],
+) -> None:
+    """Register every tool in ``catalog`` (server name -> tool list).
+
+    Calls go through the supervisor, which starts or restarts the server on demand.
+    The registry then follows catalog changes (``tools/list_changed``) for as long
+    as it is alive.
+    """
+    for server, tools in catalog.items():
+        _sync_server_tools(registry, supervisor, server, tools)
+
+    ref = weakref.ref(registry)
+
+    def _on_change(server: str, tools: list[dict[str, Any]]) -> None:
+        reg = ref()
+        if reg is None:  # agent was rebuilt and this registry dropped
+            supervisor.remove_listener(_on_change)
+            return
+        _sync_server_tools(reg, supervisor, server, tools)
+
+    supervisor.add_listener(_on_change)
@@ -5,8 +5,8 @@ from rovot.agent.memory import list_memories, read_memory, write_memory
 from rovot.agent.tools.registry import Tool, ToolRegistry
 
 
-async def _async_list() -> object:
-    return list_memories()
+async def _async_list(prefix: str = "", offset: int = 0, limit: int = 50) -> object:
+    return list_memories(prefix=prefix, offset=max(offset, 0), limit=min(max(limit, 1), 200))
 
 
 async def _async_read(path: str) -> str:
@@ -23,9 +23,21 @@ def register_memory_tools(registry: ToolRegistry) -> None:
     registry.register(
         Tool(
             name="memory.list",
-            description="List all persistent memory files. Memory persists across sessions.",
-            parameters={"type": "object", "properties": {}, "required": []},
-            fn=lambda: _async_list(),
+            description=(
+                "List persistent memory files. Memory persists across sessions. "
+                "Filter by path prefix (e.g. 'projects/'); page with offset/limit "
+                "using next_offset from the previous result."
+            ),
+            parameters={
+                "type": "object",
+                "properties": {
+                    "prefix": {"type": "string"},
+                    "offset": {"type": "integer"},
+                    "limit": {"type": "integer"},
+                },
+                "required": [],
+            },
+            fn=lambda prefix="", offset=0, limit=50: _async_list(prefix, offset, limit),
         )
     )
     registry.register(
@@ -0,0 +1,238 @@
+"""
+Bounded subprocess execution for ``exec.run``.
+
+Output is captured into ``OutputBuffer``s that keep the first and last bytes
+of each stream, so memory and the model prompt stay bounded however much a
+command prints. A wall-clock timeout and an idle timeout (no output for a
+while) kill the whole process group, so shells and their children go
+together. Complete output lines can be streamed to a callback in
+rate-limited batches as they arrive.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import signal
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+READ_BYTES = 64 << 10
+# Seconds between SIGTERM and SIGKILL when stopping a timed-out command.
+KILL_GRACE_SECONDS = 2.0
+# Longest line forwarded to the progress callback.
+MAX_LINE_CHARS = 1000
+
+# (stream name, complete lines)
+LineSink = Callable[[str, list[str]], None]
+
+
+@dataclass
+class ExecLimits:
+    timeout: float = 300.0
+    idle_timeout: float = 120.0
+    max_output_bytes: int = 32 << 10  # per stream, split between head and tail
+    progress_interval: float = 0.25
+    max_progress_lines: int = 50  # per batch; older lines in a burst are skipped
+
+
+class OutputBuffer:
+    """Keeps the first ``head`` and last ``tail`` bytes of a stream."""
+
+    def __init__(self, limit: int):
+        self.head_limit = limit // 2
+        self.tail_limit = limit - self.head_limit
+        self._head = bytearray()
+        self._tail: deque[bytes] = deque()
+        self._tail_bytes = 0
+        self.total = 0
+
+    def write(self, data: bytes) -> None:
+        self.total += len(data)
+        room = self.head_limit - len(self._head)
+        if room > 0:
+            self._head += data[:room]
+            data = data[room:]
+        if not data:
+            return
+        self._tail.append(data)
+        self._tail_bytes += len(data)
+        while self._tail_bytes - len(self._tail[0]) >= self.tail_limit:
+            self._tail_bytes -= len(self._tail.popleft())
+
+    @property
+    def truncated(self) -> bool:
+        return self.total > self.head_limit + self.tail_limit
+
+    def text(self) -> str:
+        tail = b"".join(self._tail)
+        if not self.truncated:
+            return (bytes(self._head) + tail).decode("utf-8", "ignore")
+        tail = tail[-self.tail_limit :]
+        omitted = self.total - len(self._head) - len(tail)
+        return (
+            bytes(self._head).decode("utf-8", "ignore")
+            + f"\n... [{omitted} bytes omitted] ...\n"
+            + tail.decode("utf-8", "ignore")
+        )
+
+
+class _LineBatcher:
+    """Splits a byte stream into lines and hands them to ``sink`` at most every ``interval``."""
+
+    def __init__(self, name: str, sink: LineSink, limits: ExecLimits):
+        self.name = name
+        self._sink = sink
+        self._limits = limits
+        self._partial = b""
+        self._lines: deque[str] = deque(maxlen=limits.max_progress_lines)
+        self._last_flush = time.monotonic()
+
+    def feed(self, data: bytes) -> None:
+        *complete, self._partial = (self._partial + data).split(b"\n")
+        if len(self._partial) > MAX_LINE_CHARS * 4:  # no newline in sight: emit as is
+            complete.append(self._partial)
+            self._partial = b""
+        for raw in complete:
+            self._lines.append(raw.decode("utf-8", "replace").rstrip("\r")[:MAX_LINE_CHARS])
+        self.tick()
+
+    def tick(self) -> None:
+        """Flush if ``interval`` has passed; also called while the command is quiet."""
+        if time.monotonic() - self._last_flush >= self._limits.progress_interval:
+            self.flush()
+
+    def flush(self, final: bool = False) -> None:
+        if final and self._partial:
+            self._lines.append(self._partial.decode("utf-8", "replace")[:MAX_LINE_CHARS])
+            self._partial = b""
+        if self._lines:
+            self._sink(self.name, list(self._lines))
+            self._lines.clear()
+        self._last_flush = time.monotonic()
+
+
+def _signal_group(proc: asyncio.subprocess.Process, sig: int) -> None:
+    try:
+        if os.name == "posix":
+            os.killpg(proc.pid, sig)
+        elif sig == signal.SIGTERM:
+            proc.terminate()
+        else:
+            proc.kill()
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+async def run_bounded(
+    args: list[str],
+    *,
+    limits: ExecLimits,
+    cwd: Path | None = None,
+    env: dict[str, str] | None = None,
+    on_lines: LineSink | None = None,
+    on_kill: Callable[[], Awaitable[None]] | None = None,
+) -> dict[str, Any]:
+    """Run ``args`` and return ``exit_code``, ``stdout`` and ``stderr`` within ``limits``.
+
+    ``timed_out`` ("wall" or "idle") and ``output_bytes`` are added when the
+    command was killed or its output truncated. ``on_kill`` runs after the
+    process group is signalled (on timeout or cancellation), for cleanup the
+    group cannot reach (e.g. a container started by the CLI).
+    """
+    proc = await asyncio.create_subprocess_exec(
+        *args,
+        cwd=str(cwd) if cwd else None,
+        env=env,
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        start_new_session=os.name == "posix",
+    )
+    buffers = {
+        "stdout": OutputBuffer(limits.max_output_bytes),
+        "stderr": OutputBuffer(limits.max_output_bytes),
+    }
+    batchers = {
+        name: _LineBatcher(name, on_lines, limits) for name in buffers if on_lines is not None
+    }
+    last_output = time.monotonic()
+
+    async def _pump(name: str, stream: asyncio.StreamReader) -> None:
+        nonlocal last_output
+        while data := await stream.read(READ_BYTES):
+            last_output = time.monotonic()
+            buffers[name].write(data)
+            if name in batchers:
+                batchers[name].feed(data)
+
+    assert proc.stdout and proc.stderr
+    pumps = asyncio.gather(_pump("stdout", proc.stdout), _pump("stderr", proc.stderr))
+    started = time.monotonic()
+    timed_out: str | None = None
+    try:
+        while True:
+            now = time.monotonic()
+            wall_left = limits.timeout - (now - started)
+            idle_left = limits.idle_timeout - (now - last_output)
+            if wall_left <= 0 or idle_left <= 0:
+                timed_out = "wall" if wall_left <= 0 else "idle"
+                break
+            wait = min(wall_left, idle_left)
+            if batchers:
+                # Wake up to hand over lines that arrived just before a quiet spell.
+                wait = min(wait, limits.progress_interval)
+            try:
+                await asyncio.wait_for(asyncio.shield(pumps), wait)
+                break
+            except asyncio.TimeoutError:
+                for batcher in batchers.values():
+                    batcher.tick()
+                continue  # re-check which deadline passed (output may have reset idle)
+        if timed_out:
+            _signal_group(proc, signal.SIGTERM)
+            try:
+                await asyncio.wait_for(proc.wait(), KILL_GRACE_SECONDS)
+            except asyncio.TimeoutError:
+                _signal_group(proc, signal.SIGKILL)
+            if on_kill is not None:
+                await on_kill()
+            # Orphans in another group could hold the pipes open; stop reading.
+            try:
+                await asyncio.wait_for(asyncio.shield(pumps), KILL_GRACE_SECONDS)
+            except asyncio.TimeoutError:
+                pumps.cancel()
+        await proc.wait()
+    except asyncio.CancelledError:
+        _signal_group(proc, signal.SIGKILL)
+        pumps.cancel()
+
+        async def _cleanup() -> None:
+            await proc.wait()
+            if on_kill is not None:
+                await on_kill()
+
+        await asyncio.shield(_cleanup())
+        raise
+    for batcher in batchers.values():
+        batcher.flush(final=True)
+
+    result: dict[str, Any] = {
+        "exit_code": proc.returncode,
+        "stdout": buffers["stdout"].text(),
+        "stderr": buffers["stderr"].text(),
+    }
+    if timed_out:
+        limit = limits.timeout if timed_out == "wall" else limits.idle_timeout
+        result["timed_out"] = timed_out
+        result["stderr"] += (
+            f"\n[killed: {'no output for' if timed_out == 'idle' else 'ran longer than'}"
+            f" {limit:g}s]"
+        )
+    if any(b.truncated for b in buffers.values()):
+        result["output_bytes"] = {name: b.total for name, b in buffers.items()}
+    return result
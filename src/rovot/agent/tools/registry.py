@@ -1,10 +1,18 @@
 from __future__ import annotations
 
+from contextvars import ContextVar
 from dataclasses import dataclass
 from typing import Any, Awaitable, Callable
 
+from rovot.policy.approvals import Approval, ApprovalDenied
 from rovot.policy.engine import AuthContext, PolicyEngine
 
+# Set by the agent loop around each streamed tool call. Long-running tools call
+# it with incremental payloads (e.g. output lines), surfaced as ``tool_progress``.
+tool_progress: ContextVar[Callable[[dict[str, Any]], None] | None] = ContextVar(
+    "tool_progress", default=None
+)
+
 
 @dataclass
 class Tool:
@@ -25,6 +33,17 @@ class ToolRegistry:
     def register(self, tool: Tool) -> None:
         self._tools[tool.name] = tool
 
+    def unregister(self, name: str) -> None:
+        self._tools.pop(name, None)
+
+    def names(self) -> list[str]:
+        return list(self._tools)
+
+    def is_read_only(self, name: str) -> bool:
+        """True if ``name`` can run concurrently with other calls (no write, no approval)."""
+        tool = self._tools.get(name)
+        return tool is not None and not tool.requires_write and not tool.requires_approval
+
     def definitions(self) -> list[dict[str, Any]]:
         return [
             {
@@ -47,6 +66,7 @@ class ToolRegistry:
         *,
         tool_call_id: str | None = None,
         approved: bool = False,
+        on_approval: Callable[[Approval], None] | None = None,
     ) -> Any:
         tool = self._tools.get(name)
         if not tool:
@@ -54,13 +74,17 @@ class ToolRegistry:
         if tool.requires_write:
             self._policy.enforce_write_scope(ctx)
         if tool.requires_approval and not approved:
-            self._policy.maybe_require_approval(
-                ctx=ctx,
-                session_id=session_id,
-                tool_name=tool.name,
-                tool_args=arguments,
-                summary=tool.approval_summary or f"Run tool {tool.name}",
-                require=True,
-                tool_call_id=tool_call_id,
-            )
+            try:
+                await self._policy.maybe_require_approval(
+                    ctx=ctx,
+                    session_id=session_id,
+                    tool_name=tool.name,
+                    tool_args=arguments,
+                    summary=tool.approval_summary or f"Run tool {tool.name}",
+                    require=True,
+                    tool_call_id=tool_call_id,
+                    on_approval=on_approval,
+                )
+            except ApprovalDenied as exc:
+                return {"error": str(exc)}
         return await tool.fn(**arguments)
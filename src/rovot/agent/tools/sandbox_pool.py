@@ -0,0 +1,295 @@
+"""
+Warm sandbox containers for container-mode ``exec.run``.
+
+Launching ``docker run --rm`` per command pays container create/start on every
+call. A ``SandboxPool`` keeps a few containers of the same image, with the same
+isolation flags, idling on ``sleep infinity`` and runs each command in one via
+``docker exec``. A container is retired after ``max_uses`` commands, after
+sitting idle for ``idle_timeout`` seconds, or when a command in it times out,
+since leftover processes could still be running inside. Using the pool
+tops it back up to ``size`` in the background. Idle expiry does not, so an
+unused pool drains to nothing. Containers are labelled with their workspace;
+ones left behind by a daemon that did not shut down cleanly are removed
+before the pool starts its first container.
+
+The container runtime is injectable; ``DockerRuntime`` is the real one.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+import uuid
+from collections import deque
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Protocol
+
+from rovot.agent.tools.exec_runner import ExecLimits, LineSink, run_bounded
+
+logger = logging.getLogger(__name__)
+
+SANDBOX_IMAGE = "python:3.11-slim"
+# Container label; its value is the workspace path.
+SANDBOX_LABEL = "rovot.sandbox"
+
+
+class ContainerRuntime(Protocol):
+    async def start(self, workspace: Path, name: str) -> None: ...
+
+    def exec_args(self, name: str, command: str) -> list[str]: ...
+
+    async def remove(self, name: str) -> None: ...
+
+    async def remove_leftovers(self, workspace: Path) -> None: ...
+
+
+async def _docker(*args: str) -> tuple[int, str]:
+    p = await asyncio.create_subprocess_exec(
+        "docker", *args, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+    )
+    out, err = await p.communicate()
+    return p.returncode or 0, (err or out).decode("utf-8", "ignore").strip()
+
+
+class DockerRuntime:
+    """Long-lived containers with the isolation flags of the one-shot ``docker run``."""
+
+    def __init__(self, image: str = SANDBOX_IMAGE):
+        self.image = image
+
+    async def start(self, workspace: Path, name: str) -> None:
+        code, msg = await _docker(
+            "run", "-d", "--rm", "--name", name,
+            "--label", f"{SANDBOX_LABEL}={workspace}",
+            "--network", "none", "--read-only",
+            "-v", f"{workspace}:/workspace:rw", "-w", "/workspace",
+            self.image, "sleep", "infinity",
+        )
+        if code != 0:
+            raise RuntimeError(f"docker run failed: {msg}")
+
+    def exec_args(self, name: str, command: str) -> list[str]:
+        return ["docker", "exec", "-w", "/workspace", name, "bash", "-lc", command]
+
+    async def remove(self, name: str) -> None:
+        await _docker("rm", "-f", name)
+
+    async def remove_leftovers(self, workspace: Path) -> None:
+        code, out = await _docker(
+            "ps", "-aq", "--filter", f"label={SANDBOX_LABEL}={workspace}"
+        )
+        ids = out.split() if code == 0 else []
+        if ids:
+            logger.info("Removing %d leftover sandbox containers", len(ids))
+            await _docker("rm", "-f", *ids)
+
+
+@dataclass(eq=False)
+class _Container:
+    name: str
+    uses: int = 0
+    idle_since: float = 0.0
+    broken: bool = False
+
+
+class SandboxPool:
+    def __init__(
+        self,
+        runtime: ContainerRuntime,
+        workspace: Path,
+        *,
+        size: int = 2,
+        max_uses: int = 50,
+        idle_timeout: float = 300.0,
+        start_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.runtime = runtime
+        self.workspace = workspace
+        self.size = size
+        self.max_uses = max_uses
+        self.idle_timeout = idle_timeout
+        self.start_timeout = start_timeout
+        self._clock = clock
+        self._idle: deque[_Container] = deque()
+        self._busy = 0
+        self._starting = 0
+        self._tasks: set[asyncio.Task[Any]] = set()
+        self._reaper: asyncio.Task[None] | None = None
+        self._sweep: asyncio.Task[None] | None = None
+        self.started = 0
+        self.retired = 0
+        self.start_seconds: float | None = None  # most recent container start
+
+    def _spawn(self, coro) -> None:
+        task = asyncio.get_running_loop().create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _remove_leftovers(self) -> None:
+        try:
+            await self.runtime.remove_leftovers(self.workspace)
+        except Exception as exc:
+            logger.warning("Could not remove leftover sandbox containers: %s", exc)
+
+    async def _start(self) -> _Container:
+        # Finish the sweep first, or it could remove the containers started here.
+        if self._sweep is None:
+            self._sweep = asyncio.get_running_loop().create_task(self._remove_leftovers())
+        await asyncio.shield(self._sweep)
+        c = _Container(name=f"rovot-sandbox-{uuid.uuid4().hex[:12]}")
+        t0 = time.monotonic()
+        try:
+            await asyncio.wait_for(self.runtime.start(self.workspace, c.name), self.start_timeout)
+        except BaseException:
+            await self.runtime.remove(c.name)  # may have been created before the timeout
+            raise
+        self.start_seconds = time.monotonic() - t0
+        self.started += 1
+        c.idle_since = self._clock()
+        return c
+
+    async def _retire(self, c: _Container) -> None:
+        self.retired += 1
+        try:
+            await self.runtime.remove(c.name)
+        except Exception as exc:
+            logger.warning("Failed to remove sandbox container %s: %s", c.name, exc)
+
+    def _expired(self, c: _Container) -> bool:
+        return c.broken or c.uses >= self.max_uses or (
+            self._clock() - c.idle_since >= self.idle_timeout
+        )
+
+    def _prune(self) -> None:
+        """Retire idle containers that expired."""
+        for c in [c for c in self._idle if self._expired(c)]:
+            self._idle.remove(c)
+            self._spawn(self._retire(c))
+
+    async def _reap(self) -> None:
+        # Idle containers are retired, not replaced: an unused pool drains to zero
+        # and is warmed again by the next command.
+        while self._idle or self._starting or self._busy:
+            await asyncio.sleep(max(self.idle_timeout / 4, 0.01))
+            self._prune()
+
+    async def _fill_one(self) -> None:
+        try:
+            c = await self._start()
+        except Exception as exc:
+            logger.warning("Could not pre-start sandbox container: %s", exc)
+            return
+        finally:
+            self._starting -= 1
+        self._idle.append(c)
+
+    def _count(self) -> int:
+        return len(self._idle) + self._busy + self._starting
+
+    def warm(self) -> None:
+        """Start containers in the background until the pool holds ``size``."""
+        self._prune()
+        missing = self.size - self._count()
+        for _ in range(max(missing, 0)):
+            self._starting += 1
+            self._spawn(self._fill_one())
+        if self._reaper is None or self._reaper.done():
+            self._reaper = asyncio.get_running_loop().create_task(self._reap())
+
+    async def acquire(self) -> _Container:
+        self._prune()
+        # Most recently used first, so surplus containers age out via idle expiry.
+        c = self._idle.pop() if self._idle else await self._start()
+        self._busy += 1
+        self.warm()
+        return c
+
+    def release(self, c: _Container) -> None:
+        self._busy -= 1
+        c.uses += 1
+        c.idle_since = self._clock()
+        if self._expired(c):
+            self._spawn(self._retire(c))
+            self.warm()
+        elif self._count() >= self.size:  # started on demand beyond size
+            self._spawn(self._retire(c))
+        else:
+            self._idle.append(c)
+
+    async def run(
+        self, command: str, limits: ExecLimits, on_lines: LineSink | None = None
+    ) -> dict[str, Any]:
+        try:
+            c = await self.acquire()
+        except Exception as exc:
+            return {"exit_code": None, "stdout": "", "stderr": f"Sandbox unavailable: {exc}"}
+
+        async def _discard() -> None:
+            # Killing the exec CLI leaves the command running inside the container.
+            c.broken = True
+
+        try:
+            return await run_bounded(
+                self.runtime.exec_args(c.name, command),
+                limits=limits,
+                on_lines=on_lines,
+                on_kill=_discard,
+            )
+        except BaseException:
+            c.broken = True
+            raise
+        finally:
+            self.release(c)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "idle": len(self._idle),
+            "busy": self._busy,
+            "starting": self._starting,
+            "started": self.started,
+            "retired": self.retired,
+            "last_start_seconds": (
+                round(self.start_seconds, 3) if self.start_seconds is not None else None
+            ),
+        }
+
+    async def close(self) -> None:
+        if self._reaper is not None:
+            self._reaper.cancel()
+        for task in list(self._tasks):
+            task.cancel()
+        while self._idle:
+            await self._retire(self._idle.popleft())
+
+
+_pools: dict[Path, SandboxPool] = {}
+
+
+def get_sandbox_pool(
+    workspace: Path,
+    *,
+    size: int,
+    max_uses: int,
+    idle_timeout: float,
+    start_timeout: float,
+) -> SandboxPool:
+    """Shared pool for ``workspace``; settings are updated in place on reuse."""
+    pool = _pools.get(workspace)
+    if pool is None:
+        pool = _pools[workspace] = SandboxPool(DockerRuntime(), workspace)
+    pool.size = size
+    pool.max_uses = max_uses
+    pool.idle_timeout = idle_timeout
+    pool.start_timeout = start_timeout
+    return pool
+
+
+async def shutdown_sandbox_pools() -> None:
+    """Call at daemon shutdown to remove warm containers."""
+    for pool in list(_pools.values()):
+        await pool.close()
+    _pools.clear()
@@ -39,6 +39,13 @@ class Settings(BaseSettings):
     cloud_mode: bool = Field(default=False, description="Enable cloud/network-accessible mode")
 
 
+class HttpPoolConfig(BaseModel):
+    max_connections: int = 20
+    max_keepalive_connections: int = 10
+    keepalive_expiry: float = 30.0
+    http2: bool = False  # requires the optional `h2` package
+
+
 class ModelConfig(BaseModel):
     base_url: str = "http://localhost:1234/v1"
     model: str = ""
@@ -48,6 +55,9 @@ class ModelConfig(BaseModel):
     cloud_api_key_secret: str = "openai.api_key"
     provider_mode: ModelProviderMode = ModelProviderMode.LOCAL
     fallback_to_cloud: bool = False
+    http_pool: HttpPoolConfig = Field(default_factory=HttpPoolConfig)
+    internal_max_queue: int = 8  # requests allowed to wait for the built-in model
+    internal_ram_budget_mb: int = 0  # resident built-in models; 0 = 60% of physical RAM
 
 
 class EmailConnectorConfig(BaseModel):
@@ -75,6 +85,7 @@ class McpServerEntry(BaseModel):
     command: list[str]
     env: dict[str, str] = Field(default_factory=dict)
     enabled: bool = True
+    call_timeout: float = 120.0  # seconds per tools/call
 
 
 class ConnectorsConfig(BaseModel):
@@ -85,6 +96,18 @@ class ConnectorsConfig(BaseModel):
     browser_enabled: bool = False
     macos_automation_enabled: bool = False
     mcp_servers: list[McpServerEntry] = Field(default_factory=list)
+    mcp_start_timeout: float = 30.0  # seconds for an MCP server to start and list tools
+
+
+class ExecToolConfig(BaseModel):
+    timeout_seconds: float = 300.0  # wall clock per exec.run
+    idle_timeout_seconds: float = 120.0  # killed after this long without output
+    max_output_bytes: int = 32768  # per stream kept for the model (head + tail)
+    # Container mode: warm sandbox containers reused across commands (0 = one per command).
+    container_pool_size: int = 2
+    container_max_uses: int = 50  # commands before a container is replaced
+    container_idle_timeout_seconds: float = 300.0
+    container_start_timeout_seconds: float = 30.0
 
 
 class VoiceConfig(BaseModel):
@@ -103,24 +126,37 @@ class AppConfig(BaseModel):
     model: ModelConfig = Field(default_factory=ModelConfig)
     connectors: ConnectorsConfig = Field(default_factory=ConnectorsConfig)
     voice: VoiceConfig = Field(default_factory=VoiceConfig)
+    exec: ExecToolConfig = Field(default_factory=ExecToolConfig)
     max_iterations: int = 25
     max_context_messages: int = 40
+    # Prompt budget incl. system prompt and tool schemas; 0 = the built-in model's
+    # context window, and no token budget for remote models.
+    max_context_tokens: int = 0
+    response_reserve_tokens: int = 1024  # kept free for the reply (built-in model)
+    compaction_enabled: bool = True  # summarize messages that fall out of the window
+    memory_top_k: int = 5  # memory chunks recalled per turn (0 disables memory)
+    memory_embeddings: bool = False  # also rank memory with the built-in embedding model
+    max_parallel_tools: int = 4
 
 
 @dataclass
 class ConfigStore:
     path: Path
     config: AppConfig = field(default_factory=AppConfig)
+    # Bumped whenever the config may have changed; used to invalidate caches.
+    generation: int = field(default=0, init=False)
 
     def load(self) -> AppConfig:
         if self.path.exists():
             raw = json.loads(self.path.read_text("utf-8"))
             self.config = AppConfig.model_validate(raw)
+        self.generation += 1
         return self.config
 
     def save(self) -> None:
         self.path.parent.mkdir(parents=True, exist_ok=True)
         self.path.write_text(self.config.model_dump_json(indent=2), "utf-8")
+        self.generation += 1
 
     def update_path(self, dotted: str, value: Any) -> None:
         parts = dotted.split(".")
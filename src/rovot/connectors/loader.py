@@ -8,12 +8,15 @@ from rovot.config import AppConfig
 from rovot.connectors.browser import BrowserConnector
 from rovot.connectors.email_imap_smtp import EmailConnector
 from rovot.connectors.filesystem import FileSystemConnector
+from rovot.connectors.mcp_client import McpServerConfig
+from rovot.connectors.mcp_supervisor import McpSupervisor
 from rovot.secrets import SecretsStore
 
 logger = logging.getLogger(__name__)
 
 _browser_singleton: BrowserConnector | None = None
-_mcp_clients: list = []
+_mcp_supervisor: McpSupervisor | None = None
+MCP_CATALOG_FILENAME = "mcp_catalog.json"
 
 
 @dataclass
@@ -40,35 +43,39 @@ async def shutdown_browser() -> None:
         _browser_singleton = None
 
 
-async def get_mcp_clients(cfg: AppConfig) -> list:
-    """Start and return active MCP clients. Clients are cached globally."""
-    global _mcp_clients
-    if _mcp_clients:
-        return _mcp_clients
-    from rovot.connectors.mcp_client import McpClient, McpServerConfig
+async def get_mcp_supervisor(cfg: AppConfig, data_dir: Path | None = None) -> McpSupervisor:
+    """Return the shared MCP supervisor, synced to the enabled servers in ``cfg``.
 
-    clients = []
-    for server in cfg.connectors.mcp_servers:
-        if not server.enabled:
-            continue
-        client = McpClient(
-            McpServerConfig(name=server.name, command=server.command, env=server.env)
+    Servers are not started here; see ``McpSupervisor``. Tool catalogs persist
+    in ``data_dir`` (taken when the supervisor is first created).
+    """
+    global _mcp_supervisor
+    if _mcp_supervisor is None:
+        _mcp_supervisor = McpSupervisor(
+            catalog_path=data_dir / MCP_CATALOG_FILENAME if data_dir else None
         )
-        try:
-            await client.start()
-            clients.append(client)
-        except Exception as exc:
-            logger.warning("Failed to start MCP server '%s': %s", server.name, exc)
-    _mcp_clients = clients
-    return clients
+    _mcp_supervisor.start_timeout = cfg.connectors.mcp_start_timeout
+    await _mcp_supervisor.configure(
+        [
+            McpServerConfig(
+                name=server.name,
+                command=server.command,
+                env=server.env,
+                call_timeout=server.call_timeout,
+            )
+            for server in cfg.connectors.mcp_servers
+            if server.enabled
+        ]
+    )
+    return _mcp_supervisor
 
 
 async def shutdown_mcp_clients() -> None:
     """Call at daemon shutdown to stop all MCP server subprocesses."""
-    global _mcp_clients
-    for client in _mcp_clients:
-        await client.stop()
-    _mcp_clients = []
+    global _mcp_supervisor
+    if _mcp_supervisor is not None:
+        await _mcp_supervisor.shutdown()
+        _mcp_supervisor = None
 
 
 def load_connectors(cfg: AppConfig, workspace: Path, secrets: SecretsStore) -> LoadedConnectors:
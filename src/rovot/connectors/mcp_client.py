@@ -2,35 +2,71 @@
 
 Connects to local MCP servers via stdio transport and registers their
 tools into Rovot's ToolRegistry. Each MCP server runs as a subprocess;
-Rovot communicates via JSON-RPC over stdin/stdout.
+Rovot communicates via JSON-RPC over stdin/stdout, with one reader task per
+server routing responses to their callers by request id.
 """
 from __future__ import annotations
 
 import asyncio
+import inspect
 import json
 import logging
+from collections import deque
+from collections.abc import Awaitable, Callable
 from dataclasses import dataclass, field
 from typing import Any
 
 logger = logging.getLogger(__name__)
 
 
+# JSON-RPC "method not found".
+_METHOD_NOT_FOUND = -32601
+# StreamReader line limit; tool results can be far larger than asyncio's 64 KiB default.
+_LINE_LIMIT = 16 << 20
+# Recent stderr lines kept per server for status and debugging.
+STDERR_TAIL_LINES = 200
+
+
+class McpError(Exception):
+    """A JSON-RPC error response, or the server going away mid-request."""
+
+    def __init__(self, message: str, code: int | None = None, data: Any = None):
+        super().__init__(message)
+        self.code = code
+        self.data = data
+
+
+NotificationHandler = Callable[[dict[str, Any]], Awaitable[None] | None]
+
+
 @dataclass
 class McpServerConfig:
     name: str
     command: list[str]  # e.g. ["npx", "-y", "@modelcontextprotocol/server-filesystem", "/path"]
     env: dict[str, str] = field(default_factory=dict)
+    call_timeout: float = 120.0
 
 
 class McpClient:
-    """Minimal MCP stdio client. Starts the server as a subprocess."""
+    """MCP stdio client. Starts the server as a subprocess.
+
+    Requests are multiplexed: a single reader task owns stdout and resolves a
+    future per request id, so any number of calls can be in flight at once.
+    Server notifications go to handlers registered with ``on_notification``.
+    """
 
     def __init__(self, config: McpServerConfig):
         self.config = config
         self._proc: asyncio.subprocess.Process | None = None
         self._tools: list[dict[str, Any]] = []
         self._request_id = 0
-        self._lock = asyncio.Lock()
+        self._pending: dict[int, asyncio.Future[dict[str, Any]]] = {}
+        self._handlers: dict[str, list[NotificationHandler]] = {}
+        self._reader: asyncio.Task[None] | None = None
+        self._stderr_reader: asyncio.Task[None] | None = None
+        self._write_lock = asyncio.Lock()
+        self.stderr_tail: deque[str] = deque(maxlen=STDERR_TAIL_LINES)
+        self._stderr_log = logger.getChild(config.name)
 
     async def start(self) -> None:
         """Start the MCP server subprocess and perform the initialize handshake."""
@@ -43,34 +79,59 @@ class McpClient:
             stdout=asyncio.subprocess.PIPE,
             stderr=asyncio.subprocess.PIPE,
             env=env,
+            limit=_LINE_LIMIT,
         )
-        # MCP initialize
-        await self._send(
+        loop = asyncio.get_running_loop()
+        self._reader = loop.create_task(self._read_loop())
+        self._stderr_reader = loop.create_task(self._drain_stderr())
+        await self.request(
+            "initialize",
             {
-                "jsonrpc": "2.0",
-                "id": self._next_id(),
-                "method": "initialize",
-                "params": {
-                    "protocolVersion": "2024-11-05",
-                    "capabilities": {},
-                    "clientInfo": {"name": "rovot", "version": "0.1.0"},
-                },
-            }
-        )
-        await self._recv()  # discard initialize result
-        await self._send(
-            {"jsonrpc": "2.0", "method": "notifications/initialized", "params": {}}
+                "protocolVersion": "2024-11-05",
+                "capabilities": {},
+                "clientInfo": {"name": "rovot", "version": "0.1.0"},
+            },
         )
-        # Fetch tools
-        await self._send(
-            {"jsonrpc": "2.0", "id": self._next_id(), "method": "tools/list", "params": {}}
-        )
-        result = await self._recv()
-        self._tools = (result.get("result") or {}).get("tools", [])
+        await self._send({"jsonrpc": "2.0", "method": "notifications/initialized", "params": {}})
+        self._tools = await self.list_tools()
         logger.info(
             "MCP server '%s' started with %d tools", self.config.name, len(self._tools)
         )
 
+    @property
+    def running(self) -> bool:
+        """True while the subprocess is alive and its stdout is being read."""
+        return (
+            self._proc is not None
+            and self._proc.returncode is None
+            and self._reader is not None
+            and not self._reader.done()
+        )
+
+    async def ping(self, timeout: float = 10.0) -> None:
+        """Round-trip a ``ping`` request; raises on timeout or error."""
+        await self.request("ping", {}, timeout)
+
+    async def list_tools(self) -> list[dict[str, Any]]:
+        """Fetch the full tool list, following ``nextCursor`` pages."""
+        tools: list[dict[str, Any]] = []
+        params: dict[str, Any] = {}
+        while True:
+            result = await self.request("tools/list", params)
+            tools.extend(result.get("tools", []))
+            cursor = result.get("nextCursor")
+            if not cursor:
+                return tools
+            params = {"cursor": cursor}
+
+    def on_notification(self, method: str, handler: NotificationHandler) -> None:
+        """Call ``handler(params)`` whenever the server sends notification ``method``.
+
+        Handlers run on the reader task, so they must not await requests to this
+        server themselves; spawn a task for that.
+        """
+        self._handlers.setdefault(method, []).append(handler)
+
     def _next_id(self) -> int:
         self._request_id += 1
         return self._request_id
@@ -79,34 +140,134 @@ class McpClient:
         if not self._proc or not self._proc.stdin:
             raise RuntimeError("MCP server not started")
         line = json.dumps(msg) + "\n"
-        self._proc.stdin.write(line.encode())
-        await self._proc.stdin.drain()
+        # One writer at a time so concurrent requests never interleave on stdin.
+        async with self._write_lock:
+            self._proc.stdin.write(line.encode())
+            await self._proc.stdin.drain()
 
-    async def _recv(self) -> dict[str, Any]:
-        if not self._proc or not self._proc.stdout:
-            raise RuntimeError("MCP server not started")
-        line = await self._proc.stdout.readline()
-        return json.loads(line.decode().strip())
+    async def request(
+        self, method: str, params: dict[str, Any], timeout: float | None = None
+    ) -> dict[str, Any]:
+        """Send a request and wait for its result.
 
-    async def call_tool(self, tool_name: str, arguments: dict[str, Any]) -> Any:
-        """Call a tool on the MCP server and return the result."""
-        async with self._lock:
-            req_id = self._next_id()
+        On timeout or cancellation the server is sent ``notifications/cancelled``
+        so it can abandon the work. Raises ``McpError`` for error responses.
+        """
+        req_id = self._next_id()
+        fut: asyncio.Future[dict[str, Any]] = asyncio.get_running_loop().create_future()
+        self._pending[req_id] = fut
+        try:
+            await self._send({"jsonrpc": "2.0", "id": req_id, "method": method, "params": params})
+            msg = await asyncio.wait_for(fut, timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as exc:
+            reason = "timeout" if isinstance(exc, asyncio.TimeoutError) else "cancelled"
+            await self._cancel_remote(req_id, reason)
+            raise
+        finally:
+            self._pending.pop(req_id, None)
+        if "error" in msg:
+            err = msg["error"] or {}
+            raise McpError(str(err.get("message", err)), err.get("code"), err.get("data"))
+        return msg.get("result") or {}
+
+    async def _cancel_remote(self, req_id: int, reason: str) -> None:
+        try:
             await self._send(
                 {
                     "jsonrpc": "2.0",
-                    "id": req_id,
-                    "method": "tools/call",
-                    "params": {"name": tool_name, "arguments": arguments},
+                    "method": "notifications/cancelled",
+                    "params": {"requestId": req_id, "reason": reason},
                 }
             )
-            result = await self._recv()
-        if "error" in result:
-            return {"error": result["error"]}
-        content = (result.get("result") or {}).get("content", [])
+        except Exception:
+            pass  # server already gone
+
+    async def _read_loop(self) -> None:
+        assert self._proc and self._proc.stdout
+        stdout = self._proc.stdout
+        try:
+            while line := await stdout.readline():
+                try:
+                    msg = json.loads(line)
+                except ValueError:
+                    logger.debug("MCP '%s': ignoring non-JSON line", self.config.name)
+                    continue
+                if isinstance(msg, dict):
+                    await self._dispatch(msg)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            logger.warning("MCP '%s': reader stopped: %s", self.config.name, exc)
+        finally:
+            self._fail_pending(McpError(f"MCP server '{self.config.name}' exited"))
+
+    async def _drain_stderr(self) -> None:
+        """Keep reading stderr so a chatty server never blocks on a full pipe."""
+        assert self._proc and self._proc.stderr
+        stderr = self._proc.stderr
+        try:
+            while True:
+                try:
+                    line = await stderr.readline()
+                except ValueError:  # over-long line: drop the buffered part
+                    line = b"..."
+                if not line:
+                    return
+                text = line.decode(errors="replace").rstrip()
+                self.stderr_tail.append(text)
+                self._stderr_log.info("%s", text)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            return
+
+    async def _dispatch(self, msg: dict[str, Any]) -> None:
+        method = msg.get("method")
+        if method is None:
+            fut = self._pending.get(msg.get("id"))  # type: ignore[arg-type]
+            if fut is not None and not fut.done():
+                fut.set_result(msg)
+            return
+        if "id" in msg:
+            # Server-to-client request: answer ping, refuse anything else.
+            reply: dict[str, Any] = {"jsonrpc": "2.0", "id": msg["id"]}
+            if method == "ping":
+                reply["result"] = {}
+            else:
+                reply["error"] = {"code": _METHOD_NOT_FOUND, "message": f"Unsupported: {method}"}
+            await self._send(reply)
+            return
+        for handler in self._handlers.get(method, []):
+            try:
+                ret = handler(msg.get("params") or {})
+                if inspect.isawaitable(ret):
+                    await ret
+            except Exception:
+                logger.exception("MCP '%s': %s handler failed", self.config.name, method)
+
+    def _fail_pending(self, exc: Exception) -> None:
+        for fut in self._pending.values():
+            if not fut.done():
+                fut.set_exception(exc)
+        self._pending.clear()
+
+    async def call_tool(
+        self, tool_name: str, arguments: dict[str, Any], timeout: float | None = None
+    ) -> Any:
+        """Call a tool on the MCP server and return the result."""
+        timeout = self.config.call_timeout if timeout is None else timeout
+        try:
+            result = await self.request(
+                "tools/call", {"name": tool_name, "arguments": arguments}, timeout
+            )
+        except McpError as exc:
+            return {"error": {"code": exc.code, "message": str(exc)}}
+        except asyncio.TimeoutError:
+            return {"error": f"MCP tool '{tool_name}' timed out after {timeout:g}s"}
+        content = result.get("content", [])
         # Extract text from content blocks
         texts = [block.get("text", "") for block in content if block.get("type") == "text"]
-        return "\n".join(texts) if texts else result.get("result", {})
+        return "\n".join(texts) if texts else result
 
     def get_tool_definitions(self) -> list[dict[str, Any]]:
         """Return OpenAI-compatible tool definitions for all tools in this MCP server."""
@@ -132,7 +293,14 @@ class McpClient:
             try:
                 self._proc.terminate()
                 await asyncio.wait_for(self._proc.wait(), timeout=5)
+            except asyncio.TimeoutError:
+                self._proc.kill()
             except Exception:
                 pass
             finally:
                 self._proc = None
+        for task in (self._reader, self._stderr_reader):
+            if task is not None:
+                task.cancel()
+        self._reader = self._stderr_reader = None
+        self._fail_pending(McpError(f"MCP server '{self.config.name}' stopped"))
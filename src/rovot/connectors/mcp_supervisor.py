@@ -0,0 +1,342 @@
+"""Supervision of MCP server subprocesses.
+
+Servers start lazily on their first tool call. Once a server has started, a
+monitor task pings it periodically. A server that crashes, or stops answering
+pings, is restarted with exponential backoff. Tool calls made while a server
+is backing off fail fast instead of waiting. A start that takes longer than
+``start_timeout`` counts as a failed start. Each server's status, restart
+count and call latency are kept for the ``/mcp`` routes.
+
+Tool catalogs are persisted, keyed by a hash of the server's command and env.
+This lets a known server's tools be advertised without starting it. A server
+that sends ``notifications/tools/list_changed``, or comes back with a
+different list after a restart, updates the catalog. Listeners are notified
+so registries can swap just that server's tools.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from rovot.connectors.mcp_client import McpClient, McpError, McpServerConfig
+
+logger = logging.getLogger(__name__)
+
+# Weight of the newest call in the smoothed latency.
+_LATENCY_SMOOTHING = 0.2
+
+# (server name, new tool list)
+CatalogListener = Callable[[str, list[dict[str, Any]]], None]
+
+
+def catalog_key(config: McpServerConfig) -> str:
+    """Identity of a server's tool catalog: the same command and env give the same tools."""
+    blob = json.dumps({"command": config.command, "env": config.env}, sort_keys=True)
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+@dataclass(eq=False)
+class McpServerState:
+    config: McpServerConfig
+    client: McpClient | None = None
+    status: str = "stopped"  # stopped | starting | running | backoff
+    tools: list[dict[str, Any]] | None = None  # last known catalog
+    # Set once the server has been used; only wanted servers are restarted.
+    wanted: bool = False
+    restarts: int = 0
+    failures: int = 0  # consecutive failed starts/pings
+    last_error: str | None = None
+    started_at: float | None = None
+    retry_at: float = 0.0
+    last_ping: float = 0.0
+    calls: int = 0
+    call_errors: int = 0
+    latency_ms: float | None = None
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+
+class McpSupervisor:
+    def __init__(
+        self,
+        *,
+        ping_interval: float = 30.0,
+        ping_timeout: float = 10.0,
+        start_timeout: float = 30.0,
+        backoff_base: float = 1.0,
+        backoff_max: float = 60.0,
+        tick: float = 1.0,
+        client_factory: Callable[[McpServerConfig], McpClient] = McpClient,
+        clock: Callable[[], float] = time.monotonic,
+        catalog_path: Path | None = None,
+    ):
+        self.ping_interval = ping_interval
+        self.ping_timeout = ping_timeout
+        self.start_timeout = start_timeout
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.tick = tick
+        self._client_factory = client_factory
+        self._clock = clock
+        self._servers: dict[str, McpServerState] = {}
+        self._monitor: asyncio.Task[None] | None = None
+        self._listeners: list[CatalogListener] = []
+        self._refreshes: set[asyncio.Task[None]] = set()
+        self.catalog_path = catalog_path
+        self._catalogs: dict[str, dict[str, Any]] = {}
+        if catalog_path is not None:
+            try:
+                self._catalogs = json.loads(catalog_path.read_text("utf-8"))
+            except (OSError, ValueError):
+                self._catalogs = {}
+
+    # ── catalogs ──────────────────────────────────────────────────────────
+
+    def add_listener(self, fn: CatalogListener) -> None:
+        self._listeners.append(fn)
+
+    def remove_listener(self, fn: CatalogListener) -> None:
+        if fn in self._listeners:
+            self._listeners.remove(fn)
+
+    def _save_catalogs(self) -> None:
+        if self.catalog_path is None:
+            return
+        self.catalog_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.catalog_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self._catalogs), "utf-8")
+        os.replace(tmp, self.catalog_path)
+
+    def _set_tools(self, st: McpServerState, tools: list[dict[str, Any]]) -> None:
+        changed = tools != st.tools
+        st.tools = tools
+        key = catalog_key(st.config)
+        if changed or key not in self._catalogs:
+            self._catalogs[key] = {"name": st.config.name, "tools": tools}
+            self._save_catalogs()
+        if changed:
+            logger.info("MCP server '%s' now has %d tools", st.config.name, len(tools))
+            for fn in list(self._listeners):
+                try:
+                    fn(st.config.name, tools)
+                except Exception:
+                    logger.exception("MCP catalog listener failed")
+
+    def _on_list_changed(self, st: McpServerState, client: McpClient) -> None:
+        async def _refresh() -> None:
+            try:
+                tools = await client.list_tools()
+            except Exception as exc:
+                logger.warning("MCP server '%s': tools/list failed: %s", st.config.name, exc)
+                return
+            if st.client is client:  # not replaced by a restart meanwhile
+                self._set_tools(st, tools)
+
+        # Runs off the reader task, which must stay free to deliver the response.
+        task = asyncio.get_running_loop().create_task(_refresh())
+        self._refreshes.add(task)
+        task.add_done_callback(self._refreshes.discard)
+
+    async def configure(self, configs: list[McpServerConfig]) -> None:
+        """Track exactly ``configs``; removed or changed servers are stopped."""
+        wanted = {c.name: c for c in configs}
+        for name, st in list(self._servers.items()):
+            if wanted.get(name) != st.config:
+                del self._servers[name]
+                await self._stop(st)
+        for name, cfg in wanted.items():
+            if name not in self._servers:
+                cached = self._catalogs.get(catalog_key(cfg))
+                self._servers[name] = McpServerState(
+                    config=cfg, tools=cached["tools"] if cached else None
+                )
+
+    def names(self) -> list[str]:
+        return list(self._servers)
+
+    async def catalog(self) -> dict[str, list[dict[str, Any]]]:
+        """Tool lists per server.
+
+        Only a server with no persisted catalog is started here, to discover its
+        tools. Every other server starts on its first tool call.
+        """
+        out: dict[str, list[dict[str, Any]]] = {}
+        for name, st in list(self._servers.items()):
+            if st.tools is None:
+                try:
+                    await self.ensure(name)
+                except McpError as exc:
+                    logger.warning("MCP server '%s' unavailable: %s", name, exc)
+                    continue
+            out[name] = st.tools or []
+        return out
+
+    async def ensure(self, name: str) -> McpClient:
+        """Return a running client for ``name``, starting it if needed."""
+        st = self._servers.get(name)
+        if st is None:
+            raise McpError(f"Unknown MCP server: {name}")
+        if st.client is not None and st.client.running:
+            return st.client  # fast path: don't queue behind a health ping
+        async with st.lock:
+            if st.client is not None and st.client.running:
+                return st.client
+            if st.status == "backoff" and self._clock() < st.retry_at:
+                wait = st.retry_at - self._clock()
+                raise McpError(
+                    f"MCP server '{name}' is restarting in {wait:.0f}s "
+                    f"(last error: {st.last_error})"
+                )
+            await self._start(st)
+            assert st.client is not None
+            return st.client
+
+    async def _start(self, st: McpServerState) -> None:
+        if st.client is not None:  # crashed or unresponsive instance
+            await st.client.stop()
+            st.restarts += 1
+        st.status = "starting"
+        st.wanted = True
+        client = self._client_factory(st.config)
+        client.on_notification(
+            "notifications/tools/list_changed", lambda _: self._on_list_changed(st, client)
+        )
+        st.client = client
+        try:
+            # A server that never answers initialize would hold st.lock forever.
+            await asyncio.wait_for(client.start(), self.start_timeout)
+        except Exception as exc:
+            await client.stop()
+            reason = str(exc)
+            if isinstance(exc, asyncio.TimeoutError):
+                reason = f"no response within {self.start_timeout:g}s"
+            self._backoff(st, f"start failed: {reason}")
+            raise McpError(f"MCP server '{st.config.name}' failed to start: {reason}") from exc
+        now = self._clock()
+        st.status = "running"
+        self._set_tools(st, client._tools)
+        st.failures = 0
+        st.started_at = st.last_ping = now
+        if self._monitor is None or self._monitor.done():
+            self._monitor = asyncio.get_running_loop().create_task(self._monitor_loop())
+
+    def _backoff(self, st: McpServerState, error: str) -> None:
+        st.failures += 1
+        st.last_error = error
+        st.status = "backoff"
+        delay = min(self.backoff_base * 2 ** (st.failures - 1), self.backoff_max)
+        st.retry_at = self._clock() + delay
+        logger.warning(
+            "MCP server '%s': %s; retrying in %.0fs", st.config.name, error, delay
+        )
+
+    async def _stop(self, st: McpServerState) -> None:
+        if st.client is not None:
+            await st.client.stop()
+        st.client = None
+        st.status = "stopped"
+
+    async def call_tool(self, server: str, tool: str, arguments: dict[str, Any]) -> Any:
+        """Call ``tool`` on ``server``, starting or restarting the server if needed."""
+        try:
+            client = await self.ensure(server)
+        except McpError as exc:
+            return {"error": str(exc)}
+        st = self._servers[server]
+        t0 = self._clock()
+        result = await client.call_tool(tool, arguments)
+        ms = (self._clock() - t0) * 1000
+        st.calls += 1
+        if isinstance(result, dict) and "error" in result:
+            st.call_errors += 1
+        st.latency_ms = ms if st.latency_ms is None else (
+            _LATENCY_SMOOTHING * ms + (1 - _LATENCY_SMOOTHING) * st.latency_ms
+        )
+        return result
+
+    async def check(self) -> None:
+        """One supervision pass: detect exits, ping, and restart when due."""
+        now = self._clock()
+        for st in list(self._servers.values()):
+            if st.lock.locked():
+                continue  # starting, or a call is bringing it up
+            async with st.lock:
+                if st.status == "running" and st.client is not None:
+                    if not st.client.running:
+                        self._backoff(st, "server exited")
+                    elif now - st.last_ping >= self.ping_interval:
+                        try:
+                            await st.client.ping(self.ping_timeout)
+                            st.last_ping = now
+                        except Exception as exc:
+                            await st.client.stop()
+                            self._backoff(st, f"ping failed: {exc!r}")
+                if st.status == "backoff" and st.wanted and self._clock() >= st.retry_at:
+                    try:
+                        await self._start(st)
+                    except McpError:
+                        pass  # already backed off again
+
+    async def _monitor_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.tick)
+            try:
+                await self.check()
+            except Exception:
+                logger.exception("MCP supervision pass failed")
+
+    async def restart(self, name: str) -> None:
+        """Restart ``name`` now, ignoring any backoff."""
+        st = self._servers.get(name)
+        if st is None:
+            raise McpError(f"Unknown MCP server: {name}")
+        async with st.lock:
+            st.failures = 0
+            try:
+                await self._start(st)
+            except McpError:
+                pass  # recorded in status
+
+    def status(self) -> list[dict[str, Any]]:
+        now = self._clock()
+        out = []
+        for name, st in self._servers.items():
+            out.append(
+                {
+                    "name": name,
+                    "status": st.status,
+                    "tools": [t["name"] for t in st.tools or []],
+                    "tool_count": len(st.tools or []),
+                    "restarts": st.restarts,
+                    "last_error": st.last_error,
+                    "retry_in_seconds": (
+                        round(max(st.retry_at - now, 0), 1) if st.status == "backoff" else None
+                    ),
+                    "uptime_seconds": (
+                        round(now - st.started_at, 1)
+                        if st.status == "running" and st.started_at is not None
+                        else None
+                    ),
+                    "calls": st.calls,
+                    "call_errors": st.call_errors,
+                    "latency_ms": round(st.latency_ms, 1) if st.latency_ms is not None else None,
+                    "stderr_tail": list(st.client.stderr_tail)[-20:] if st.client else [],
+                }
+            )
+        return out
+
+    async def shutdown(self) -> None:
+        if self._monitor is not None:
+            self._monitor.cancel()
+            self._monitor = None
+        for task in list(self._refreshes):
+            task.cancel()
+        for st in self._servers.values():
+            await self._stop(st)
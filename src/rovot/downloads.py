@@ -0,0 +1,365 @@
+"""
+Resumable model downloads.
+
+A download goes to ``<name>.part`` next to its destination. When the server
+supports HTTP ranges, the file is split into up to ``max_segments`` byte ranges
+fetched in parallel. Each range resumes from its own offset after a dropped
+connection or a daemon restart. Chunks are written at their offsets on a worker
+thread, so disk I/O never blocks the event loop. When the server publishes a
+SHA-256 (Hugging Face's ``X-Linked-Etag`` for LFS files), the finished file is
+hashed and checked before it is atomically renamed into place.
+
+Jobs and their per-segment progress are stored in ``.downloads.json`` in the
+models directory. ``DownloadManager.resume`` continues them after a restart,
+one download at a time.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any
+
+import httpx
+
+from rovot.progress import Emit, ProgressReporter
+
+logger = logging.getLogger(__name__)
+
+QUEUE_FILENAME = ".downloads.json"
+CHUNK_BYTES = 1 << 20
+MIN_SEGMENT_BYTES = 64 << 20
+MAX_RETRIES = 5
+# How often segment offsets are checkpointed to the queue file.
+CHECKPOINT_SECONDS = 2.0
+
+_SHA256_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+class DownloadError(Exception):
+    pass
+
+
+@dataclass
+class DownloadJob:
+    filename: str
+    url: str
+    sha256: str | None = None
+    total: int = 0
+    # [start, end, bytes done] per byte range; empty until the size is known.
+    segments: list[list[int]] = field(default_factory=list)
+    status: str = "queued"  # queued | downloading | verifying | error
+    error: str | None = None
+
+    @property
+    def done_bytes(self) -> int:
+        return sum(seg[2] for seg in self.segments)
+
+
+def _expected_sha256(response: httpx.Response) -> str | None:
+    for r in [*response.history, response]:
+        for header in ("x-linked-etag", "etag"):
+            value = r.headers.get(header, "").strip().strip('"').lower()
+            if value.startswith("w/"):
+                continue
+            if _SHA256_RE.match(value):
+                return value
+    return None
+
+
+def _retryable(response: httpx.Response) -> bool:
+    return response.status_code >= 500 or response.status_code == 429
+
+
+def _write_at(fd: int, data: bytes, offset: int, lock: threading.Lock) -> None:
+    if hasattr(os, "pwrite"):
+        os.pwrite(fd, data, offset)
+        return
+    with lock:  # no pwrite (Windows): serialize seek + write
+        os.lseek(fd, offset, os.SEEK_SET)
+        os.write(fd, data)
+
+
+def _sha256_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        while block := f.read(8 << 20):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(timeout=httpx.Timeout(30.0, read=60.0), follow_redirects=True)
+
+
+class DownloadManager:
+    def __init__(
+        self,
+        models_dir: Path,
+        emit: Emit | None = None,
+        *,
+        max_segments: int = 4,
+        client_factory: Callable[[], httpx.AsyncClient] = _client,
+        retry_delay: float = 1.0,
+    ):
+        self.models_dir = models_dir
+        self.emit = emit
+        self.max_segments = max(1, max_segments)
+        self._client_factory = client_factory
+        self._retry_delay = retry_delay
+        self._queue_path = models_dir / QUEUE_FILENAME
+        self._jobs: dict[str, DownloadJob] = {}
+        self._worker: asyncio.Task[None] | None = None
+        self._last_checkpoint = 0.0
+        self._load()
+
+    # ── persistent queue ──────────────────────────────────────────────────
+
+    def _load(self) -> None:
+        try:
+            raw = json.loads(self._queue_path.read_text("utf-8"))
+            for rec in raw:
+                job = DownloadJob(**rec)
+                self._jobs[job.filename] = job
+        except (OSError, ValueError, TypeError):
+            self._jobs = {}
+
+    def _save(self) -> None:
+        self.models_dir.mkdir(parents=True, exist_ok=True)
+        tmp = self._queue_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps([asdict(j) for j in self._jobs.values()]), "utf-8")
+        os.replace(tmp, self._queue_path)
+        self._last_checkpoint = time.monotonic()
+
+    def _checkpoint(self) -> None:
+        if time.monotonic() - self._last_checkpoint >= CHECKPOINT_SECONDS:
+            self._save()
+
+    def jobs(self) -> list[dict[str, Any]]:
+        return [
+            {
+                "filename": j.filename,
+                "status": j.status,
+                "bytes_downloaded": j.done_bytes,
+                "total_bytes": j.total,
+                "segments": len(j.segments),
+                "error": j.error,
+            }
+            for j in self._jobs.values()
+        ]
+
+    def part_path(self, filename: str) -> Path:
+        return self.models_dir / f"{filename}.part"
+
+    def add(self, filename: str, url: str) -> str:
+        """Queue ``filename``; returns "downloading" or "queued" (behind another job).
+
+        A job that is already running is left alone and its current status returned.
+        """
+        job = self._jobs.get(filename)
+        if job is not None and job.status in ("downloading", "verifying"):
+            return job.status  # already running; don't touch its .part file
+        if job is None or job.url != url:
+            job = DownloadJob(filename=filename, url=url)
+            self._jobs[filename] = job
+            self.part_path(filename).unlink(missing_ok=True)
+        job.status, job.error = "queued", None
+        self._save()
+        busy = any(j.status in ("downloading", "verifying") for j in self._jobs.values())
+        return "queued" if busy else "downloading"
+
+    def resume(self) -> asyncio.Task[None] | None:
+        """Continue persisted jobs (e.g. after a restart) on a background task."""
+        for job in self._jobs.values():
+            if job.status in ("downloading", "verifying"):  # interrupted by shutdown
+                job.status = "queued"
+        if not any(j.status == "queued" for j in self._jobs.values()):
+            return None
+        return asyncio.get_running_loop().create_task(self.process())
+
+    async def process(self) -> None:
+        """Run queued jobs one at a time until none are left."""
+        if self._worker is not None and not self._worker.done():
+            return
+        self._worker = asyncio.current_task()
+        # Re-scan after each job: requests made meanwhile were only queued.
+        while job := next((j for j in self._jobs.values() if j.status == "queued"), None):
+            await self._run(job)
+
+    async def _notify(self, event: str, payload: dict[str, Any]) -> None:
+        if self.emit is not None:
+            await self.emit(event, payload)
+
+    # ── transfer ──────────────────────────────────────────────────────────
+
+    async def _run(self, job: DownloadJob) -> None:
+        job.status = "downloading"
+        self._save()
+        try:
+            async with self._client_factory() as client:
+                await self._download(client, job)
+            job.status = "verifying"
+            self._save()
+            await self._finalize(job)
+        except asyncio.CancelledError:
+            job.status = "queued"
+            self._save()
+            raise
+        except Exception as exc:
+            logger.warning("Download of %s failed: %s", job.filename, exc)
+            job.status, job.error = "error", str(exc)
+            self._save()
+            await self._notify(
+                "model_download_error",
+                {"filename": job.filename, "error": str(exc), "resumable": bool(job.segments)},
+            )
+            return
+        del self._jobs[job.filename]
+        self._save()
+        await self._notify("model_download_complete", {"filename": job.filename})
+
+    async def _probe(self, client: httpx.AsyncClient, job: DownloadJob) -> bool:
+        """Fill in size and hash; returns True if the server accepts byte ranges."""
+        response = await client.head(job.url)
+        response.raise_for_status()
+        job.sha256 = _expected_sha256(response) or job.sha256
+        total = int(response.headers.get("content-length") or 0)
+        ranges = response.headers.get("accept-ranges", "").lower() == "bytes"
+        if total != job.total or not ranges:
+            # New file, changed upstream, or not resumable: start over.
+            job.total = total
+            job.segments = []
+            self.part_path(job.filename).unlink(missing_ok=True)
+        return ranges and total > 0
+
+    def _plan(self, job: DownloadJob) -> None:
+        n = max(1, min(self.max_segments, math.ceil(job.total / MIN_SEGMENT_BYTES)))
+        size = math.ceil(job.total / n)
+        job.segments = [
+            [start, min(start + size, job.total), 0] for start in range(0, job.total, size)
+        ]
+
+    async def _download(self, client: httpx.AsyncClient, job: DownloadJob) -> None:
+        ranged = await self._probe(client, job)
+        part = self.part_path(job.filename)
+        reporter = ProgressReporter(
+            self._notify,
+            "model_download_progress",
+            {"filename": job.filename},
+            job.total,
+            done_key="bytes_downloaded",
+            total_key="total_bytes",
+            start=job.done_bytes if ranged else 0,
+        )
+        if not ranged:
+            await self._fetch_whole(client, job, part, reporter)
+            return
+        if not job.segments:
+            self._plan(job)
+        self._save()
+        with part.open("r+b" if part.exists() else "w+b") as f:
+            if os.fstat(f.fileno()).st_size != job.total:
+                f.truncate(job.total)
+            lock = threading.Lock()
+            # TaskGroup cancels and awaits the other segments when one fails, so
+            # none outlives the file descriptor or keeps updating the job.
+            try:
+                async with asyncio.TaskGroup() as tg:
+                    for seg in job.segments:
+                        if seg[0] + seg[2] < seg[1]:
+                            tg.create_task(
+                                self._fetch_segment(client, job, seg, f.fileno(), lock, reporter)
+                            )
+            except ExceptionGroup as eg:
+                raise eg.exceptions[0] from None
+        await reporter.finish()
+
+    async def _fetch_segment(
+        self,
+        client: httpx.AsyncClient,
+        job: DownloadJob,
+        seg: list[int],
+        fd: int,
+        lock: threading.Lock,
+        reporter: ProgressReporter,
+    ) -> None:
+        attempt = 0
+        while seg[0] + seg[2] < seg[1]:
+            offset = seg[0] + seg[2]
+            headers = {"Range": f"bytes={offset}-{seg[1] - 1}"}
+            try:
+                async with client.stream("GET", job.url, headers=headers) as response:
+                    response.raise_for_status()
+                    if response.status_code != 206:
+                        raise DownloadError(
+                            f"Server ignored range request (HTTP {response.status_code})"
+                        )
+                    async for chunk in response.aiter_bytes(CHUNK_BYTES):
+                        chunk = chunk[: seg[1] - (seg[0] + seg[2])]
+                        await asyncio.to_thread(_write_at, fd, chunk, seg[0] + seg[2], lock)
+                        seg[2] += len(chunk)
+                        attempt = 0
+                        await reporter.update(job.done_bytes)
+                        self._checkpoint()
+            except (httpx.TransportError, httpx.HTTPStatusError) as exc:
+                if isinstance(exc, httpx.HTTPStatusError) and not _retryable(exc.response):
+                    raise
+                attempt += 1
+                if attempt > MAX_RETRIES:
+                    raise
+                logger.info(
+                    "Retrying %s from byte %d (%s)", job.filename, seg[0] + seg[2], exc
+                )
+                await asyncio.sleep(self._retry_delay * 2 ** (attempt - 1))
+
+    async def _fetch_whole(
+        self,
+        client: httpx.AsyncClient,
+        job: DownloadJob,
+        part: Path,
+        reporter: ProgressReporter,
+    ) -> None:
+        """Single-stream fallback for servers without range support."""
+        async with client.stream("GET", job.url) as response:
+            response.raise_for_status()
+            with part.open("wb") as f:
+                async for chunk in response.aiter_bytes(CHUNK_BYTES):
+                    await asyncio.to_thread(f.write, chunk)
+                    await reporter.advance(len(chunk))
+        job.total = job.total or reporter.done
+        await reporter.finish()
+
+    async def _finalize(self, job: DownloadJob) -> None:
+        part = self.part_path(job.filename)
+        if job.sha256:
+            actual = await asyncio.to_thread(_sha256_file, part)
+            if actual != job.sha256:
+                part.unlink(missing_ok=True)
+                job.segments = []
+                raise DownloadError(
+                    f"SHA-256 mismatch for {job.filename}: expected {job.sha256}, got {actual}"
+                )
+        os.replace(part, self.models_dir / job.filename)
+
+
+_manager: DownloadManager | None = None
+
+
+def get_download_manager(models_dir: Path, emit: Emit | None = None) -> DownloadManager:
+    """Shared manager for ``models_dir``; ``emit`` (if given) replaces its event sink."""
+    global _manager
+    if _manager is None or _manager.models_dir != models_dir:
+        _manager = DownloadManager(models_dir)
+    if emit is not None:
+        _manager.emit = emit
+    return _manager
@@ -0,0 +1,134 @@
+"""
+Admission control for the built-in llama.cpp model.
+
+Only one generation can use a Llama instance at a time. The scheduler hands out
+that slot in round-robin order across sessions (FIFO within a session), bounds
+how many requests may wait, and keeps queue-depth and wait-time metrics.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any
+
+# Session the current request belongs to; set by the chat routes so the
+# scheduler can interleave sessions without threading ids through providers.
+inference_session: ContextVar[str | None] = ContextVar("inference_session", default=None)
+
+_ANONYMOUS = "_anonymous"
+
+
+class InferenceQueueFull(RuntimeError):
+    """Raised when the admission queue is at capacity."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Built-in model is busy; retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class InferenceScheduler:
+    def __init__(self, max_concurrent: int = 1, max_queue: int = 8):
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max(0, max_queue)
+        self._active = 0
+        self._waiting: OrderedDict[str, deque[asyncio.Future[None]]] = OrderedDict()
+        self._depth = 0
+        # Metrics
+        self.admitted = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self._avg_service = 0.0
+
+    def queue_depth(self) -> int:
+        return self._depth
+
+    def retry_after(self) -> float:
+        """Rough seconds until a queued request would start, for Retry-After."""
+        per_request = self._avg_service or 5.0
+        ahead = self._depth + self._active
+        return max(1.0, math.ceil(per_request * ahead / self.max_concurrent))
+
+    def check_admission(self) -> None:
+        """Raise InferenceQueueFull if a new request would have to be rejected."""
+        if self._active >= self.max_concurrent and self._depth >= self.max_queue:
+            self.rejected += 1
+            raise InferenceQueueFull(self.retry_after())
+
+    @asynccontextmanager
+    async def slot(self, session_id: str | None = None) -> AsyncIterator[None]:
+        """Hold an inference slot for the duration of the block."""
+        if session_id is None:
+            session_id = inference_session.get()
+        key = session_id or _ANONYMOUS
+        queued_at = time.monotonic()
+        if self._active < self.max_concurrent and not self._depth:
+            self._active += 1
+        else:
+            self.check_admission()
+            fut: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+            self._waiting.setdefault(key, deque()).append(fut)
+            self._depth += 1
+            try:
+                await fut
+            except BaseException:
+                if fut.done() and not fut.cancelled():
+                    # Granted just as we were cancelled — pass the slot on.
+                    self._release()
+                else:
+                    self._discard(key, fut)
+                raise
+        wait = time.monotonic() - queued_at
+        self.admitted += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            service = time.monotonic() - started
+            self._avg_service = (
+                service if not self._avg_service else 0.8 * self._avg_service + 0.2 * service
+            )
+            self._release()
+
+    def _discard(self, key: str, fut: asyncio.Future[None]) -> None:
+        waiters = self._waiting.get(key)
+        if waiters is None or fut not in waiters:
+            return
+        waiters.remove(fut)
+        self._depth -= 1
+        if not waiters:
+            del self._waiting[key]
+
+    def _release(self) -> None:
+        # Hand the slot straight to the next session in round-robin order.
+        while self._waiting:
+            key, waiters = self._waiting.popitem(last=False)
+            fut = waiters.popleft()
+            self._depth -= 1
+            if waiters:
+                self._waiting[key] = waiters
+            if not fut.done():
+                fut.set_result(None)
+                return
+        self._active -= 1
+
+    def metrics(self) -> dict[str, Any]:
+        return {
+            "active": self._active,
+            "queue_depth": self._depth,
+            "max_queue": self.max_queue,
+            "waiting_sessions": len(self._waiting),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "avg_wait_seconds": round(self.total_wait / self.admitted, 4) if self.admitted else 0.0,
+            "max_wait_seconds": round(self.max_wait, 4),
+            "avg_service_seconds": round(self._avg_service, 4),
+        }
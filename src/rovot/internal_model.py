@@ -9,13 +9,173 @@ from __future__ import annotations
 import asyncio
 import logging
 import os as _os
+import queue
 import sys as _sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import aclosing
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import lru_cache
 from pathlib import Path
-from typing import AsyncIterator, Optional
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterator, Optional
+
+from rovot.inference_scheduler import InferenceScheduler
+from rovot.kv_cache import KV_CACHE_DIR, PrefixStateCache
 
 logger = logging.getLogger(__name__)
 
 MODELS_DIR = Path.home() / ".rovot" / "models"
+# Load-throughput guess until a model has been loaded once (mmap from a fast SSD).
+DEFAULT_LOAD_BYTES_PER_SEC = 1 << 30
+
+# Model a request asked for by filename; None means the active model.
+requested_model: ContextVar[str | None] = ContextVar("requested_model", default=None)
+
+_DONE = object()
+
+
+def default_ram_budget() -> int:
+    """60% of physical RAM, or 8 GiB if it cannot be detected."""
+    try:
+        import psutil
+
+        return int(psutil.virtual_memory().total * 0.6)
+    except Exception:
+        return 8 << 30
+
+
+def _estimate_kv_bytes(n_ctx: int, file_bytes: int, metadata: dict[str, str] | None = None) -> int:
+    """
+    KV-cache size for ``n_ctx`` tokens at f16.
+
+    Uses the GGUF metadata when available (layers x KV width), otherwise a
+    rough per-token guess proportional to the weights file.
+    """
+    meta = metadata or {}
+    arch = meta.get("general.architecture", "")
+    try:
+        n_layer = int(meta[f"{arch}.block_count"])
+        n_embd = int(meta[f"{arch}.embedding_length"])
+        n_head = int(meta[f"{arch}.attention.head_count"])
+        n_head_kv = int(meta.get(f"{arch}.attention.head_count_kv", n_head))
+    except (KeyError, ValueError):
+        return n_ctx * max(file_bytes // 32768, 1)
+    return 2 * 2 * n_layer * n_ctx * (n_embd * n_head_kv // max(n_head, 1))
+
+
+@lru_cache(maxsize=8)
+def _compile_grammar(text: str) -> Any:
+    """Parse GBNF once per distinct tool set; parsing is slow for large schemas."""
+    from llama_cpp import LlamaGrammar
+
+    return LlamaGrammar.from_string(text, verbose=False)
+
+
+def _report_restores(llm: Any, cache: PrefixStateCache) -> None:
+    """Have ``llm`` tell ``cache`` which of its states it actually restores."""
+    load_state = getattr(llm, "load_state", None)
+    if load_state is None:
+        return
+
+    def _load_state(state: Any) -> None:
+        load_state(state)
+        cache.confirm(state)
+
+    llm.load_state = _load_state
+
+
+@dataclass
+class _ResidentModel:
+    path: Path
+    llm: Any
+    n_ctx: int
+    estimated_bytes: int
+    prompt_cache: Optional[PrefixStateCache]
+    last_used: float = field(default_factory=time.time)
+
+
+@dataclass
+class _InferenceJob:
+    start: Callable[[], Iterator[Any]]
+    loop: asyncio.AbstractEventLoop
+    out: asyncio.Queue
+    cancelled: threading.Event = field(default_factory=threading.Event)
+
+    def emit(self, item: Any) -> None:
+        try:
+            self.loop.call_soon_threadsafe(self.out.put_nowait, item)
+        except RuntimeError:
+            # Event loop already closed — nobody is listening any more.
+            self.cancelled.set()
+
+
+class InferenceWorker:
+    """
+    Dedicated thread that drives llama.cpp generators.
+
+    Creating the stream *and* iterating it both run here, so token generation
+    never blocks the event loop. Chunks are handed back through an asyncio
+    queue; jobs run one at a time since a Llama instance is not thread-safe.
+    """
+
+    def __init__(self, name: str = "rovot-inference"):
+        self._name = name
+        self._jobs: queue.SimpleQueue[_InferenceJob] = queue.SimpleQueue()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=self._name, daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            job = self._jobs.get()
+            if job.cancelled.is_set():
+                job.emit(_DONE)
+                continue
+            stream = None
+            try:
+                stream = job.start()
+                for chunk in stream:
+                    if job.cancelled.is_set():
+                        break
+                    job.emit(chunk)
+            except BaseException as exc:  # forwarded to the awaiting coroutine
+                job.emit(exc)
+            finally:
+                close = getattr(stream, "close", None)
+                if close is not None:
+                    try:
+                        close()
+                    except Exception:
+                        logger.debug("Closing inference stream failed", exc_info=True)
+            job.emit(_DONE)
+
+    async def stream(self, start: Callable[[], Iterator[Any]]) -> AsyncIterator[Any]:
+        """
+        Run ``start()`` on the worker thread and yield each item it produces.
+
+        Closing the async iterator early (e.g. the client disconnected) tells the
+        worker to stop generating after the current chunk.
+        """
+        self._ensure_started()
+        job = _InferenceJob(start=start, loop=asyncio.get_running_loop(), out=asyncio.Queue())
+        self._jobs.put(job)
+        try:
+            while True:
+                item = await job.out.get()
+                if item is _DONE:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            job.cancelled.set()
 
 
 class InternalModelProvider:
@@ -31,10 +191,32 @@ class InternalModelProvider:
     # When available, expose as: n_kv_cache_bits: int = 0  (0 = disabled, 4 = 4-bit, 3 = 3-bit)
     """
 
-    def __init__(self):
+    def __init__(self, ram_budget_bytes: int | None = None):
+        # The active model: used when a request does not name one.
         self._llm = None
         self._loaded_model_path: Optional[Path] = None
         self._loading = False
+        self._worker = InferenceWorker()
+        self.scheduler = InferenceScheduler()
+        self.prompt_cache: Optional[PrefixStateCache] = None
+        # Resident models in least-recently-used order, keyed by filename.
+        self._models: OrderedDict[str, _ResidentModel] = OrderedDict()
+        # Separate embedding-mode instance for memory search. Chat contexts are
+        # never created in embedding mode, and embedding on them would discard
+        # their KV state. Counted against the budget but never evicted.
+        self._embedder: Optional[_ResidentModel] = None
+        self.ram_budget_bytes = ram_budget_bytes or default_ram_budget()
+        self._listeners: list[Callable[[str, dict[str, Any]], Awaitable[None]]] = []
+        self._load_lock = asyncio.Lock()
+        # Loads run in executor threads while requests touch the pool on the event
+        # loop: ``_pool_lock`` guards every change to the pool and the active model,
+        # ``_load_mutex`` lets one load run at a time (held across llama creation).
+        self._pool_lock = threading.RLock()
+        self._load_mutex = threading.Lock()
+        # Context size of the last explicit load; used for per-request loads.
+        self.default_n_ctx = 4096
+        # Measured on each load; drives the estimated model_load_progress events.
+        self.load_bytes_per_sec = DEFAULT_LOAD_BYTES_PER_SEC
 
     def is_loaded(self) -> bool:
         return self._llm is not None
@@ -57,18 +239,57 @@ class InternalModelProvider:
             return self._loaded_model_path.name
         return None
 
-    def load_model(
-        self,
-        model_filename: str,
-        n_ctx: int = 4096,
-        n_gpu_layers: int = -1,  # -1 = offload all layers to GPU
-        verbose: bool = False,
-    ) -> None:
-        """
-        Load a .gguf model from ~/.rovot/models/.
-
-        Unloads any previously loaded model first.
-        """
+    def loaded_n_ctx(self, model_filename: str | None = None) -> Optional[int]:
+        """Context window of ``model_filename`` (default: the active model), if resident."""
+        name = model_filename or self.loaded_model_name()
+        model = self._models.get(name) if name else None
+        return model.n_ctx if model else None
+
+    def embedding_model_name(self) -> Optional[str]:
+        embedder = self._embedder
+        return embedder.path.name if embedder else None
+
+    def resident_models(self) -> list[dict[str, Any]]:
+        """Resident models, least recently used first."""
+        with self._pool_lock:
+            items = list(self._models.items())
+            embedder = self._embedder
+        if embedder is not None:
+            items.append((embedder.path.name, embedder))
+        return [
+            {
+                "filename": name,
+                "n_ctx": m.n_ctx,
+                "estimated_bytes": m.estimated_bytes,
+                "last_used": m.last_used,
+                "active": m.llm is self._llm,
+                "embedding": m is embedder,
+            }
+            for name, m in items
+        ]
+
+    def resident_bytes(self) -> int:
+        embedder = self._embedder.estimated_bytes if self._embedder else 0
+        return embedder + sum(m.estimated_bytes for m in self._models.values())
+
+    def add_listener(self, listener: Callable[[str, dict[str, Any]], Awaitable[None]]) -> None:
+        """Register an async ``(event, payload)`` callback for pool load/evict events."""
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[str, dict[str, Any]], Awaitable[None]]) -> None:
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    async def _notify(self, event: str, payload: dict[str, Any]) -> None:
+        for listener in self._listeners:
+            try:
+                await listener(event, payload)
+            except Exception:
+                logger.warning("Model pool listener failed for %s", event, exc_info=True)
+
+    def _create_llama(
+        self, model_path: Path, n_ctx: int, n_gpu_layers: int, verbose: bool, embedding: bool
+    ):
         try:
             from llama_cpp import Llama
         except ImportError as exc:
@@ -83,66 +304,263 @@ class InternalModelProvider:
         if meipass and _os.path.exists(_os.path.join(meipass, "ggml-metal.metal")):
             _os.environ.setdefault("GGML_METAL_PATH_RESOURCES", meipass)
 
+        return Llama(
+            model_path=str(model_path),
+            n_gpu_layers=n_gpu_layers,
+            n_ctx=n_ctx,
+            verbose=verbose,
+            embedding=embedding,
+        )
+
+    def load_model(
+        self,
+        model_filename: str,
+        n_ctx: int = 4096,
+        n_gpu_layers: int = -1,  # -1 = offload all layers to GPU
+        verbose: bool = False,
+        kv_cache_disk: bool = False,
+        activate: bool = True,
+    ) -> list[str]:
+        """
+        Load a .gguf model from ~/.rovot/models/ and (by default) make it active.
+
+        Other models stay resident while the pool fits in ``ram_budget_bytes``;
+        least-recently-used ones are evicted to make room. Returns the filenames
+        that were evicted. Prompt-prefix states are kept in RAM so follow-up
+        turns only evaluate new tokens; with ``kv_cache_disk`` evicted states
+        are also written under ~/.rovot/kvcache/.
+        """
         MODELS_DIR.mkdir(parents=True, exist_ok=True)
         model_path = MODELS_DIR / model_filename
 
         if not model_path.exists():
             raise FileNotFoundError(f"Model not found: {model_path}")
 
-        if self._llm is not None:
-            logger.info("Unloading previous model before loading new one")
-            self._llm = None
-            self._loaded_model_path = None
+        with self._load_mutex:
+            evicted = self._load(model_path, n_ctx, n_gpu_layers, verbose, kv_cache_disk, activate)
+        if activate:
+            self.default_n_ctx = n_ctx
+        return evicted
+
+    def _load(
+        self,
+        model_path: Path,
+        n_ctx: int,
+        n_gpu_layers: int,
+        verbose: bool,
+        kv_cache_disk: bool,
+        activate: bool,
+    ) -> list[str]:
+        model_filename = model_path.name
+        file_bytes = model_path.stat().st_size
+        with self._pool_lock:
+            resident = self._models.get(model_filename)
+            if resident is not None and resident.n_ctx == n_ctx:
+                if activate:
+                    self._activate(model_filename)
+                return []
+            if resident is not None:
+                self._drop(model_filename)
+            evicted = self._make_room(file_bytes + _estimate_kv_bytes(n_ctx, file_bytes))
 
         logger.info("Loading model: %s", model_path)
-        self._llm = Llama(
-            model_path=str(model_path),
-            n_gpu_layers=n_gpu_layers,
-            n_ctx=n_ctx,
-            verbose=verbose,
-        )
-        self._loaded_model_path = model_path
+        started = time.monotonic()
+        llm = self._create_llama(model_path, n_ctx, n_gpu_layers, verbose, embedding=False)
+        elapsed = time.monotonic() - started
+        if elapsed > 0.1:
+            self.load_bytes_per_sec = file_bytes / elapsed
+        disk_dir = KV_CACHE_DIR / f"{model_path.stem}-{n_ctx}" if kv_cache_disk else None
+        prompt_cache = PrefixStateCache(disk_dir=disk_dir)
+        llm.set_cache(prompt_cache)
+        _report_restores(llm, prompt_cache)
+        metadata = getattr(llm, "metadata", None) or {}
+        with self._pool_lock:
+            self._models[model_filename] = _ResidentModel(
+                path=model_path,
+                llm=llm,
+                n_ctx=n_ctx,
+                estimated_bytes=file_bytes + _estimate_kv_bytes(n_ctx, file_bytes, metadata),
+                prompt_cache=prompt_cache,
+            )
+            if activate or self._llm is None:
+                self._activate(model_filename)
+            # The real KV size is known now; trim again if the pre-load guess was low.
+            evicted += self._make_room(0, keep=model_filename)
         logger.info("Model loaded successfully: %s", model_filename)
+        return evicted
 
-    def unload_model(self) -> None:
-        """Unload the current model and free memory."""
-        self._llm = None
-        self._loaded_model_path = None
-        logger.info("Model unloaded")
+    async def ensure_model(self, model_filename: str, n_ctx: int | None = None) -> None:
+        """Make ``model_filename`` resident, loading it off the event loop if needed.
+
+        ``n_ctx`` defaults to the context size of the last explicit load.
+        """
+        if model_filename in self._models:
+            return
+        async with self._load_lock:
+            if model_filename in self._models:
+                return
+            loop = asyncio.get_running_loop()
+            n_ctx = n_ctx or self.default_n_ctx
+            evicted = await loop.run_in_executor(
+                None, lambda: self.load_model(model_filename, n_ctx=n_ctx, activate=False)
+            )
+            for name in evicted:
+                await self._notify("model_evicted", {"filename": name})
+            await self._notify("model_load_complete", {"filename": model_filename})
+
+    def load_embedding_model(
+        self,
+        model_filename: str,
+        n_ctx: int = 512,
+        n_gpu_layers: int = -1,
+        verbose: bool = False,
+    ) -> list[str]:
+        """
+        Load ``model_filename`` in embedding mode as the model used by ``embed``.
+
+        It replaces any previous embedding model and is kept apart from the
+        chat models, but its memory counts against ``ram_budget_bytes``: chat
+        models are evicted to make room for it. Returns the evicted filenames.
+        """
+        model_path = MODELS_DIR / model_filename
+        if not model_path.exists():
+            raise FileNotFoundError(f"Model not found: {model_path}")
+        file_bytes = model_path.stat().st_size
+        with self._load_mutex:
+            with self._pool_lock:
+                self._embedder = None
+                evicted = self._make_room(file_bytes + _estimate_kv_bytes(n_ctx, file_bytes))
+            logger.info("Loading embedding model: %s", model_path)
+            llm = self._create_llama(model_path, n_ctx, n_gpu_layers, verbose, embedding=True)
+            metadata = getattr(llm, "metadata", None) or {}
+            with self._pool_lock:
+                self._embedder = _ResidentModel(
+                    path=model_path,
+                    llm=llm,
+                    n_ctx=n_ctx,
+                    estimated_bytes=file_bytes + _estimate_kv_bytes(n_ctx, file_bytes, metadata),
+                    prompt_cache=None,
+                )
+                evicted += self._make_room(0)
+        return evicted
+
+    def _touch(self, model_filename: str) -> _ResidentModel:
+        model = self._models[model_filename]
+        self._models.move_to_end(model_filename)
+        model.last_used = time.time()
+        return model
+
+    def _activate(self, model_filename: str) -> None:
+        model = self._touch(model_filename)
+        self._llm = model.llm
+        self._loaded_model_path = model.path
+        self.prompt_cache = model.prompt_cache
+
+    def _make_room(self, needed: int, keep: str | None = None) -> list[str]:
+        evicted: list[str] = []
+        for name in list(self._models):
+            if self.resident_bytes() + needed <= self.ram_budget_bytes:
+                break
+            if name == keep:
+                continue
+            self._drop(name)
+            evicted.append(name)
+            logger.info("Evicted model %s to stay within RAM budget", name)
+        return evicted
+
+    def _drop(self, model_filename: str) -> None:
+        model = self._models.pop(model_filename)
+        if model.llm is self._llm:
+            self._llm = None
+            self._loaded_model_path = None
+            self.prompt_cache = None
+
+    def unload_model(self, model_filename: str | None = None) -> None:
+        """Unload one resident model, or all of them, and free memory."""
+        with self._pool_lock:
+            if model_filename is None:
+                self._models.clear()
+                self._embedder = None
+                self._llm = None
+                self._loaded_model_path = None
+                self.prompt_cache = None
+                logger.info("All models unloaded")
+                return
+            if model_filename in self._models:
+                self._drop(model_filename)
+                logger.info("Model unloaded: %s", model_filename)
+            elif model_filename == self.embedding_model_name():
+                self._embedder = None
+                logger.info("Embedding model unloaded: %s", model_filename)
 
     async def chat_stream(
         self,
         messages: list[dict],
         temperature: float = 0.7,
         max_tokens: int = 1024,
+        model: str | None = None,
+        grammar: str | None = None,
     ) -> AsyncIterator[str]:
         """
         Stream chat completion tokens as an async generator.
 
-        Each yielded value is a text chunk string.
+        Each yielded value is a text chunk string. Requests wait for a scheduler
+        slot first and raise InferenceQueueFull if the admission queue is full.
+        ``grammar`` is GBNF text constraining the output (see providers.grammar).
         """
-        if self._llm is None:
-            raise RuntimeError("No model loaded. Load a model first.")
-
-        loop = asyncio.get_event_loop()
-
-        # llama-cpp-python is synchronous — run in thread pool to avoid
-        # blocking the FastAPI event loop
-        def _run_sync():
-            return self._llm.create_chat_completion(
+        with self._pool_lock:
+            if model is not None:
+                if model not in self._models:
+                    raise RuntimeError(f"Model not loaded: {model}")
+                llm = self._touch(model).llm
+            elif self._llm is None:
+                raise RuntimeError("No model loaded. Load a model first.")
+            else:
+                llm = self._llm
+                name = self._loaded_model_path.name if self._loaded_model_path else None
+                if name in self._models:
+                    self._touch(name)
+
+        # llama-cpp-python is synchronous and its stream is a lazy generator, so
+        # both creating and iterating it happen on the inference thread.
+        def _start():
+            extra: dict[str, Any] = {}
+            if grammar is not None:
+                extra["grammar"] = _compile_grammar(grammar)
+            return llm.create_chat_completion(
                 messages=messages,
                 temperature=temperature,
                 max_tokens=max_tokens,
                 stream=True,
+                **extra,
             )
 
-        stream = await loop.run_in_executor(None, _run_sync)
+        async with self.scheduler.slot():
+            async with aclosing(self._worker.stream(_start)) as chunks:
+                async for chunk in chunks:
+                    delta = chunk["choices"][0]["delta"]
+                    content = delta.get("content", "")
+                    if content:
+                        yield content
 
-        for chunk in stream:
-            delta = chunk["choices"][0]["delta"]
-            content = delta.get("content", "")
-            if content:
-                yield content
+    async def embed(self, texts: list[str]) -> Optional[list[list[float]]]:
+        """
+        Embed ``texts`` with the embedding model on the inference thread.
+
+        Returns None when no embedding model is loaded, so callers can fall
+        back to lexical search.
+        """
+        embedder = self._embedder
+        if embedder is None:
+            return None
+        llm = embedder.llm
+        try:
+            async with aclosing(self._worker.stream(lambda: iter([llm.embed(texts)]))) as it:
+                async for vectors in it:
+                    return [list(v) for v in vectors]
+        except (RuntimeError, ValueError) as exc:
+            logger.debug("Embedding failed with %s: %s", embedder.path.name, exc)
+        return None
 
     async def chat_complete(
         self,
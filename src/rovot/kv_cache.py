@@ -0,0 +1,206 @@
+"""
+Prompt-prefix KV-cache for the built-in model.
+
+llama-cpp-python asks its ``cache`` for the state whose token sequence shares the
+longest prefix with the new prompt, restores it, and only evaluates the tokens
+after that prefix. PrefixStateCache implements that lookup with an in-RAM LRU
+bounded by state size, optionally spilling evicted states to disk so they
+survive model reloads and daemon restarts.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import pickle
+import tempfile
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Sequence
+
+logger = logging.getLogger(__name__)
+
+KV_CACHE_DIR = Path.home() / ".rovot" / "kvcache"
+
+# Prefixes shorter than this are not worth a state restore (system prompt alone is longer).
+MIN_PREFIX_TOKENS = 16
+
+
+def _key_hash(key: tuple[int, ...]) -> str:
+    return hashlib.sha256(json.dumps(key).encode()).hexdigest()
+
+
+def _common_prefix(a: Sequence[int], b: Sequence[int]) -> int:
+    n = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        n += 1
+    return n
+
+
+class PrefixStateCache:
+    """
+    Cache of llama.cpp states keyed by token sequence.
+
+    Implements the subset of llama_cpp's BaseLlamaCache used by ``Llama``
+    (``__getitem__``/``__setitem__``/``__contains__``). It deliberately does not
+    define ``__len__``: Llama checks the cache with ``if self.cache``.
+    """
+
+    def __init__(
+        self,
+        capacity_bytes: int = 2 << 30,
+        disk_dir: Path | None = None,
+        max_disk_entries: int = 32,
+    ):
+        self.capacity_bytes = capacity_bytes
+        self.disk_dir = disk_dir
+        self.max_disk_entries = max_disk_entries
+        self._ram: OrderedDict[tuple[int, ...], Any] = OrderedDict()
+        self._disk: dict[tuple[int, ...], str] = {}
+        self.lookups = 0
+        self.hits = 0  # states llama-cpp actually restored (see ``confirm``)
+        self.misses = 0  # lookups with no usable prefix
+        self.saved_tokens = 0
+        self.disk_hits = 0
+        # (state, prefix length) last handed out, until llama-cpp restores it.
+        self._offered: tuple[Any, int] | None = None
+        if disk_dir is not None:
+            self._load_disk_index()
+
+    # ── llama_cpp cache protocol ─────────────────────────────────────────────
+
+    @property
+    def cache_size(self) -> int:
+        return sum(self._state_size(s) for s in self._ram.values())
+
+    def __getitem__(self, key: Sequence[int]) -> Any:
+        tokens = tuple(key)
+        self.lookups += 1
+        found, length = self._longest_prefix(tokens)
+        if found is None:
+            self.misses += 1
+            raise KeyError("Key not found")
+        if found in self._ram:
+            state = self._ram[found]
+            self._ram.move_to_end(found)
+        else:
+            state = self._read_disk(found)
+            if state is None:
+                self.misses += 1
+                raise KeyError("Key not found")
+            self.disk_hits += 1
+            self._put_ram(found, state)
+        self._offered = (state, length)
+        return state
+
+    def confirm(self, state: Any) -> None:
+        """Record that ``state`` was restored. llama-cpp skips a state whose
+        prefix is no longer than what the context has already evaluated."""
+        if self._offered is not None and self._offered[0] is state:
+            self.hits += 1
+            self.saved_tokens += self._offered[1]
+            self._offered = None
+
+    def __contains__(self, key: Sequence[int]) -> bool:
+        return self._longest_prefix(tuple(key))[0] is not None
+
+    def __setitem__(self, key: Sequence[int], state: Any) -> None:
+        tokens = tuple(key)
+        self._ram.pop(tokens, None)
+        self._put_ram(tokens, state)
+
+    # ── Internals ────────────────────────────────────────────────────────────
+
+    @staticmethod
+    def _state_size(state: Any) -> int:
+        return int(getattr(state, "llama_state_size", 0) or 0)
+
+    def _longest_prefix(self, tokens: tuple[int, ...]) -> tuple[tuple[int, ...] | None, int]:
+        best: tuple[int, ...] | None = None
+        best_len = MIN_PREFIX_TOKENS - 1
+        for candidate in (*self._ram.keys(), *self._disk.keys()):
+            length = _common_prefix(candidate, tokens)
+            if length > best_len:
+                best, best_len = candidate, length
+        return best, (best_len if best is not None else 0)
+
+    def _put_ram(self, key: tuple[int, ...], state: Any) -> None:
+        self._ram[key] = state
+        while len(self._ram) > 1 and self.cache_size > self.capacity_bytes:
+            old_key, old_state = self._ram.popitem(last=False)
+            self._spill(old_key, old_state)
+
+    def _spill(self, key: tuple[int, ...], state: Any) -> None:
+        if self.disk_dir is None or key in self._disk:
+            return
+        name = _key_hash(key)
+        try:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.disk_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(state, f)
+            os.replace(tmp, self.disk_dir / f"{name}.state")
+            # Token list lives beside the state so the index loads without unpickling.
+            (self.disk_dir / f"{name}.tokens").write_text(json.dumps(list(key)), "utf-8")
+        except Exception:
+            logger.warning("Could not spill KV state to %s", self.disk_dir, exc_info=True)
+            return
+        self._disk[key] = name
+        self._trim_disk()
+
+    def _trim_disk(self) -> None:
+        while len(self._disk) > self.max_disk_entries:
+            oldest = next(iter(self._disk))
+            self._remove_disk(oldest)
+
+    def _remove_disk(self, key: tuple[int, ...]) -> None:
+        assert self.disk_dir is not None
+        name = self._disk.pop(key)
+        for suffix in (".state", ".tokens"):
+            (self.disk_dir / f"{name}{suffix}").unlink(missing_ok=True)
+
+    def _read_disk(self, key: tuple[int, ...]) -> Any | None:
+        assert self.disk_dir is not None
+        path = self.disk_dir / f"{self._disk[key]}.state"
+        try:
+            with path.open("rb") as f:
+                return pickle.load(f)
+        except Exception:
+            logger.warning("Dropping unreadable KV state %s", path, exc_info=True)
+            self._disk.pop(key, None)
+            return None
+
+    def _load_disk_index(self) -> None:
+        assert self.disk_dir is not None
+        if not self.disk_dir.is_dir():
+            return
+        # Oldest first, so the disk cap evicts in the order states were written.
+        for path in sorted(self.disk_dir.glob("*.tokens"), key=lambda p: p.stat().st_mtime):
+            if not path.with_suffix(".state").exists():
+                continue
+            try:
+                key = json.loads(path.read_text("utf-8"))
+            except (OSError, ValueError):
+                logger.debug("Ignoring unreadable KV index %s", path)
+                continue
+            self._disk[tuple(key)] = path.stem
+        # The directory may hold more than the cap (e.g. it was lowered).
+        self._trim_disk()
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.lookups
+        return {
+            "lookups": lookups,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "saved_tokens": self.saved_tokens,
+            "disk_hits": self.disk_hits,
+            "ram_entries": len(self._ram),
+            "ram_bytes": self.cache_size,
+            "disk_entries": len(self._disk),
+        }
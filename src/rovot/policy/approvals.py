@@ -1,6 +1,9 @@
 from __future__ import annotations
 
+import asyncio
+import heapq
 import json
+import os
 import time
 import uuid
 from dataclasses import asdict, dataclass
@@ -14,6 +17,15 @@ class ApprovalRequired(Exception):
         self.approval_id = approval_id
 
 
+class ApprovalDenied(Exception):
+    """A parked tool call was denied or its approval expired."""
+
+    def __init__(self, approval_id: str, status: str, message: str):
+        super().__init__(message)
+        self.approval_id = approval_id
+        self.status = status
+
+
 @dataclass
 class Approval:
     id: str
@@ -30,28 +42,148 @@ class Approval:
     consumed_at_ms: int | None = None
 
 
+def _final_ts(a: Approval) -> int:
+    """When ``a`` last changed state (for retention)."""
+    if a.status == "expired":
+        return a.expires_at_ms
+    return a.consumed_at_ms or a.resolved_at_ms or a.created_at_ms
+
+
 class ApprovalManager:
-    def __init__(self, path: Path):
+    """
+    Approval records kept in memory and persisted as snapshot + append-only log.
+
+    ``path`` holds a compact JSON snapshot; every change appends the updated
+    record to ``<path>.jsonl``, so a create/resolve/consume writes one line
+    instead of the whole history. The log is folded into a new snapshot after
+    ``snapshot_every`` entries, and decided/consumed/expired records older than
+    ``retention_ms`` are dropped then. Pending approvals are indexed separately
+    and expired from a min-heap on their deadline; ``wait`` lets a caller park
+    on one until it is decided.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        *,
+        retention_ms: int = 7 * 24 * 3600 * 1000,
+        snapshot_every: int = 256,
+    ):
         self._path = path
+        self._log_path = path.with_suffix(".jsonl")
+        self.retention_ms = retention_ms
+        self.snapshot_every = snapshot_every
         self._approvals: dict[str, Approval] = {}
+        self._pending: dict[str, Approval] = {}
+        self._deadlines: list[tuple[int, str]] = []  # min-heap of (expires_at_ms, id)
+        self._log_entries = 0
+        self._waiters: dict[str, asyncio.Future[str]] = {}
         self._load()
 
     def _load(self) -> None:
-        if not self._path.exists():
-            return
         try:
-            raw = json.loads(self._path.read_text("utf-8"))
-            for rec in raw:
-                a = Approval(**rec)
-                self._approvals[a.id] = a
+            if self._path.exists():
+                for rec in json.loads(self._path.read_text("utf-8")):
+                    a = Approval(**rec)
+                    self._approvals[a.id] = a
         except Exception:
             self._approvals = {}
+        if self._log_path.exists():
+            for line in self._log_path.read_text("utf-8").splitlines():
+                try:
+                    a = Approval(**json.loads(line))
+                except Exception:
+                    continue  # torn final line after a crash
+                self._approvals[a.id] = a
+                self._log_entries += 1
+        for a in self._approvals.values():
+            if a.status == "pending":
+                self._track(a)
+        if self._prune(int(time.time() * 1000)) or self._log_entries:
+            self._snapshot()
+
+    def _track(self, a: Approval) -> None:
+        self._pending[a.id] = a
+        heapq.heappush(self._deadlines, (a.expires_at_ms, a.id))
 
-    def _save(self) -> None:
+    def _append(self, a: Approval) -> None:
+        self._log_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._log_path.open("a", encoding="utf-8") as f:
+            f.write(json.dumps(asdict(a), ensure_ascii=False) + "\n")
+        self._log_entries += 1
+        if self._log_entries >= self.snapshot_every:
+            self._prune(int(time.time() * 1000))
+            self._snapshot()
+
+    def _snapshot(self) -> None:
         self._path.parent.mkdir(parents=True, exist_ok=True)
-        self._path.write_text(
-            json.dumps([asdict(a) for a in self._approvals.values()], indent=2), "utf-8"
-        )
+        tmp = self._path.with_suffix(".tmp")
+        tmp.write_text(json.dumps([asdict(a) for a in self._approvals.values()]), "utf-8")
+        os.replace(tmp, self._path)
+        self._log_path.unlink(missing_ok=True)
+        self._log_entries = 0
+
+    def _expire(self, now: int) -> None:
+        while self._deadlines and self._deadlines[0][0] < now:
+            _, approval_id = heapq.heappop(self._deadlines)
+            a = self._pending.pop(approval_id, None)
+            if a is not None and a.status == "pending":
+                a.status = "expired"
+                self._append(a)
+                self._settle(a)
+
+    def _settle(self, a: Approval) -> None:
+        fut = self._waiters.pop(a.id, None)
+        if fut is not None and not fut.done():
+            fut.set_result(a.status)
+
+    def is_awaited(self, approval_id: str) -> bool:
+        """True if a caller is parked in ``wait`` for ``approval_id``."""
+        return approval_id in self._waiters
+
+    async def wait(self, approval_id: str) -> str:
+        """Wait until ``approval_id`` is decided or expires; returns its status."""
+        a = self._approvals.get(approval_id)
+        if a is None:
+            return "expired"
+        if a.status != "pending":
+            return a.status
+        fut = self._waiters.get(approval_id)
+        if fut is None:
+            fut = asyncio.get_running_loop().create_future()
+            self._waiters[approval_id] = fut
+        timeout = max(0.0, (a.expires_at_ms - int(time.time() * 1000)) / 1000)
+        try:
+            return await asyncio.wait_for(asyncio.shield(fut), timeout)
+        except asyncio.TimeoutError:
+            self._expire(max(int(time.time() * 1000), a.expires_at_ms + 1))
+            return a.status
+        finally:
+            if not fut.done() and self._waiters.get(approval_id) is fut:
+                del self._waiters[approval_id]  # caller went away (e.g. client disconnected)
+
+    def _prune(self, now: int) -> int:
+        cutoff = now - self.retention_ms
+        stale = [
+            a.id
+            for a in self._approvals.values()
+            if a.status != "pending" and _final_ts(a) < cutoff
+        ]
+        for approval_id in stale:
+            del self._approvals[approval_id]
+        return len(stale)
+
+    def gc(self, now: int | None = None) -> int:
+        """Expire overdue approvals and drop finished ones older than ``retention_ms``.
+
+        Returns how many records were dropped.
+        """
+        now = now if now is not None else int(time.time() * 1000)
+        self._expire(now)
+        dropped = self._prune(now)
+        if dropped:
+            self._snapshot()
+        return dropped
 
     def create(
         self,
@@ -75,19 +207,13 @@ class ApprovalManager:
             tool_call_id=tool_call_id,
         )
         self._approvals[a.id] = a
-        self._save()
+        self._track(a)
+        self._append(a)
         return a
 
     def pending(self) -> list[Approval]:
-        now = int(time.time() * 1000)
-        out: list[Approval] = []
-        for a in self._approvals.values():
-            if a.status == "pending" and now <= a.expires_at_ms:
-                out.append(a)
-            elif a.status == "pending" and now > a.expires_at_ms:
-                a.status = "expired"
-        self._save()
-        return out
+        self._expire(int(time.time() * 1000))
+        return list(self._pending.values())
 
     def get(self, approval_id: str) -> Approval | None:
         return self._approvals.get(approval_id)
@@ -99,7 +225,7 @@ class ApprovalManager:
             return False
         a.status = "consumed"
         a.consumed_at_ms = int(time.time() * 1000)
-        self._save()
+        self._append(a)
         return True
 
     def resolve(
@@ -111,12 +237,16 @@ class ApprovalManager:
         now = int(time.time() * 1000)
         if now > a.expires_at_ms:
             a.status = "expired"
-            self._save()
+            self._pending.pop(a.id, None)
+            self._append(a)
+            self._settle(a)
             return False
         if decision not in ("allow", "deny"):
             return False
         a.status = decision
         a.resolved_by = resolved_by
         a.resolved_at_ms = now
-        self._save()
+        self._pending.pop(a.id, None)
+        self._append(a)
+        self._settle(a)
         return True
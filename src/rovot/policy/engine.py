@@ -1,9 +1,14 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Any
+from typing import Any, Callable
 
-from rovot.policy.approvals import ApprovalManager, ApprovalRequired
+from rovot.policy.approvals import (
+    Approval,
+    ApprovalDenied,
+    ApprovalManager,
+    ApprovalRequired,
+)
 from rovot.policy.scopes import OPERATOR_APPROVALS, OPERATOR_WRITE
 
 
@@ -24,7 +29,7 @@ class PolicyEngine:
     def enforce_write_scope(self, ctx: AuthContext) -> None:
         self.require_scope(ctx, OPERATOR_WRITE)
 
-    def maybe_require_approval(
+    async def maybe_require_approval(
         self,
         *,
         ctx: AuthContext,
@@ -34,7 +39,17 @@ class PolicyEngine:
         summary: str,
         require: bool,
         tool_call_id: str | None = None,
+        on_approval: Callable[[Approval], None] | None = None,
     ) -> None:
+        """
+        Gate a tool call on user approval.
+
+        Without ``on_approval`` the call is rejected with ``ApprovalRequired`` and
+        must be resumed via ``/chat/continue``. With it, the call is parked until
+        the approval is resolved: ``on_approval`` is called once when the approval
+        is created and again once it is decided. Returns if allowed (consuming the
+        approval); raises ``ApprovalDenied`` if denied or expired.
+        """
         if not require:
             return
         self.require_scope(ctx, OPERATOR_APPROVALS)
@@ -45,4 +60,12 @@ class PolicyEngine:
             tool_arguments=tool_args,
             tool_call_id=tool_call_id,
         )
-        raise ApprovalRequired(approval.id, f"Approval required: {summary}")
+        if on_approval is None:
+            raise ApprovalRequired(approval.id, f"Approval required: {summary}")
+        on_approval(approval)
+        status = await self._approvals.wait(approval.id)
+        on_approval(approval)
+        if status == "allow" and self._approvals.consume(approval.id):
+            return
+        verb = "denied" if status == "deny" else status
+        raise ApprovalDenied(approval.id, status, f"Approval {verb}: {summary}")
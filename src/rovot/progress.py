@@ -0,0 +1,111 @@
+"""
+Rate-limited progress events with throughput and ETA.
+
+``ProgressReporter`` is fed every increment (e.g. each downloaded chunk) but
+only emits when ``interval`` seconds have passed or progress moved by at least
+``min_step``, so a multi-gigabyte download produces a few hundred events
+instead of one per chunk.
+"""
+
+from __future__ import annotations
+
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+Emit = Callable[[str, dict[str, Any]], Awaitable[None]]
+
+# Weight of the newest sample in the smoothed throughput.
+_RATE_SMOOTHING = 0.3
+
+
+class ProgressReporter:
+    def __init__(
+        self,
+        emit: Emit,
+        event: str,
+        subject: dict[str, Any],
+        total: int,
+        *,
+        interval: float = 0.5,
+        min_step: float = 0.01,
+        done_key: str = "done",
+        total_key: str = "total",
+        clock: Callable[[], float] = time.monotonic,
+        start: int = 0,
+    ):
+        self._emit = emit
+        self.event = event
+        self.subject = subject
+        self.total = total
+        self.interval = interval
+        self.min_step = min_step
+        self._done_key = done_key
+        self._total_key = total_key
+        self._clock = clock
+        # ``start`` is work already done (e.g. a resumed download); it counts
+        # towards progress but not towards throughput.
+        self.done = start
+        self.emitted = 0
+        self.rate = 0.0  # smoothed units per second
+        self._started = clock()
+        self._last_at = self._started
+        self._last_done = start
+        self._last_progress = self.progress
+
+    @property
+    def progress(self) -> float:
+        return min(self.done / self.total, 1.0) if self.total else 0.0
+
+    def _due(self, now: float) -> bool:
+        if now - self._last_at >= self.interval:
+            return True
+        return bool(self.total) and self.progress - self._last_progress >= self.min_step
+
+    def payload(self, extra: dict[str, Any] | None = None) -> dict[str, Any]:
+        eta = None
+        if self.rate > 0 and self.total:
+            eta = round(max(self.total - self.done, 0) / self.rate, 1)
+        return {
+            **self.subject,
+            "progress": round(self.progress, 4),
+            self._done_key: self.done,
+            self._total_key: self.total,
+            "bytes_per_sec": round(self.rate),
+            "eta_seconds": eta,
+            "elapsed_seconds": round(self._clock() - self._started, 1),
+            **(extra or {}),
+        }
+
+    def _sample(self, now: float) -> None:
+        elapsed = now - self._last_at
+        if elapsed > 0:
+            instant = (self.done - self._last_done) / elapsed
+            self.rate = instant if not self.emitted else (
+                _RATE_SMOOTHING * instant + (1 - _RATE_SMOOTHING) * self.rate
+            )
+        self._last_at = now
+        self._last_done = self.done
+        self._last_progress = self.progress
+
+    async def advance(self, n: int) -> None:
+        """Record ``n`` more units done; emits only when due."""
+        await self.update(self.done + n)
+
+    async def update(self, done: int, extra: dict[str, Any] | None = None) -> None:
+        """Set the absolute amount done; emits only when due."""
+        self.done = done
+        now = self._clock()
+        if not self._due(now):
+            return
+        self._sample(now)
+        self.emitted += 1
+        await self._emit(self.event, self.payload(extra))
+
+    async def finish(self, extra: dict[str, Any] | None = None) -> None:
+        """Emit a final event at 100% regardless of cadence."""
+        if self.total:
+            self.done = max(self.done, self.total)
+        self._sample(self._clock())
+        self.emitted += 1
+        await self._emit(self.event, self.payload(extra))
@@ -6,6 +6,7 @@ loop is decoupled from any specific API.
 
 from __future__ import annotations
 
+import json
 from collections.abc import AsyncIterator
 from dataclasses import dataclass, field
 from typing import Any, Protocol, runtime_checkable
@@ -18,6 +19,65 @@ class ChatResponse:
     usage: dict[str, int] = field(default_factory=dict)
 
 
+@dataclass
+class StreamEvent:
+    """One structured event from a streaming completion.
+
+    type is one of:
+      - "text": ``text`` holds a content delta
+      - "tool_call": a fragment of tool call ``index`` (``id``/``name`` are set on
+        the first fragment; ``arguments`` is a partial JSON string)
+      - "finish": ``finish_reason`` is set
+      - "usage": ``usage`` holds token counts
+    """
+
+    type: str
+    text: str = ""
+    index: int = 0
+    id: str = ""
+    name: str = ""
+    arguments: str = ""
+    finish_reason: str | None = None
+    usage: dict[str, int] = field(default_factory=dict)
+
+
+def parse_tool_arguments(args_raw: Any) -> dict[str, Any]:
+    """Decode a tool call's ``arguments`` the way OpenAI-compatible servers send them."""
+    if isinstance(args_raw, str):
+        try:
+            return json.loads(args_raw) if args_raw.strip() else {}
+        except Exception:
+            return {"_raw": args_raw}
+    if isinstance(args_raw, dict):
+        return args_raw
+    return {"_raw": str(args_raw)}
+
+
+class ToolCallAssembler:
+    """Accumulates streamed tool-call fragments into complete tool calls."""
+
+    def __init__(self) -> None:
+        self._calls: dict[int, dict[str, str]] = {}
+
+    def add(self, event: StreamEvent) -> None:
+        call = self._calls.setdefault(event.index, {"id": "", "name": "", "arguments": ""})
+        if event.id:
+            call["id"] = event.id
+        if event.name:
+            call["name"] += event.name
+        call["arguments"] += event.arguments
+
+    def tool_calls(self) -> list[dict[str, Any]]:
+        return [
+            {
+                "id": call["id"],
+                "name": call["name"],
+                "arguments": parse_tool_arguments(call["arguments"]),
+            }
+            for _, call in sorted(self._calls.items())
+        ]
+
+
 @runtime_checkable
 class Provider(Protocol):
     async def chat(
@@ -32,6 +92,12 @@ class Provider(Protocol):
         tools: list[dict[str, Any]] | None = None,
     ) -> AsyncIterator[str]: ...
 
+    async def stream_events(
+        self,
+        messages: list[dict[str, Any]],
+        tools: list[dict[str, Any]] | None = None,
+    ) -> AsyncIterator[StreamEvent]: ...
+
     async def list_models(self) -> list[str]: ...
 
     def supports_tools(self) -> bool: ...
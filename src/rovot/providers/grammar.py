@@ -0,0 +1,157 @@
+"""
+Compile tool JSON schemas into a llama.cpp GBNF grammar.
+
+The grammar lets the built-in model answer either with plain text or with a
+tool-call envelope::
+
+    {"tool_calls": [{"name": "<tool>", "arguments": {...}}]}
+
+where each ``arguments`` object must match that tool's parameter schema, so
+every generated call parses on the first try.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from typing import Any
+
+_PRIMITIVES = r"""
+ws ::= [ \t\n]*
+hex ::= [0-9a-fA-F]
+string ::= "\"" ( [^"\\\x7F\x00-\x1F] | "\\" ( ["\\/bfnrt] | "u" hex hex hex hex ) )* "\""
+integer ::= "-"? ( [0-9] | [1-9] [0-9]* )
+number ::= integer ( "." [0-9]+ )? ( [eE] [-+]? [0-9]+ )?
+boolean ::= "true" | "false"
+null ::= "null"
+value ::= object | array | string | number | boolean | null
+object ::= "{" ws ( string ws ":" ws value ( ws "," ws string ws ":" ws value )* )? ws "}"
+array ::= "[" ws ( value ( ws "," ws value )* )? ws "]"
+"""
+
+# Plain-text answers may not start with "{" (or whitespace before one), which
+# keeps them distinguishable from a tool call.
+_TEXT_RULE = r"text ::= [^{ \t\r\n] [^\x00]*"
+
+_RESERVED = {"root", "calls", "call", "text", "ws", "hex", "value", "object", "array"}
+
+_TYPE_RULES = {
+    "string": "string",
+    "integer": "integer",
+    "number": "number",
+    "boolean": "boolean",
+    "null": "null",
+}
+
+
+def _literal(text: str) -> str:
+    """GBNF string literal matching ``text`` exactly."""
+    escaped = text.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return f'"{escaped}"'
+
+
+def _json_literal(value: Any) -> str:
+    return _literal(json.dumps(value))
+
+
+class _GrammarBuilder:
+    def __init__(self) -> None:
+        self.rules: dict[str, str] = {}
+
+    def _rule_name(self, hint: str) -> str:
+        base = re.sub(r"[^a-zA-Z0-9]+", "-", hint).strip("-").lower() or "rule"
+        name, n = base, 1
+        while name in self.rules or name in _TYPE_RULES or name in _RESERVED:
+            n += 1
+            name = f"{base}-{n}"
+        return name
+
+    def _add(self, hint: str, body: str) -> str:
+        name = self._rule_name(hint)
+        self.rules[name] = body
+        return name
+
+    def visit(self, schema: Any, hint: str) -> str:
+        """Return a GBNF expression matching JSON values valid for ``schema``."""
+        if not isinstance(schema, dict):
+            return "value"
+        if "const" in schema:
+            return _json_literal(schema["const"])
+        if "enum" in schema:
+            return "( " + " | ".join(_json_literal(v) for v in schema["enum"]) + " )"
+        for key in ("anyOf", "oneOf"):
+            if key in schema:
+                alts = [self.visit(s, f"{hint}-{i}") for i, s in enumerate(schema[key])]
+                return "( " + " | ".join(alts) + " )"
+        typ = schema.get("type")
+        if isinstance(typ, list):
+            alts = [self.visit({**schema, "type": t}, f"{hint}-{t}") for t in typ]
+            return "( " + " | ".join(alts) + " )"
+        if typ == "object" or (typ is None and "properties" in schema):
+            return self._object(schema, hint)
+        if typ == "array":
+            item = self.visit(schema.get("items"), f"{hint}-item")
+            return self._add(hint, f'"[" ws ( {item} ( ws "," ws {item} )* )? ws "]"')
+        return _TYPE_RULES.get(str(typ), "value")
+
+    def _object(self, schema: dict[str, Any], hint: str) -> str:
+        props: dict[str, Any] = schema.get("properties") or {}
+        if not props:
+            return "object"
+        required = set(schema.get("required") or [])
+        names = list(props)
+        pairs = [
+            f"{_json_literal(name)} ws \":\" ws {self.visit(props[name], f'{hint}-{name}')}"
+            for name in names
+        ]
+
+        # Keys are emitted in declared order; optional keys may be skipped.
+        def after(i: int) -> str:
+            parts = []
+            for j in range(i, len(names)):
+                item = f'ws "," ws {pairs[j]}'
+                parts.append(item if names[j] in required else f"( {item} )?")
+            return " ".join(parts)
+
+        def first(i: int) -> str | None:
+            if i == len(names):
+                return None
+            head = f"{pairs[i]} {after(i + 1)}".strip()
+            if names[i] in required:
+                return head
+            rest = first(i + 1)
+            return f"( {head} )?" if rest is None else f"( {head} | {rest} )"
+
+        body = first(0)
+        return self._add(hint, f'"{{" ws {body} ws "}}"')
+
+
+def tool_call_grammar(tools: list[dict[str, Any]]) -> str:
+    """
+    Build a GBNF grammar for ``ToolRegistry.definitions()``-style tool specs.
+
+    The root accepts either free text or a ``{"tool_calls": [...]}`` envelope
+    whose calls name one of ``tools`` with schema-valid arguments.
+    """
+    builder = _GrammarBuilder()
+    calls = []
+    for tool in tools:
+        fn = tool.get("function", tool)
+        name = fn["name"]
+        args = builder.visit(fn.get("parameters") or {"type": "object"}, f"{name}-args")
+        calls.append(
+            builder._add(
+                f"call-{name}",
+                f'"{{" ws "\\"name\\"" ws ":" ws {_json_literal(name)} ws "," ws '
+                f'"\\"arguments\\"" ws ":" ws {args} ws "}}"',
+            )
+        )
+    lines = [
+        "root ::= calls | text",
+        'calls ::= "{" ws "\\"tool_calls\\"" ws ":" ws '
+        '"[" ws call ( ws "," ws call )* ws "]" ws "}"',
+        "call ::= " + " | ".join(calls),
+        _TEXT_RULE,
+    ]
+    lines += [f"{name} ::= {body}" for name, body in builder.rules.items()]
+    return "\n".join(lines) + "\n" + _PRIMITIVES.lstrip("\n")
@@ -0,0 +1,99 @@
+"""Process-wide pool of httpx clients for model providers.
+
+One ``httpx.AsyncClient`` is kept per base URL so multi-iteration agent loops
+reuse warm keep-alive (and optionally HTTP/2) connections instead of paying
+TCP/TLS setup on every model call. A client is replaced, and the old one
+closed, when the pool settings change or it is used from another event loop.
+Clients are closed in the app lifespan.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+
+import httpx
+
+from rovot.config import HttpPoolConfig
+
+logger = logging.getLogger(__name__)
+
+# base URL -> (client, event loop it was created on, pool settings)
+_clients: dict[str, tuple[httpx.AsyncClient, asyncio.AbstractEventLoop | None, tuple]] = {}
+# Closes of replaced clients still in flight.
+_closing: set[asyncio.Task[None]] = set()
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401  # type: ignore[import]
+    except ImportError:
+        return False
+    return True
+
+
+def _discard(
+    client: httpx.AsyncClient,
+    owner: asyncio.AbstractEventLoop | None,
+    current: asyncio.AbstractEventLoop | None,
+) -> None:
+    """Close a replaced client on the loop that owns its connections."""
+    if client.is_closed or owner is None or owner.is_closed():
+        return  # nothing to close, or its loop (and sockets) is already gone
+    if owner is current:
+        task = owner.create_task(client.aclose())
+        _closing.add(task)
+        task.add_done_callback(_closing.discard)
+    elif owner.is_running():
+        asyncio.run_coroutine_threadsafe(client.aclose(), owner)
+
+
+def get_http_client(base_url: str, pool: HttpPoolConfig | None = None) -> httpx.AsyncClient:
+    """Return the shared client for ``base_url``, creating it on first use.
+
+    Must be called from the event loop that will use the client; pooled
+    connections cannot be shared across loops.
+    """
+    pool = pool or HttpPoolConfig()
+    try:
+        loop: asyncio.AbstractEventLoop | None = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+    key = base_url.rstrip("/")
+    settings = (
+        pool.max_connections,
+        pool.max_keepalive_connections,
+        pool.keepalive_expiry,
+        pool.http2,
+    )
+    entry = _clients.get(key)
+    if entry is not None:
+        client, owner, old_settings = entry
+        if not client.is_closed and owner is loop and old_settings == settings:
+            return client
+        _discard(client, owner, loop)
+    http2 = pool.http2
+    if http2 and not _http2_available():
+        logger.warning("HTTP/2 requested for %s but the 'h2' package is not installed", base_url)
+        http2 = False
+    client = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=pool.max_connections,
+            max_keepalive_connections=pool.max_keepalive_connections,
+            keepalive_expiry=pool.keepalive_expiry,
+        ),
+        http2=http2,
+    )
+    _clients[key] = (client, loop, settings)
+    return client
+
+
+async def close_http_clients() -> None:
+    """Call at daemon shutdown to close all pooled connections."""
+    clients = [client for client, _, _ in _clients.values()]
+    _clients.clear()
+    for client in clients:
+        try:
+            await client.aclose()
+        except Exception:
+            logger.debug("Error closing HTTP client", exc_info=True)
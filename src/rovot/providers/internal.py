@@ -2,52 +2,179 @@
 
 from __future__ import annotations
 
+import json
+import uuid
 from collections.abc import AsyncIterator
 from typing import Any
 
-from rovot.internal_model import get_internal_provider
-from rovot.providers.base import ChatResponse
+from rovot.internal_model import get_internal_provider, requested_model
+from rovot.providers.base import ChatResponse, StreamEvent
+from rovot.providers.grammar import tool_call_grammar
+
+
+def _tool_prompt(tools: list[dict[str, Any]]) -> str:
+    lines = ["\n\nYou can call these tools:"]
+    for tool in tools:
+        fn = tool.get("function", tool)
+        lines.append(f"- {fn['name']}: {fn.get('description', '')}")
+        lines.append(f"  parameters: {json.dumps(fn.get('parameters') or {})}")
+    lines.append(
+        'To call tools, reply with only this JSON: {"tool_calls": [{"name": "<tool>", '
+        '"arguments": {...}}]}. Otherwise reply in plain text.'
+    )
+    return "\n".join(lines)
+
+
+def _adapt_messages(
+    messages: list[dict[str, Any]], tools: list[dict[str, Any]]
+) -> list[dict[str, Any]]:
+    """
+    Rewrite an OpenAI-style transcript for a llama.cpp chat template.
+
+    Tool specs go into the system prompt, earlier tool calls become the JSON the
+    model would have produced, and tool results become user turns (most GGUF
+    templates have no ``tool`` role).
+    """
+    out: list[dict[str, Any]] = []
+    names: dict[str, str] = {}
+    for msg in messages:
+        role = msg.get("role")
+        if role == "system":
+            content = str(msg.get("content") or "") + _tool_prompt(tools)
+            out.append({"role": "system", "content": content})
+        elif role == "assistant" and msg.get("tool_calls"):
+            calls = []
+            for tc in msg["tool_calls"]:
+                fn = tc.get("function") or tc
+                names[tc.get("id", "")] = fn.get("name", "")
+                calls.append({"name": fn.get("name", ""), "arguments": fn.get("arguments", {})})
+            out.append({"role": "assistant", "content": json.dumps({"tool_calls": calls})})
+        elif role == "tool":
+            name = names.get(msg.get("tool_call_id", ""), "tool")
+            out.append({"role": "user", "content": f"[{name} result]\n{msg.get('content', '')}"})
+        else:
+            out.append(msg)
+    if not out or out[0].get("role") != "system":
+        out.insert(0, {"role": "system", "content": _tool_prompt(tools).lstrip()})
+    return out
+
+
+def _parse_tool_calls(text: str) -> list[dict[str, Any]] | None:
+    """Return tool calls if ``text`` is a tool-call envelope, else None."""
+    if not text.lstrip().startswith("{"):
+        return None
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return None  # e.g. cut off by max_tokens
+    calls = data.get("tool_calls") if isinstance(data, dict) else None
+    if not isinstance(calls, list):
+        return None
+    return [
+        {
+            "id": f"call_{uuid.uuid4().hex[:12]}",
+            "name": call.get("name", ""),
+            "arguments": call.get("arguments") or {},
+        }
+        for call in calls
+        if isinstance(call, dict)
+    ]
 
 
 class InternalProvider:
     """
     Wraps InternalModelProvider to satisfy the Provider protocol.
 
-    Uses llama-cpp-python in-process — no HTTP calls made.
+    Uses llama-cpp-python in-process — no HTTP calls made. When tools are
+    given, generation is constrained by a GBNF grammar built from their
+    schemas, so tool calls always parse.
     """
 
-    async def chat(
-        self, messages: list[dict[str, Any]], tools: list[dict[str, Any]] | None = None
-    ) -> ChatResponse:
+    async def _chunks(
+        self, messages: list[dict[str, Any]], tools: list[dict[str, Any]] | None
+    ) -> AsyncIterator[str]:
         provider = get_internal_provider()
-        if not provider.is_loaded():
+        model = requested_model.get()
+        if model is None and not provider.is_loaded():
             raise RuntimeError(
                 "No built-in model loaded. "
                 "Go to Models > Built-in Models and load a model first."
             )
+        if model is not None:
+            await provider.ensure_model(model)
+        kwargs: dict[str, Any] = {"model": model}
+        if tools:
+            messages = _adapt_messages(messages, tools)
+            kwargs["grammar"] = tool_call_grammar(tools)
+        async for chunk in provider.chat_stream(messages, **kwargs):
+            yield chunk
+
+    async def chat(
+        self, messages: list[dict[str, Any]], tools: list[dict[str, Any]] | None = None
+    ) -> ChatResponse:
         # Collect streaming tokens — still needed for the non-streaming /chat endpoint
         chunks: list[str] = []
-        async for chunk in provider.chat_stream(messages):
+        async for chunk in self._chunks(messages, tools):
             chunks.append(chunk)
-        return ChatResponse(content="".join(chunks), tool_calls=[], usage={})
+        content = "".join(chunks)
+        tool_calls = _parse_tool_calls(content) if tools else None
+        if tool_calls:
+            return ChatResponse(content="", tool_calls=tool_calls, usage={})
+        return ChatResponse(content=content, tool_calls=[], usage={})
 
     async def stream(
         self, messages: list[dict[str, Any]], tools: list[dict[str, Any]] | None = None
     ) -> AsyncIterator[str]:
         """True token-by-token streaming from llama-cpp-python."""
-        provider = get_internal_provider()
-        if not provider.is_loaded():
-            raise RuntimeError("No built-in model loaded.")
-        async for chunk in provider.chat_stream(messages):
+        async for chunk in self._chunks(messages, None):
             yield chunk
 
+    async def stream_events(
+        self, messages: list[dict[str, Any]], tools: list[dict[str, Any]] | None = None
+    ) -> AsyncIterator[StreamEvent]:
+        # Text streams as it is generated. Output starting with "{" is a tool-call
+        # envelope (the grammar forbids text from starting that way) and is
+        # buffered until complete.
+        buffered = ""
+        is_call: bool | None = None if tools else False
+        async for chunk in self._chunks(messages, tools):
+            if is_call is None:
+                buffered += chunk
+                stripped = buffered.lstrip()
+                if not stripped:
+                    continue
+                is_call = stripped.startswith("{")
+                if not is_call:
+                    yield StreamEvent(type="text", text=buffered)
+                continue
+            if is_call:
+                buffered += chunk
+            else:
+                yield StreamEvent(type="text", text=chunk)
+
+        tool_calls = _parse_tool_calls(buffered) if is_call else None
+        if tool_calls:
+            for i, tc in enumerate(tool_calls):
+                yield StreamEvent(
+                    type="tool_call",
+                    index=i,
+                    id=tc["id"],
+                    name=tc["name"],
+                    arguments=json.dumps(tc["arguments"]),
+                )
+            yield StreamEvent(type="finish", finish_reason="tool_calls")
+            return
+        if is_call and buffered:
+            yield StreamEvent(type="text", text=buffered)
+        yield StreamEvent(type="finish", finish_reason="stop")
+
     async def list_models(self) -> list[str]:
         provider = get_internal_provider()
         name = provider.loaded_model_name()
         return [name] if name else []
 
     def supports_tools(self) -> bool:
-        return False
+        return True
 
     def supports_streaming(self) -> bool:
         return True
@@ -6,18 +6,29 @@ from typing import Any
 
 import httpx
 
-from rovot.providers.base import ChatResponse
+from rovot.config import HttpPoolConfig
+from rovot.providers.base import ChatResponse, StreamEvent, parse_tool_arguments
+from rovot.providers.http_pool import get_http_client
 
 
 class OpenAICompatProvider:
     def __init__(
-        self, base_url: str, api_key: str = "", model: str = "", timeout: float = 120.0
+        self,
+        base_url: str,
+        api_key: str = "",
+        model: str = "",
+        timeout: float = 120.0,
+        pool: HttpPoolConfig | None = None,
     ):
         self._base_url = base_url.rstrip("/")
         self._api_key = api_key
         self._model = model
         self._resolved_model = ""
         self._timeout = timeout
+        self._pool = pool
+
+    def _client(self) -> httpx.AsyncClient:
+        return get_http_client(self._base_url, self._pool)
 
     def _headers(self) -> dict[str, str]:
         h: dict[str, str] = {"Content-Type": "application/json"}
@@ -31,39 +42,31 @@ class OpenAICompatProvider:
         payload: dict[str, Any] = {"messages": messages, "model": await self._model_for_request()}
         if tools:
             payload["tools"] = tools
-        async with httpx.AsyncClient(timeout=self._timeout) as client:
-            try:
-                resp = await client.post(
-                    f"{self._base_url}/chat/completions",
-                    json=payload,
-                    headers=self._headers(),
-                )
-                resp.raise_for_status()
-                data = resp.json()
-            except httpx.HTTPStatusError as exc:
-                body = exc.response.text[:500] if exc.response is not None else ""
-                detail = body or str(exc)
-                raise RuntimeError(
-                    f"{self._base_url}/chat/completions returned HTTP {exc.response.status_code}: {detail}"
-                ) from exc
-            except httpx.HTTPError as exc:
-                raise RuntimeError(
-                    f"Failed to reach model provider at {self._base_url}: {exc}"
-                ) from exc
+        try:
+            resp = await self._client().post(
+                f"{self._base_url}/chat/completions",
+                json=payload,
+                headers=self._headers(),
+                timeout=self._timeout,
+            )
+            resp.raise_for_status()
+            data = resp.json()
+        except httpx.HTTPStatusError as exc:
+            body = exc.response.text[:500] if exc.response is not None else ""
+            detail = body or str(exc)
+            raise RuntimeError(
+                f"{self._base_url}/chat/completions returned HTTP "
+                f"{exc.response.status_code}: {detail}"
+            ) from exc
+        except httpx.HTTPError as exc:
+            raise RuntimeError(
+                f"Failed to reach model provider at {self._base_url}: {exc}"
+            ) from exc
         msg = data["choices"][0]["message"]
         tool_calls: list[dict[str, Any]] = []
         for tc in msg.get("tool_calls") or []:
             fn = tc.get("function") or {}
-            args_raw = fn.get("arguments", "{}")
-            if isinstance(args_raw, str):
-                try:
-                    args = json.loads(args_raw) if args_raw.strip() else {}
-                except Exception:
-                    args = {"_raw": args_raw}
-            elif isinstance(args_raw, dict):
-                args = args_raw
-            else:
-                args = {"_raw": str(args_raw)}
+            args = parse_tool_arguments(fn.get("arguments", "{}"))
             tool_calls.append(
                 {"id": tc.get("id", ""), "name": fn.get("name", ""), "arguments": args}
             )
@@ -87,55 +90,70 @@ class OpenAICompatProvider:
         )
 
     async def list_models(self) -> list[str]:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            resp = await client.get(f"{self._base_url}/models", headers=self._headers())
-            resp.raise_for_status()
-            data = resp.json()
+        resp = await self._client().get(
+            f"{self._base_url}/models", headers=self._headers(), timeout=10.0
+        )
+        resp.raise_for_status()
+        data = resp.json()
         return [m["id"] for m in data.get("data") or [] if "id" in m]
 
     async def chat_stream(
         self, messages: list[dict[str, Any]], tools: list[dict[str, Any]] | None = None
     ) -> AsyncIterator[str]:
         """Stream tokens from chat completions endpoint. Yields text delta chunks."""
+        async for event in self.chat_events(messages, tools):
+            if event.type == "text":
+                yield event.text
+
+    async def chat_events(
+        self, messages: list[dict[str, Any]], tools: list[dict[str, Any]] | None = None
+    ) -> AsyncIterator[StreamEvent]:
+        """Stream a completion as structured events (text, tool-call fragments, finish, usage).
+
+        Tool calls arrive as ``delta.tool_calls`` fragments; assemble them with
+        ``ToolCallAssembler`` so a single request yields both text and tool calls.
+        """
         payload: dict[str, Any] = {
             "messages": messages,
             "model": await self._model_for_request(),
             "stream": True,
+            "stream_options": {"include_usage": True},
         }
         if tools:
             payload["tools"] = tools
-        async with httpx.AsyncClient(timeout=self._timeout) as client:
-            try:
-                async with client.stream(
-                    "POST",
-                    f"{self._base_url}/chat/completions",
-                    json=payload,
-                    headers=self._headers(),
-                ) as response:
-                    response.raise_for_status()
-                    async for line in response.aiter_lines():
-                        if not line.startswith("data: "):
-                            continue
-                        data = line[6:]
-                        if data.strip() == "[DONE]":
-                            return
-                        try:
-                            chunk = json.loads(data)
-                        except json.JSONDecodeError:
-                            continue
-                        delta = chunk.get("choices", [{}])[0].get("delta", {})
-                        content = delta.get("content")
-                        if content:
-                            yield content
-            except httpx.HTTPStatusError as exc:
-                body = exc.response.text[:500] if exc.response is not None else ""
-                raise RuntimeError(
-                    f"{self._base_url}/chat/completions stream returned HTTP {exc.response.status_code}: {body}"
-                ) from exc
-            except httpx.HTTPError as exc:
-                raise RuntimeError(
-                    f"Failed to reach model provider at {self._base_url}: {exc}"
-                ) from exc
+        try:
+            async with self._client().stream(
+                "POST",
+                f"{self._base_url}/chat/completions",
+                json=payload,
+                headers=self._headers(),
+                timeout=self._timeout,
+            ) as response:
+                if response.is_error:
+                    await response.aread()
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line.startswith("data: "):
+                        continue
+                    data = line[6:]
+                    if data.strip() == "[DONE]":
+                        return
+                    try:
+                        chunk = json.loads(data)
+                    except json.JSONDecodeError:
+                        continue
+                    for event in _chunk_events(chunk):
+                        yield event
+        except httpx.HTTPStatusError as exc:
+            body = exc.response.text[:500] if exc.response is not None else ""
+            raise RuntimeError(
+                f"{self._base_url}/chat/completions stream returned HTTP "
+                f"{exc.response.status_code}: {body}"
+            ) from exc
+        except httpx.HTTPError as exc:
+            raise RuntimeError(
+                f"Failed to reach model provider at {self._base_url}: {exc}"
+            ) from exc
 
     def supports_tools(self) -> bool:
         return True
@@ -145,3 +163,31 @@ class OpenAICompatProvider:
 
     def supports_vision(self) -> bool:
         return False
+
+
+def _chunk_events(chunk: dict[str, Any]) -> list[StreamEvent]:
+    events: list[StreamEvent] = []
+    for choice in chunk.get("choices") or []:
+        delta = choice.get("delta") or {}
+        content = delta.get("content")
+        if content:
+            events.append(StreamEvent(type="text", text=content))
+        for i, tc in enumerate(delta.get("tool_calls") or []):
+            fn = tc.get("function") or {}
+            args = fn.get("arguments") or ""
+            if not isinstance(args, str):
+                args = json.dumps(args)
+            events.append(
+                StreamEvent(
+                    type="tool_call",
+                    index=tc.get("index", i),
+                    id=tc.get("id") or "",
+                    name=fn.get("name") or "",
+                    arguments=args,
+                )
+            )
+        if choice.get("finish_reason"):
+            events.append(StreamEvent(type="finish", finish_reason=choice["finish_reason"]))
+    if chunk.get("usage"):
+        events.append(StreamEvent(type="usage", usage=chunk["usage"]))
+    return events
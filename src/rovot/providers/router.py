@@ -5,7 +5,7 @@ from dataclasses import dataclass, field
 from typing import Any
 
 from rovot.config import ModelProviderMode
-from rovot.providers.base import ChatResponse
+from rovot.providers.base import ChatResponse, StreamEvent
 from rovot.providers.internal import InternalProvider
 from rovot.providers.openai_compat import OpenAICompatProvider
 
@@ -58,6 +58,21 @@ class ProviderRouter:
         async for chunk in provider.chat_stream(messages, tools):
             yield chunk
 
+    async def stream_events(
+        self, messages: list[dict[str, Any]], tools: list[dict[str, Any]] | None = None
+    ) -> AsyncIterator[StreamEvent]:
+        """Stream structured events (text + tool-call fragments) from the active provider."""
+        if self.mode == ModelProviderMode.INTERNAL:
+            async for event in self.internal.stream_events(messages, tools):
+                yield event
+            return
+
+        provider = self.cloud if self.mode == ModelProviderMode.CLOUD else self.local
+        if provider is None:
+            raise ProviderSelectionError("Cloud provider is not configured")
+        async for event in provider.chat_events(messages, tools):
+            yield event
+
     async def list_models(self) -> list[str]:
         if self.mode == ModelProviderMode.INTERNAL:
             return await self.internal.list_models()
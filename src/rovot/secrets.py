@@ -19,6 +19,8 @@ class SecretsStore:
     _cache: dict[str, str | None] = field(default_factory=dict, init=False, repr=False)
     _keychain_available_cache: bool | None = None
     _stats: dict[str, int] = field(default_factory=dict, init=False, repr=False)
+    # Bumped on every write so callers can invalidate anything built from secrets.
+    generation: int = field(default=0, init=False)
 
     def _inc_stat(self, name: str) -> None:
         self._stats[name] = self._stats.get(name, 0) + 1
@@ -29,6 +31,7 @@ class SecretsStore:
 
     def set_use_keychain(self, enabled: bool) -> None:
         self.use_keychain = enabled
+        self.generation += 1
         self._cache.clear()
         self._keychain_available_cache = None
         self._inc_stat("set_use_keychain")
@@ -81,6 +84,7 @@ class SecretsStore:
 
     def set(self, key: str, value: str) -> None:
         self._inc_stat("set")
+        self.generation += 1
         self._cache[key] = value
         if self.use_keychain:
             try:
@@ -97,6 +101,7 @@ class SecretsStore:
 
     def delete(self, key: str) -> None:
         self._inc_stat("delete")
+        self.generation += 1
         self._cache.pop(key, None)
         if self.use_keychain:
             try:
@@ -10,11 +10,13 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 
 from rovot import __version__
+from rovot.agent.tools.sandbox_pool import shutdown_sandbox_pools
 from rovot.audit import AuditLogger
 from rovot.config import ConfigStore, Settings
 from rovot.connectors.loader import shutdown_browser, shutdown_mcp_clients
 from rovot.policy.approvals import ApprovalManager
 from rovot.policy.engine import PolicyEngine
+from rovot.providers.http_pool import close_http_clients
 from rovot.secrets import SecretsStore
 from rovot.server.deps import AppState, ensure_auth_token
 from rovot.server.ws import WebSocketHub
@@ -25,9 +27,20 @@ logger = logging.getLogger("rovot.server")
 
 @asynccontextmanager
 async def _lifespan(app: FastAPI):  # type: ignore[type-arg]
+    from rovot.downloads import get_download_manager
+    from rovot.internal_model import MODELS_DIR, get_internal_provider
+
+    # Built-in model pool load/evict events go to connected WebSocket clients.
+    broadcast = app.state.rovot_state.ws.broadcast
+    get_internal_provider().add_listener(broadcast)
+    # Continue model downloads interrupted by the last shutdown.
+    get_download_manager(MODELS_DIR, broadcast).resume()
     yield
+    get_internal_provider().remove_listener(broadcast)
     await shutdown_browser()
     await shutdown_mcp_clients()
+    await shutdown_sandbox_pools()
+    await close_http_clients()
 
 
 def create_app() -> FastAPI:
@@ -2,8 +2,9 @@ from __future__ import annotations
 
 import os
 import secrets
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import TYPE_CHECKING, Any
 
 from fastapi import Depends, HTTPException, Request
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
@@ -16,9 +17,37 @@ from rovot.policy.scopes import DEFAULT_ADMIN_SCOPES
 from rovot.secrets import SecretsStore
 from rovot.server.ws import WebSocketHub
 
+if TYPE_CHECKING:
+    from rovot.agent.loop import AgentLoop
+
 bearer = HTTPBearer(auto_error=False)
 
 
+@dataclass
+class AgentCache:
+    """Single-slot cache for the assembled agent, keyed on what it was built from."""
+
+    key: tuple[Any, ...] | None = None
+    agent: AgentLoop | None = None
+    hits: int = 0
+    misses: int = 0
+
+    def get(self, key: tuple[Any, ...]) -> AgentLoop | None:
+        if self.agent is not None and self.key == key:
+            self.hits += 1
+            return self.agent
+        self.misses += 1
+        return None
+
+    def put(self, key: tuple[Any, ...], agent: AgentLoop) -> None:
+        self.key = key
+        self.agent = agent
+
+    def clear(self) -> None:
+        self.key = None
+        self.agent = None
+
+
 @dataclass
 class AppState:
     settings: Settings
@@ -31,6 +60,7 @@ class AppState:
     policy: PolicyEngine
     ws: WebSocketHub
     audit: AuditLogger | None = None
+    agent_cache: AgentCache = field(default_factory=AgentCache)
 
 
 def get_state(req: Request) -> AppState:
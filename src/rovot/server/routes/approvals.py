@@ -32,9 +32,11 @@ async def resolve(
 ) -> dict:
     if OPERATOR_APPROVALS not in ctx.scopes:
         return {"error": "Missing scope operator.approvals"}
+    # A parked /chat/stream turn resumes by itself; the client must not call /chat/continue.
+    continued = state.approvals.is_awaited(approval_id)
     ok = state.approvals.resolve(approval_id, req.decision, resolved_by="desktop")
     if ok:
         await state.ws.broadcast(
             "approval.resolved", {"id": approval_id, "decision": req.decision}
         )
-    return {"ok": ok}
+    return {"ok": ok, "continued": ok and continued}
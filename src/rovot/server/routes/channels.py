@@ -3,11 +3,11 @@ from __future__ import annotations
 from fastapi import APIRouter, Depends, Header, HTTPException, Request
 
 from rovot.agent.context import Message
-from rovot.agent.sessions import SessionStore
 from rovot.channels import SignalCliAdapter, TwilioWhatsAppAdapter
+from rovot.inference_scheduler import inference_session
 from rovot.policy.engine import AuthContext
 from rovot.server.deps import AppState, get_auth_ctx, get_state
-from rovot.server.routes.chat import _build_agent
+from rovot.server.routes.chat import _build_agent, _session_store
 
 router = APIRouter(tags=["channels"])
 
@@ -43,11 +43,12 @@ async def channel_incoming(
     except ValueError as exc:
         raise HTTPException(status_code=401, detail=str(exc)) from exc
 
-    store = SessionStore(root=state.settings.data_dir / "sessions")
+    store = _session_store(state)
     session = store.create()
     session.append(Message(role="user", content=f"[{incoming.channel}] {incoming.user_id}: {incoming.text}"))
 
-    agent = _build_agent(state)
+    agent = await _build_agent(state)
+    inference_session.set(session.id)
     resp = await agent.run(auth=auth, session_id=session.id, history=session.read_all())
     session.append(Message(role="assistant", content=resp.reply))
 
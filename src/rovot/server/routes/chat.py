@@ -9,9 +9,19 @@ from fastapi import APIRouter, Depends, HTTPException
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
-from rovot.agent.context import ContextBuilder, ImageContent, Message, estimate_tokens
+from rovot.agent.blobs import get_blob_store
+from rovot.agent.compaction import schedule_compaction
+from rovot.agent.context import (
+    ContextBuilder,
+    ImageContent,
+    Message,
+    custom_system_prompt_path,
+)
 from rovot.agent.loop import AgentLoop
-from rovot.agent.sessions import SessionStore
+from rovot.agent.memory import get_memory_index
+from rovot.agent.memory_index import InternalEmbedder
+from rovot.agent.sessions import Session, SessionStore
+from rovot.agent.tokens import InternalTokenizer, TokenBudgeter, tokenizer_for_model
 from rovot.agent.tools.builtin_browser import register_browser_tools
 from rovot.agent.tools.builtin_email import register_email_tools
 from rovot.agent.tools.builtin_exec import ExecConfig, register_exec_tool
@@ -20,13 +30,18 @@ from rovot.agent.tools.builtin_macos import register_macos_tools
 from rovot.agent.tools.builtin_memory import register_memory_tools
 from rovot.agent.tools.builtin_mcp import register_mcp_tools
 from rovot.agent.tools.builtin_web import register_web_tools
+from rovot.agent.tools.exec_runner import ExecLimits
 from rovot.agent.tools.registry import ToolRegistry
-from rovot.connectors.loader import get_mcp_clients, load_connectors
-from rovot.config import ModelProviderMode
+from rovot.agent.tools.sandbox_pool import get_sandbox_pool
+from rovot.connectors.loader import get_mcp_supervisor, load_connectors
+from rovot.config import AppConfig, ModelProviderMode, SecurityMode
+from rovot.inference_scheduler import InferenceQueueFull, inference_session
+from rovot.internal_model import get_internal_provider, requested_model
 from rovot.policy.engine import AuthContext
 from rovot.providers.openai_compat import OpenAICompatProvider
 from rovot.providers.router import ProviderRouter
 from rovot.server.deps import AppState, get_auth_ctx, get_state
+from rovot.server.routes.models_internal import _validate_model_filename
 
 logger = logging.getLogger(__name__)
 
@@ -42,11 +57,18 @@ class ChatRequest(BaseModel):
     message: str
     session_id: str | None = None
     images: list[ImageInput] = []
+    # Built-in model filename to use in internal mode; defaults to the active one.
+    model: str | None = None
+    # /chat/stream only: keep the stream open while a tool waits for approval and
+    # continue the turn once it is resolved, instead of ending with a pending id.
+    wait_for_approval: bool = False
 
 
 class ContinueRequest(BaseModel):
     session_id: str
     approval_id: str | None = None
+    # The model the turn started on (see ChatRequest.model).
+    model: str | None = None
 
 
 class ChatResponse(BaseModel):
@@ -63,7 +85,132 @@ class SessionStatsResponse(BaseModel):
     trimmed: bool
 
 
+def _session_store(state: AppState) -> SessionStore:
+    data_dir = state.settings.data_dir
+    return SessionStore(root=data_dir / "sessions", blobs=get_blob_store(data_dir / "blobs"))
+
+
+def _agent_cache_key(state: AppState) -> tuple:
+    try:
+        prompt_mtime = custom_system_prompt_path().stat().st_mtime_ns
+    except OSError:
+        prompt_mtime = None
+    return (
+        state.config_store.generation,
+        state.secrets.generation,
+        prompt_mtime,
+        # The token budget depends on the built-in model's context size: the
+        # one the request names, else the active one.
+        requested_model.get(),
+        get_internal_provider().loaded_model_name(),
+    )
+
+
+def _load_history(state: AppState, session: Session) -> tuple[list[Message], int, str, int]:
+    """Recent tail of ``session`` plus the rolling summary of everything before it.
+
+    Also returns how many omitted messages the summary covers; it may lag
+    behind until ``_compact_after_turn`` catches it up.
+    """
+    cfg = state.config_store.config
+    history = session.tail(cfg.max_context_messages)
+    omitted = session.count() - len(history)
+    summary, covered = "", 0
+    if omitted and cfg.compaction_enabled:
+        record = session.read_summary()
+        summary, covered = record.text, record.covered
+    return history, omitted, summary, covered
+
+
+def _compact_after_turn(state: AppState, session: Session, agent: AgentLoop) -> None:
+    """Bring the rolling summary up to date in the background once a reply is done.
+
+    Starting it only now keeps the summarization call from taking the built-in
+    model's slot ahead of the turn itself; it runs under the turn's
+    ``inference_session``.
+    """
+    cfg = state.config_store.config
+    if not cfg.compaction_enabled:
+        return
+    omitted = session.count() - cfg.max_context_messages
+    if omitted > 0 and session.read_summary().covered < omitted:
+        schedule_compaction(session, agent.provider, omitted)
+
+
+def _append_user_message(session: Session, req: ChatRequest) -> None:
+    """Record the user's turn; malformed image data is the client's error (400)."""
+    user_msg = Message(
+        role="user",
+        content=req.message,
+        images=[
+            ImageContent(base64_data=img.base64_data, media_type=img.media_type)
+            for img in req.images
+        ],
+    )
+    try:
+        session.append(user_msg)
+    except ValueError as exc:  # includes binascii.Error from strict base64 decoding
+        raise HTTPException(status_code=400, detail=f"Invalid image data: {exc}") from exc
+
+
+def _queue_full(exc: InferenceQueueFull) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail=str(exc),
+        headers={"Retry-After": str(int(exc.retry_after))},
+    )
+
+
+def _admit(state: AppState) -> None:
+    """Reject up front with 429 when the built-in model's queue is already full."""
+    if state.config_store.config.model.provider_mode != ModelProviderMode.INTERNAL:
+        return
+    try:
+        get_internal_provider().scheduler.check_admission()
+    except InferenceQueueFull as exc:
+        raise _queue_full(exc) from exc
+
+
 async def _build_agent(state: AppState) -> AgentLoop:
+    """Return the agent for the current config, rebuilding it only when inputs changed.
+
+    Tools, providers and the system prompt depend only on config, secrets and
+    the custom prompt file (memory is recalled per turn), so the assembled loop
+    is reused across requests until one of those changes.
+    """
+    key = _agent_cache_key(state)
+    cached = state.agent_cache.get(key)
+    if cached is not None:
+        return cached
+    agent = await _assemble_agent(state)
+    state.agent_cache.put(key, agent)
+    return agent
+
+
+def _budgeter(cfg: AppConfig) -> TokenBudgeter | None:
+    """Token budget for the prompt, or None to keep only the message-count cap.
+
+    The built-in model's budget follows its context window. Remote models'
+    windows are unknown, so they are only budgeted when ``max_context_tokens``
+    is set explicitly.
+    """
+    if cfg.model.provider_mode == ModelProviderMode.INTERNAL:
+        provider = get_internal_provider()
+        n_ctx = provider.loaded_n_ctx(requested_model.get()) or provider.default_n_ctx
+        # A reserve as large as the window would leave no room for any history.
+        max_tokens = max(n_ctx - cfg.response_reserve_tokens, n_ctx // 2)
+        if cfg.max_context_tokens:
+            max_tokens = min(max_tokens, cfg.max_context_tokens)
+        return TokenBudgeter(InternalTokenizer(), max_tokens=max_tokens)
+    if not cfg.max_context_tokens:
+        return None
+    model = cfg.model.model
+    if cfg.model.provider_mode == ModelProviderMode.CLOUD:
+        model = cfg.model.cloud_model
+    return TokenBudgeter(tokenizer_for_model(model), max_tokens=cfg.max_context_tokens)
+
+
+async def _assemble_agent(state: AppState) -> AgentLoop:
     cfg = state.config_store.config
     settings = state.settings
     model_key = state.secrets.get(cfg.model.api_key_secret, source="chat.local_api_key") or ""
@@ -82,12 +229,14 @@ async def _build_agent(state: AppState) -> AgentLoop:
                 or ""
             ),
             model=cfg.model.cloud_model,
+            pool=cfg.model.http_pool,
         )
     provider = ProviderRouter(
         local=OpenAICompatProvider(
             base_url=cfg.model.base_url,
             api_key=model_key,
             model=cfg.model.model,
+            pool=cfg.model.http_pool,
         ),
         cloud=cloud_provider,
         mode=cfg.model.provider_mode,
@@ -97,27 +246,56 @@ async def _build_agent(state: AppState) -> AgentLoop:
     tools = ToolRegistry(policy=state.policy)
     register_web_tools(tools, allowed_domains=cfg.allowed_domains)
     register_fs_tools(tools, connectors.fs, settings.workspace_dir)
+    sandbox_pool = None
+    if cfg.security_mode == SecurityMode.CONTAINER and cfg.exec.container_pool_size > 0:
+        sandbox_pool = get_sandbox_pool(
+            settings.workspace_dir,
+            size=cfg.exec.container_pool_size,
+            max_uses=cfg.exec.container_max_uses,
+            idle_timeout=cfg.exec.container_idle_timeout_seconds,
+            start_timeout=cfg.exec.container_start_timeout_seconds,
+        )
+        sandbox_pool.warm()
     register_exec_tool(
-        tools, ExecConfig(workspace=settings.workspace_dir, security_mode=cfg.security_mode.value)
+        tools,
+        ExecConfig(
+            workspace=settings.workspace_dir,
+            security_mode=cfg.security_mode.value,
+            limits=ExecLimits(
+                timeout=cfg.exec.timeout_seconds,
+                idle_timeout=cfg.exec.idle_timeout_seconds,
+                max_output_bytes=cfg.exec.max_output_bytes,
+            ),
+            pool=sandbox_pool,
+        ),
     )
     register_email_tools(tools, connectors.email)
     register_browser_tools(tools, connectors.browser)
     register_macos_tools(tools, enabled=cfg.connectors.macos_automation_enabled)
     if cfg.connectors.mcp_servers:
         try:
-            mcp_clients = await get_mcp_clients(cfg)
-            register_mcp_tools(tools, mcp_clients)
+            supervisor = await get_mcp_supervisor(cfg, settings.data_dir)
+            register_mcp_tools(tools, supervisor, await supervisor.catalog())
         except Exception as exc:
             logger.warning("MCP tool registration failed: %s", exc)
     register_memory_tools(tools)
+    get_memory_index().embedder = InternalEmbedder() if cfg.memory_embeddings else None
+    internal = get_internal_provider()
+    internal.scheduler.max_queue = cfg.model.internal_max_queue
+    if cfg.model.internal_ram_budget_mb:
+        internal.ram_budget_bytes = cfg.model.internal_ram_budget_mb << 20
     return AgentLoop(
         provider=provider,
         tools=tools,
         ctx_builder=ContextBuilder(
             workspace_dir=settings.workspace_dir,
             max_context_messages=cfg.max_context_messages,
+            blobs=get_blob_store(settings.data_dir / "blobs"),
+            budgeter=_budgeter(cfg),
+            memory_top_k=cfg.memory_top_k,
         ),
         max_iterations=cfg.max_iterations,
+        max_parallel_tools=cfg.max_parallel_tools,
     )
 
 
@@ -127,29 +305,34 @@ async def chat(
     auth: AuthContext = Depends(get_auth_ctx),
     state: AppState = Depends(get_state),
 ) -> ChatResponse:
-    settings = state.settings
-    store = SessionStore(root=settings.data_dir / "sessions")
+    _admit(state)
+    if req.model:
+        _validate_model_filename(req.model)
+    store = _session_store(state)
     session = store.create() if not req.session_id else store.get(req.session_id)
-    history = session.read_all()
-    user_msg = Message(
-        role="user",
-        content=req.message,
-        images=[
-            ImageContent(base64_data=img.base64_data, media_type=img.media_type)
-            for img in req.images
-        ],
-    )
-    history.append(user_msg)
-    session.append(user_msg)
+    _append_user_message(session, req)
+    requested_model.set(req.model)
     agent = await _build_agent(state)
+    history, omitted, summary, covered = _load_history(state, session)
+    inference_session.set(session.id)
     try:
-        resp = await agent.run(auth=auth, session_id=session.id, history=history)
+        resp = await agent.run(
+            auth=auth,
+            session_id=session.id,
+            history=history,
+            omitted=omitted,
+            summary=summary,
+            covered=covered,
+        )
+    except InferenceQueueFull as exc:
+        raise _queue_full(exc) from exc
     except Exception as exc:
         raise HTTPException(
             status_code=502,
             detail=f"Model provider request failed: {exc}",
         ) from exc
     session.append(Message(role="assistant", content=resp.reply))
+    _compact_after_turn(state, session, agent)
     if state.audit:
         state.audit.log(
             "chat.turn", {"session_id": session.id, "pending": bool(resp.pending_approval_id)}
@@ -173,28 +356,32 @@ async def chat_stream(
     state: AppState = Depends(get_state),
 ) -> StreamingResponse:
     """Stream chat response as Server-Sent Events."""
-    settings = state.settings
-    store = SessionStore(root=settings.data_dir / "sessions")
+    _admit(state)
+    if req.model:
+        _validate_model_filename(req.model)
+    store = _session_store(state)
     session = store.create() if not req.session_id else store.get(req.session_id)
-    history = session.read_all()
-    user_msg = Message(
-        role="user",
-        content=req.message,
-        images=[
-            ImageContent(base64_data=img.base64_data, media_type=img.media_type)
-            for img in req.images
-        ],
-    )
-    history.append(user_msg)
-    session.append(user_msg)
+    _append_user_message(session, req)
+    requested_model.set(req.model)
     agent = await _build_agent(state)
+    history, omitted, summary, covered = _load_history(state, session)
 
     async def event_generator() -> AsyncIterator[str]:
         full_reply = ""
         pending_approval_id: str | None = None
         tool_calls: list[dict[str, Any]] = []
+        inference_session.set(session.id)
+        requested_model.set(req.model)
         try:
-            async for event in agent.stream(auth=auth, session_id=session.id, history=history):
+            async for event in agent.stream(
+                auth=auth,
+                session_id=session.id,
+                history=history,
+                omitted=omitted,
+                summary=summary,
+                covered=covered,
+                wait_for_approval=req.wait_for_approval,
+            ):
                 event_type = event.get("type")
                 if event_type == "token":
                     full_reply += event["content"]
@@ -204,6 +391,8 @@ async def chat_stream(
                     )
                 elif event_type == "approval_required":
                     pending_approval_id = event.get("approval_id")
+                elif event_type == "approval_resolved":
+                    pending_approval_id = None
                 elif event_type == "done":
                     pending_approval_id = event.get("pending_approval_id")
                     tool_calls = event.get("tool_calls", tool_calls)
@@ -214,6 +403,7 @@ async def chat_stream(
             # Persist the assistant reply
             if full_reply:
                 session.append(Message(role="assistant", content=full_reply))
+            _compact_after_turn(state, session, agent)
 
             if state.audit:
                 state.audit.log(
@@ -245,10 +435,12 @@ async def chat_continue(
     auth: AuthContext = Depends(get_auth_ctx),
     state: AppState = Depends(get_state),
 ) -> ChatResponse:
-    settings = state.settings
-    store = SessionStore(root=settings.data_dir / "sessions")
+    _admit(state)
+    if req.model:
+        _validate_model_filename(req.model)
+    store = _session_store(state)
     session = store.get(req.session_id)
-    history = session.read_all()
+    requested_model.set(req.model)
     agent = await _build_agent(state)
 
     if req.approval_id:
@@ -268,18 +460,29 @@ async def chat_continue(
             tool_call_id=a.tool_call_id,
             approved=True,
         )
-        history.append(Message(role="tool", content=str(result), tool_call_id=a.tool_call_id))
         session.append(Message(role="tool", content=str(result), tool_call_id=a.tool_call_id))
         state.approvals.consume(a.id)
 
+    history, omitted, summary, covered = _load_history(state, session)
+    inference_session.set(session.id)
     try:
-        resp = await agent.run(auth=auth, session_id=session.id, history=history)
+        resp = await agent.run(
+            auth=auth,
+            session_id=session.id,
+            history=history,
+            omitted=omitted,
+            summary=summary,
+            covered=covered,
+        )
+    except InferenceQueueFull as exc:
+        raise _queue_full(exc) from exc
     except Exception as exc:
         raise HTTPException(
             status_code=502,
             detail=f"Model provider request failed: {exc}",
         ) from exc
     session.append(Message(role="assistant", content=resp.reply))
+    _compact_after_turn(state, session, agent)
     await state.ws.broadcast(
         "chat.reply",
         {"session_id": session.id, "pending_approval_id": resp.pending_approval_id},
@@ -305,7 +508,7 @@ async def session_messages(
     auth: AuthContext = Depends(get_auth_ctx),
     state: AppState = Depends(get_state),
 ) -> dict:
-    store = SessionStore(root=state.settings.data_dir / "sessions")
+    store = _session_store(state)
     session = store.get(session_id)
     history = session.read_all()
     return {
@@ -330,16 +533,16 @@ async def session_stats(
     state: AppState = Depends(get_state),
 ) -> SessionStatsResponse:
     """Return message count and estimated token usage for a session."""
-    settings = state.settings
-    store = SessionStore(root=settings.data_dir / "sessions")
+    store = _session_store(state)
     session = store.get(session_id)
-    history = session.read_all()
+    # Served from the session index; the transcript itself is never parsed here.
+    count = session.count()
     cfg = state.config_store.config
     max_msgs = cfg.max_context_messages
-    trimmed = len(history) > max_msgs
+    trimmed = count > max_msgs
     return SessionStatsResponse(
         session_id=session_id,
-        message_count=len(history),
-        estimated_tokens=estimate_tokens(history),
+        message_count=count,
+        estimated_tokens=session.content_chars() // 4,
         trimmed=trimmed,
     )
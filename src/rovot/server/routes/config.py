@@ -1,10 +1,9 @@
 from __future__ import annotations
 
-from pathlib import Path
-
 from fastapi import APIRouter, Depends
 from pydantic import BaseModel
 
+from rovot.agent.context import custom_system_prompt_path
 from rovot.policy.engine import AuthContext
 from rovot.policy.scopes import OPERATOR_ADMIN, OPERATOR_WRITE
 from rovot.server.deps import AppState, get_auth_ctx, get_state
@@ -47,7 +46,7 @@ async def update_config(
 async def get_system_prompt(
     _: AuthContext = Depends(get_auth_ctx),
 ) -> dict:
-    p = Path.home() / ".rovot" / "system_prompt.txt"
+    p = custom_system_prompt_path()
     if p.exists():
         return {"custom": True, "prompt": p.read_text("utf-8")}
     return {"custom": False, "prompt": ""}
@@ -64,7 +63,7 @@ async def set_system_prompt(
 ) -> dict:
     if OPERATOR_WRITE not in ctx.scopes:
         return {"error": "Missing scope"}
-    p = Path.home() / ".rovot" / "system_prompt.txt"
+    p = custom_system_prompt_path()
     if req.prompt.strip():
         p.parent.mkdir(parents=True, exist_ok=True)
         p.write_text(req.prompt.strip(), "utf-8")
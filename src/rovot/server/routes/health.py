@@ -27,4 +27,5 @@ async def health(state: AppState = Depends(get_state)) -> dict[str, Any]:
             "uptime_seconds": round(time.time() - state.startup_ts, 3),
         },
         "secret_stats": state.secrets.debug_stats(),
+        "ws": state.ws.metrics(),
     }
@@ -1,9 +1,9 @@
 """MCP server status endpoints."""
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
 
-from rovot.connectors.loader import get_mcp_clients
+from rovot.connectors.loader import get_mcp_supervisor
 from rovot.policy.engine import AuthContext
 from rovot.server.deps import AppState, get_auth_ctx, get_state
 
@@ -15,16 +15,24 @@ async def list_mcp_servers(
     auth: AuthContext = Depends(get_auth_ctx),
     state: AppState = Depends(get_state),
 ) -> dict:
-    """List connected MCP servers and their available tools."""
-    cfg = state.config_store.config
-    clients = await get_mcp_clients(cfg)
-    return {
-        "servers": [
-            {
-                "name": c.config.name,
-                "tools": [t["name"] for t in c._tools],
-                "tool_count": len(c._tools),
-            }
-            for c in clients
-        ]
-    }
+    """List configured MCP servers with status, restart count, latency and tools.
+
+    Does not start servers; a server that has not been used yet reports "stopped"
+    and lists its persisted catalog, if any.
+    """
+    supervisor = await get_mcp_supervisor(state.config_store.config, state.settings.data_dir)
+    return {"servers": supervisor.status()}
+
+
+@router.post("/mcp/servers/{name}/restart")
+async def restart_mcp_server(
+    name: str,
+    auth: AuthContext = Depends(get_auth_ctx),
+    state: AppState = Depends(get_state),
+) -> dict:
+    """Restart an MCP server now, skipping any pending backoff."""
+    supervisor = await get_mcp_supervisor(state.config_store.config, state.settings.data_dir)
+    if name not in supervisor.names():
+        raise HTTPException(status_code=404, detail=f"Unknown MCP server: {name}")
+    await supervisor.restart(name)
+    return next(s for s in supervisor.status() if s["name"] == name)
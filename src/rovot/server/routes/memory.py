@@ -1,7 +1,7 @@
 """Memory management API endpoints."""
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel
 
 from rovot.agent.memory import delete_memory, list_memories, read_memory, write_memory
@@ -17,9 +17,17 @@ class WriteMemoryRequest(BaseModel):
 
 
 @router.get("")
-async def list_memory_files(auth: AuthContext = Depends(get_auth_ctx)) -> dict:
-    """List all persistent memory files."""
-    return {"memories": list_memories()}
+async def list_memory_files(
+    prefix: str = "",
+    offset: int = Query(default=0, ge=0),
+    limit: int | None = Query(default=None, ge=1, le=1000),
+    auth: AuthContext = Depends(get_auth_ctx),
+) -> dict:
+    """List persistent memory files whose path starts with ``prefix``.
+
+    Everything is returned unless ``limit`` asks for one page at a time.
+    """
+    return list_memories(prefix=prefix, offset=offset, limit=limit)
 
 
 @router.get("/{path:path}")
@@ -12,8 +12,10 @@ import httpx
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 
+from rovot.downloads import get_download_manager
 from rovot.internal_model import MODELS_DIR, get_internal_provider
 from rovot.policy.engine import AuthContext
+from rovot.progress import ProgressReporter
 from rovot.server.deps import AppState, get_auth_ctx, get_state
 
 logger = logging.getLogger(__name__)
@@ -242,13 +244,35 @@ async def get_loaded(
     return {
         "loaded": provider.loaded_model_name(),
         "loading": provider.is_loading(),
+        "resident": provider.resident_models(),
+        "ram_budget_bytes": provider.ram_budget_bytes,
     }
 
 
+@router.get("/scheduler")
+async def get_scheduler_metrics(
+    auth: AuthContext = Depends(get_auth_ctx),
+) -> dict[str, Any]:
+    """Queue depth, wait times and rejections for built-in model requests."""
+    return get_internal_provider().scheduler.metrics()
+
+
+@router.get("/kvcache")
+async def get_kv_cache_stats(
+    auth: AuthContext = Depends(get_auth_ctx),
+) -> dict[str, Any]:
+    """Prompt-prefix cache hit rate and tokens saved for the loaded model."""
+    cache = get_internal_provider().prompt_cache
+    return {"enabled": cache is not None, **(cache.stats() if cache else {})}
+
+
 class LoadRequest(BaseModel):
     model_filename: str
     n_ctx: int = 4096
     n_gpu_layers: int = -1
+    kv_cache_disk: bool = False
+    # Load as the separate embedding model used for memory search (memory_embeddings).
+    embedding: bool = False
 
 
 @router.post("/load")
@@ -288,17 +312,56 @@ async def load_model(
         provider.end_load()
         raise HTTPException(status_code=404, detail=f"Model not found: {model_filename}")
 
+    budget_mb = state.config_store.config.model.internal_ram_budget_mb
+    if budget_mb:
+        provider.ram_budget_bytes = budget_mb << 20
+
     async def _do_load():
         loop = asyncio.get_event_loop()
+        # llama.cpp gives no load callback; progress is estimated from file size
+        # and the throughput measured on previous loads.
+        total = model_path.stat().st_size
+        reporter = ProgressReporter(
+            state.ws.broadcast,
+            "model_load_progress",
+            {"filename": model_filename},
+            total,
+            interval=1.0,
+            done_key="bytes_loaded",
+            total_key="total_bytes",
+        )
+        rate = provider.load_bytes_per_sec
+
+        async def _tick():
+            started = loop.time()
+            while True:
+                await asyncio.sleep(reporter.interval)
+                estimate = int(min((loop.time() - started) * rate, total * 0.99))
+                await reporter.update(estimate, {"estimated": True})
+
+        ticker = asyncio.create_task(_tick())
         try:
-            await loop.run_in_executor(
-                None,
-                lambda: provider.load_model(
-                    model_filename,
-                    n_ctx=req.n_ctx,
-                    n_gpu_layers=req.n_gpu_layers,
-                ),
-            )
+            if req.embedding:
+                evicted = await loop.run_in_executor(
+                    None,
+                    lambda: provider.load_embedding_model(
+                        model_filename, n_ctx=req.n_ctx, n_gpu_layers=req.n_gpu_layers
+                    ),
+                )
+            else:
+                evicted = await loop.run_in_executor(
+                    None,
+                    lambda: provider.load_model(
+                        model_filename,
+                        n_ctx=req.n_ctx,
+                        n_gpu_layers=req.n_gpu_layers,
+                        kv_cache_disk=req.kv_cache_disk,
+                    ),
+                )
+            ticker.cancel()
+            await reporter.finish({"estimated": False})
+            for name in evicted or []:
+                await state.ws.broadcast("model_evicted", {"filename": name})
             await state.ws.broadcast(
                 "model_load_complete", {"filename": model_filename}
             )
@@ -320,19 +383,25 @@ async def load_model(
                 "model_load_error", {"filename": model_filename, "error": str(exc)}
             )
         finally:
+            ticker.cancel()
             provider.end_load()
 
     asyncio.create_task(_do_load())
     return {"status": "loading", "filename": model_filename}
 
 
+class UnloadRequest(BaseModel):
+    model_filename: str | None = None  # None unloads every resident model
+
+
 @router.post("/unload")
 async def unload_model(
+    req: UnloadRequest | None = None,
     auth: AuthContext = Depends(get_auth_ctx),
 ) -> dict[str, Any]:
-    """Unload the current model and free memory."""
+    """Unload one resident model (or all of them) and free memory."""
     provider = get_internal_provider()
-    provider.unload_model()
+    provider.unload_model(req.model_filename if req else None)
     return {"status": "unloaded"}
 
 
@@ -536,7 +605,10 @@ async def download_model(
     auth: AuthContext = Depends(get_auth_ctx),
     state: AppState = Depends(get_state),
 ) -> dict[str, Any]:
-    """Download a model file to ~/.rovot/models/ with WebSocket progress events."""
+    """Queue a resumable download to ~/.rovot/models/ with WebSocket progress events.
+
+    Re-posting a failed download resumes it from its partial file.
+    """
     filename = _validate_model_filename(req.filename)
     hf_url = _validate_hf_url(req.hf_url)
     MODELS_DIR.mkdir(parents=True, exist_ok=True)
@@ -545,37 +617,15 @@ async def download_model(
     if dest.exists():
         return {"status": "already_downloaded", "filename": filename}
 
-    async def _do_download():
-        try:
-            async with httpx.AsyncClient(timeout=None, follow_redirects=True) as client:
-                async with client.stream("GET", hf_url) as response:
-                    response.raise_for_status()
-                    total = int(response.headers.get("content-length", 0))
-                    downloaded = 0
-                    with open(dest, "wb") as f:
-                        async for chunk in response.aiter_bytes(chunk_size=65536):
-                            f.write(chunk)
-                            downloaded += len(chunk)
-                            progress = downloaded / total if total else 0.0
-                            await state.ws.broadcast(
-                                "model_download_progress",
-                                {
-                                    "filename": filename,
-                                    "progress": round(progress, 4),
-                                    "bytes_downloaded": downloaded,
-                                    "total_bytes": total,
-                                },
-                            )
-            await state.ws.broadcast(
-                "model_download_complete", {"filename": filename}
-            )
-        except Exception as exc:
-            logger.exception("Download failed for %s", filename)
-            if dest.exists():
-                dest.unlink(missing_ok=True)
-            await state.ws.broadcast(
-                "model_download_error", {"filename": filename, "error": str(exc)}
-            )
+    manager = get_download_manager(MODELS_DIR, state.ws.broadcast)
+    status = manager.add(filename, hf_url)
+    asyncio.create_task(manager.process())
+    return {"status": status, "filename": filename}
 
-    asyncio.create_task(_do_download())
-    return {"status": "downloading", "filename": filename}
+
+@router.get("/downloads")
+async def list_downloads(
+    auth: AuthContext = Depends(get_auth_ctx),
+) -> dict[str, Any]:
+    """Queued, running and failed (resumable) model downloads."""
+    return {"downloads": get_download_manager(MODELS_DIR).jobs()}
@@ -1,41 +1,163 @@
+"""
+Event fan-out to connected desktop clients.
+
+``broadcast`` serializes an event once and enqueues it for every client without
+awaiting any socket. Each client has a bounded outbound queue drained by its
+own writer task, so a slow or stalled client only delays itself. Per event
+type, a queued message may be *coalesced*: a newer one replaces the queued one
+for the same subject (e.g. download progress), and is dropped when the queue
+is full. Overflowing on any other event disconnects the client.
+"""
+
 from __future__ import annotations
 
 import asyncio
 import json
-from dataclasses import dataclass
+import logging
+from collections import deque
+from dataclasses import dataclass, field
 from typing import Any
 
 from fastapi import WebSocket
 
+logger = logging.getLogger(__name__)
+
+COALESCE = "coalesce"  # replace a queued message for the same subject; drop if full
+# Events not listed must be delivered; overflowing on them disconnects the client.
+EVENT_POLICIES: dict[str, str] = {
+    "model_download_progress": COALESCE,
+    "model_load_progress": COALESCE,
+}
+
+# Payload keys that identify what an event is about, for coalescing.
+_SUBJECT_KEYS = ("filename", "id", "session_id", "name")
+
+# WebSocket close code 1013: "try again later".
+_CLOSE_SLOW_CONSUMER = 1013
+
+
+def _subject(event: str, payload: dict[str, Any]) -> tuple[str, Any]:
+    for key in _SUBJECT_KEYS:
+        if key in payload:
+            return event, payload[key]
+    return event, None
 
-@dataclass
+
+@dataclass(eq=False)
 class WsClient:
     ws: WebSocket
     scopes: list[str]
+    # (coalesce subject or None, serialized message)
+    queue: deque[tuple[tuple[str, Any] | None, str]] = field(default_factory=deque)
+    wakeup: asyncio.Event = field(default_factory=asyncio.Event)
+    writer: asyncio.Task[None] | None = None
+    closing: bool = False
+    sent: int = 0
+    dropped: int = 0
+    coalesced: int = 0
 
 
 class WebSocketHub:
-    def __init__(self):
+    def __init__(self, max_queue: int = 256, send_timeout: float = 10.0):
         self._clients: list[WsClient] = []
         self._lock = asyncio.Lock()
+        self.max_queue = max_queue
+        self.send_timeout = send_timeout
+        self.slow_disconnects = 0
+        self._closers: set[asyncio.Task[None]] = set()
 
     async def connect(self, ws: WebSocket, scopes: list[str]) -> None:
         await ws.accept()
+        client = WsClient(ws=ws, scopes=scopes)
+        client.writer = asyncio.get_running_loop().create_task(self._drain(client))
         async with self._lock:
-            self._clients.append(WsClient(ws=ws, scopes=scopes))
+            self._clients.append(client)
 
     async def disconnect(self, ws: WebSocket) -> None:
         async with self._lock:
+            gone = [c for c in self._clients if c.ws is ws]
             self._clients = [c for c in self._clients if c.ws is not ws]
+        for c in gone:
+            if c.writer is not None and c.writer is not asyncio.current_task():
+                c.writer.cancel()
+
+    async def _drain(self, client: WsClient) -> None:
+        while True:
+            while not client.queue:
+                client.wakeup.clear()
+                await client.wakeup.wait()
+            _, msg = client.queue.popleft()
+            try:
+                await asyncio.wait_for(client.ws.send_text(msg), self.send_timeout)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                await self._drop_client(client, slow=isinstance(exc, asyncio.TimeoutError))
+                return
+            client.sent += 1
+
+    async def _drop_client(self, client: WsClient, slow: bool) -> None:
+        client.closing = True
+        if slow:
+            self.slow_disconnects += 1
+            logger.warning(
+                "Disconnecting slow WebSocket client (%d queued messages)", len(client.queue)
+            )
+        await self.disconnect(client.ws)
+        client.queue.clear()
+        try:
+            await asyncio.wait_for(
+                client.ws.close(code=_CLOSE_SLOW_CONSUMER if slow else 1011), self.send_timeout
+            )
+        except Exception:
+            pass  # already gone
+
+    def _enqueue(self, client: WsClient, event: str, subject: tuple[str, Any], msg: str) -> bool:
+        """Queue ``msg`` for ``client``; returns False if the client must be dropped."""
+        policy = EVENT_POLICIES.get(event)
+        if policy == COALESCE:
+            for i, (queued, _) in enumerate(client.queue):
+                if queued == subject:
+                    client.queue[i] = (subject, msg)
+                    client.coalesced += 1
+                    return True
+        if len(client.queue) >= self.max_queue:
+            if policy == COALESCE:
+                client.dropped += 1
+                return True
+            return False
+        client.queue.append((subject if policy == COALESCE else None, msg))
+        client.wakeup.set()
+        return True
 
     async def broadcast(self, event: str, payload: dict[str, Any]) -> None:
         msg = json.dumps(
             {"type": "event", "event": event, "payload": payload}, ensure_ascii=False
         )
+        subject = _subject(event, payload)
         async with self._lock:
             clients = list(self._clients)
         for c in clients:
-            try:
-                await c.ws.send_text(msg)
-            except Exception:
-                await self.disconnect(c.ws)
+            if c.closing:
+                continue
+            if not self._enqueue(c, event, subject, msg):
+                c.closing = True
+                # Closing may block on the stalled socket; never make the caller wait.
+                task = asyncio.get_running_loop().create_task(self._drop_client(c, slow=True))
+                self._closers.add(task)
+                task.add_done_callback(self._closers.discard)
+
+    def metrics(self) -> dict[str, Any]:
+        return {
+            "clients": [
+                {
+                    "queue_depth": len(c.queue),
+                    "sent": c.sent,
+                    "dropped": c.dropped,
+                    "coalesced": c.coalesced,
+                }
+                for c in self._clients
+            ],
+            "max_queue": self.max_queue,
+            "slow_disconnects": self.slow_disconnects,
+        }
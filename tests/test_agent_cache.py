@@ -0,0 +1,93 @@
+"""Tests for reusing the assembled agent across requests."""
+from __future__ import annotations
+
+import asyncio
+
+from rovot.agent import memory
+from rovot.agent.context import Message
+from rovot.config import ConfigStore, ModelProviderMode, Settings
+from rovot.secrets import SecretsStore
+from rovot.server.deps import AppState
+from rovot.server.routes.chat import _build_agent
+
+
+def _make_state(tmp_path) -> AppState:
+    settings = Settings(data_dir=tmp_path / "data", workspace_dir=tmp_path / "ws")
+    settings.data_dir.mkdir(parents=True, exist_ok=True)
+    settings.workspace_dir.mkdir(parents=True, exist_ok=True)
+    cfg = ConfigStore(path=settings.data_dir / "config.json")
+    cfg.load()
+    cfg.config.model.provider_mode = ModelProviderMode.LOCAL
+    secrets = SecretsStore(service="rovot", fallback_path=settings.data_dir / "secrets.json")
+    secrets.use_keychain = False
+    return AppState(
+        settings=settings,
+        config_store=cfg,
+        secrets=secrets,
+        auth_token="t",
+        startup_ts=0.0,
+        pid=1,
+        approvals=None,  # type: ignore[arg-type]
+        policy=None,  # type: ignore[arg-type]
+        ws=None,  # type: ignore[arg-type]
+        audit=None,
+    )
+
+
+def test_agent_reused_until_config_changes(tmp_path):
+    state = _make_state(tmp_path)
+    first = asyncio.run(_build_agent(state))
+    assert asyncio.run(_build_agent(state)) is first
+    assert state.agent_cache.hits == 1
+
+    state.config_store.update_path("max_iterations", 3)
+    rebuilt = asyncio.run(_build_agent(state))
+    assert rebuilt is not first
+    assert rebuilt._max_iterations == 3
+
+
+def test_secret_write_invalidates_agent(tmp_path):
+    state = _make_state(tmp_path)
+    first = asyncio.run(_build_agent(state))
+    state.secrets.set(state.config_store.config.model.api_key_secret, "new-key")
+    assert asyncio.run(_build_agent(state)) is not first
+
+
+def test_memory_write_is_recalled_without_rebuild(tmp_path, monkeypatch):
+    monkeypatch.setattr(memory, "MEMORY_DIR", tmp_path / "memory")
+    state = _make_state(tmp_path)
+    first = asyncio.run(_build_agent(state))
+    memory.write_memory("notes.md", "remember this")
+    assert asyncio.run(_build_agent(state)) is first
+    recalled = asyncio.run(first._ctx.recall([Message(role="user", content="remember?")]))
+    assert "remember this" in recalled
+
+
+def test_continued_turn_keeps_its_model(tmp_path, monkeypatch):
+    from rovot.agent.loop import AgentResponse
+    from rovot.internal_model import requested_model
+    from rovot.server.routes import chat
+
+    seen: list[str | None] = []
+
+    class _Agent:
+        async def run(self, **kwargs):
+            seen.append(requested_model.get())
+            return AgentResponse(reply="ok", tool_calls=[])
+
+    class _Ws:
+        async def broadcast(self, event, payload):
+            pass
+
+    async def _build(state):
+        seen.append(requested_model.get())  # the cache key sees the model too
+        return _Agent()
+
+    monkeypatch.setattr(chat, "_build_agent", _build)
+    state = _make_state(tmp_path)
+    state.ws = _Ws()  # type: ignore[assignment]
+    req = chat.ContinueRequest(session_id="s1", model="small.gguf")
+
+    resp = asyncio.run(chat.chat_continue(req, auth=None, state=state))  # type: ignore[arg-type]
+    assert resp.reply == "ok"
+    assert seen == ["small.gguf", "small.gguf"]
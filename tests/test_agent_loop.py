@@ -0,0 +1,264 @@
+"""Tests for AgentLoop tool execution."""
+from __future__ import annotations
+
+import asyncio
+from pathlib import Path
+
+from rovot.agent.context import ContextBuilder, Message
+from rovot.agent.loop import AgentLoop
+from rovot.agent.tools.registry import Tool, ToolRegistry, tool_progress
+from rovot.policy.approvals import ApprovalManager
+from rovot.policy.engine import AuthContext, PolicyEngine
+from rovot.providers.base import ChatResponse
+
+AUTH = AuthContext(token="t", scopes=["operator.read", "operator.write", "operator.approvals"])
+
+
+class _ScriptedProvider:
+    """Returns the scripted tool calls once, then a final answer."""
+
+    def __init__(self, tool_calls):
+        self._tool_calls = tool_calls
+        self.seen: list[list[dict]] = []
+
+    async def chat(self, messages, tools=None):
+        self.seen.append(messages)
+        if len(self.seen) == 1:
+            return ChatResponse(content="", tool_calls=self._tool_calls)
+        return ChatResponse(content="done")
+
+    async def list_models(self):
+        return []
+
+    def supports_tools(self):
+        return True
+
+    def supports_streaming(self):
+        return False
+
+    def supports_vision(self):
+        return False
+
+
+def _registry(tmp_path: Path) -> tuple[ToolRegistry, dict]:
+    stats = {"active": 0, "peak": 0}
+    registry = ToolRegistry(policy=PolicyEngine(ApprovalManager(tmp_path / "approvals.json")))
+
+    async def _sleep(delay: float, label: str) -> str:
+        stats["active"] += 1
+        stats["peak"] = max(stats["peak"], stats["active"])
+        await asyncio.sleep(delay)
+        stats["active"] -= 1
+        return label
+
+    params = {"type": "object", "properties": {}}
+    registry.register(Tool(name="read", description="", parameters=params, fn=_sleep))
+    registry.register(
+        Tool(
+            name="danger",
+            description="",
+            parameters=params,
+            fn=_sleep,
+            requires_write=True,
+            requires_approval=True,
+        )
+    )
+    return registry, stats
+
+
+def _call(i: int, name: str, delay: float) -> dict:
+    return {"id": f"c{i}", "name": name, "arguments": {"delay": delay, "label": f"r{i}"}}
+
+
+def test_read_only_tools_run_concurrently_in_order(tmp_path: Path):
+    registry, stats = _registry(tmp_path)
+    provider = _ScriptedProvider(
+        [_call(0, "read", 0.05), _call(1, "read", 0.01), _call(2, "read", 0.03)]
+    )
+    loop = AgentLoop(provider=provider, tools=registry, ctx_builder=ContextBuilder())
+
+    resp = asyncio.run(
+        loop.run(auth=AUTH, session_id="s", history=[Message(role="user", content="go")])
+    )
+
+    assert resp.reply == "done"
+    assert stats["peak"] == 3
+    tool_msgs = [m for m in provider.seen[1] if m["role"] == "tool"]
+    assert [m["tool_call_id"] for m in tool_msgs] == ["c0", "c1", "c2"]
+    assert [m["content"] for m in tool_msgs] == ["r0", "r1", "r2"]
+
+
+def test_concurrency_cap(tmp_path: Path):
+    registry, stats = _registry(tmp_path)
+    provider = _ScriptedProvider([_call(i, "read", 0.01) for i in range(5)])
+    loop = AgentLoop(
+        provider=provider, tools=registry, ctx_builder=ContextBuilder(), max_parallel_tools=2
+    )
+    asyncio.run(loop.run(auth=AUTH, session_id="s", history=[Message(role="user", content="go")]))
+    assert stats["peak"] == 2
+
+
+def test_approval_short_circuits_after_earlier_reads(tmp_path: Path):
+    registry, _ = _registry(tmp_path)
+    provider = _ScriptedProvider(
+        [_call(0, "read", 0.0), _call(1, "danger", 0.0), _call(2, "read", 0.0)]
+    )
+    loop = AgentLoop(provider=provider, tools=registry, ctx_builder=ContextBuilder())
+
+    resp = asyncio.run(
+        loop.run(auth=AUTH, session_id="s", history=[Message(role="user", content="go")])
+    )
+
+    assert resp.pending_approval_id
+    assert [tc["id"] for tc in resp.tool_calls] == ["c0", "c1"]
+    assert len(provider.seen) == 1
+
+
+def test_stream_emits_results_as_they_finish(tmp_path: Path):
+    registry, _ = _registry(tmp_path)
+    provider = _ScriptedProvider([_call(0, "read", 0.05), _call(1, "read", 0.0)])
+    loop = AgentLoop(provider=provider, tools=registry, ctx_builder=ContextBuilder())
+
+    async def _collect():
+        return [
+            e
+            async for e in loop.stream(
+                auth=AUTH, session_id="s", history=[Message(role="user", content="go")]
+            )
+        ]
+
+    events = asyncio.run(_collect())
+    results = [e for e in events if e["type"] == "tool_result"]
+    assert [e["step_index"] for e in results] == [1, 0]
+    tool_msgs = [m for m in provider.seen[1] if m["role"] == "tool"]
+    assert [m["tool_call_id"] for m in tool_msgs] == ["c0", "c1"]
+    assert events[-1]["type"] == "done"
+
+
+def test_stream_forwards_tool_progress_before_result(tmp_path: Path):
+    registry, _ = _registry(tmp_path)
+
+    async def _chatty(delay: float, label: str) -> str:
+        report = tool_progress.get()
+        report({"stream": "stdout", "lines": ["working"]})
+        await asyncio.sleep(delay)
+        report({"stream": "stdout", "lines": ["almost"]})
+        return label
+
+    params = {"type": "object", "properties": {}}
+    registry.register(Tool(name="chatty", description="", parameters=params, fn=_chatty))
+    provider = _ScriptedProvider([_call(0, "read", 0.0), _call(1, "chatty", 0.02)])
+    loop = AgentLoop(provider=provider, tools=registry, ctx_builder=ContextBuilder())
+
+    async def _collect():
+        return [
+            e
+            async for e in loop.stream(
+                auth=AUTH, session_id="s", history=[Message(role="user", content="go")]
+            )
+        ]
+
+    events = asyncio.run(_collect())
+    chatty = [e for e in events if e.get("name") == "chatty" and e["type"] != "tool_call"]
+    assert chatty == [
+        {"type": "tool_progress", "name": "chatty", "step_index": 1,
+         "stream": "stdout", "lines": ["working"]},
+        {"type": "tool_progress", "name": "chatty", "step_index": 1,
+         "stream": "stdout", "lines": ["almost"]},
+        {"type": "tool_result", "name": "chatty", "summary": "r1", "step_index": 1},
+    ]
+    # Non-streaming runs have no progress sink.
+    assert tool_progress.get() is None
+
+
+def test_stream_uses_one_request_per_iteration(tmp_path: Path):
+    from rovot.providers.base import StreamEvent
+
+    registry, _ = _registry(tmp_path)
+
+    class _EventProvider(_ScriptedProvider):
+        def supports_streaming(self):
+            return True
+
+        async def chat(self, messages, tools=None):
+            raise AssertionError("stream mode must not issue a second, non-streaming call")
+
+        async def stream_events(self, messages, tools=None):
+            self.seen.append(messages)
+            if len(self.seen) == 1:
+                yield StreamEvent(type="text", text="Checking")
+                yield StreamEvent(type="tool_call", index=0, id="c0", name="read")
+                yield StreamEvent(type="tool_call", index=0, arguments='{"delay": 0, ')
+                yield StreamEvent(type="tool_call", index=0, arguments='"label": "r0"}')
+                yield StreamEvent(type="finish", finish_reason="tool_calls")
+            else:
+                yield StreamEvent(type="text", text="done")
+                yield StreamEvent(type="finish", finish_reason="stop")
+
+    provider = _EventProvider([])
+    loop = AgentLoop(provider=provider, tools=registry, ctx_builder=ContextBuilder())
+
+    async def _collect():
+        return [
+            e
+            async for e in loop.stream(
+                auth=AUTH, session_id="s", history=[Message(role="user", content="go")]
+            )
+        ]
+
+    events = asyncio.run(_collect())
+    assert len(provider.seen) == 2
+    assert [e["content"] for e in events if e["type"] == "token"] == ["Checking", "done"]
+    assert events[-1]["tool_calls"] == [
+        {"id": "c0", "name": "read", "arguments": {"delay": 0, "label": "r0"}}
+    ]
+
+
+def _stream_with_decision(tmp_path: Path, decision: str) -> tuple[list[dict], _ScriptedProvider]:
+    registry, _ = _registry(tmp_path)
+    approvals = registry._policy._approvals  # noqa: SLF001
+    provider = _ScriptedProvider([_call(0, "danger", 0.0)])
+    loop = AgentLoop(provider=provider, tools=registry, ctx_builder=ContextBuilder())
+
+    async def _collect():
+        events = []
+        async for e in loop.stream(
+            auth=AUTH,
+            session_id="s",
+            history=[Message(role="user", content="go")],
+            wait_for_approval=True,
+        ):
+            events.append(e)
+            if e["type"] == "approval_required":
+                # Resolved from "another request" while the stream stays open.
+                assert approvals.is_awaited(e["approval_id"])
+                asyncio.get_running_loop().call_soon(
+                    approvals.resolve, e["approval_id"], decision, "test"
+                )
+        return events
+
+    return asyncio.run(_collect()), provider
+
+
+def test_stream_waits_for_approval_and_continues(tmp_path: Path):
+    events, provider = _stream_with_decision(tmp_path, "allow")
+    types = [e["type"] for e in events]
+    assert types.index("approval_required") < types.index("approval_resolved")
+    assert types.index("approval_resolved") < types.index("tool_result")
+    assert events[-1] == {
+        "type": "done",
+        "session_id": "s",
+        "pending_approval_id": None,
+        "tool_calls": [_call(0, "danger", 0.0)],
+    }
+    # Same turn: the model saw the tool result without a /chat/continue round-trip.
+    assert len(provider.seen) == 2
+    assert [m["content"] for m in provider.seen[1] if m["role"] == "tool"] == ["r0"]
+
+
+def test_stream_denied_approval_reports_error_to_model(tmp_path: Path):
+    events, provider = _stream_with_decision(tmp_path, "deny")
+    resolved = next(e for e in events if e["type"] == "approval_resolved")
+    assert resolved["decision"] == "deny"
+    tool_msg = next(m for m in provider.seen[1] if m["role"] == "tool")
+    assert "Approval denied" in tool_msg["content"]
@@ -60,3 +60,25 @@ def test_health_config_and_models_internal_contract(monkeypatch, tmp_path):
         st = client.get("/models/internal/status", headers=headers)
         assert st.status_code == 200
         assert "installed" in st.json()
+
+
+def test_malformed_image_data_is_rejected(monkeypatch, tmp_path):
+    monkeypatch.setenv("ROVOT_DATA_DIR", str(tmp_path / "data"))
+    monkeypatch.setenv("ROVOT_WORKSPACE_DIR", str(tmp_path / "ws"))
+
+    async def _noop_shutdown():
+        return None
+
+    monkeypatch.setattr("rovot.server.app.shutdown_browser", _noop_shutdown)
+
+    from rovot.server.app import create_app
+
+    app = create_app()
+    headers = {"Authorization": f"Bearer {app.state.rovot_state.auth_token}"}
+    body = {"message": "look", "images": [{"base64_data": "not base64!"}]}
+
+    with TestClient(app) as client:
+        for path in ("/chat", "/chat/stream"):
+            r = client.post(path, headers=headers, json=body)
+            assert r.status_code == 400, path
+            assert "Invalid image data" in r.json()["detail"]
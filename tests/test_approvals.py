@@ -42,3 +42,84 @@ def test_consume_is_one_shot(tmp_path: Path):
     mgr.resolve(a.id, "allow", resolved_by="test")
     assert mgr.consume(a.id)
     assert not mgr.consume(a.id)  # already consumed, cannot replay
+
+
+def _create(mgr: ApprovalManager, timeout_ms: int = 300000):
+    return mgr.create(
+        tool_name="exec.run",
+        summary="run ls",
+        session_id="s1",
+        tool_arguments={"command": "ls"},
+        timeout_ms=timeout_ms,
+    )
+
+
+def test_changes_append_to_log_and_survive_restart(tmp_path: Path):
+    path = tmp_path / "approvals.json"
+    mgr = ApprovalManager(path)
+    a = _create(mgr)
+    b = _create(mgr)
+    mgr.resolve(a.id, "deny", resolved_by="test")
+    log = path.with_suffix(".jsonl")
+    assert len(log.read_text("utf-8").splitlines()) == 3
+    assert not path.exists()  # nothing rewritten yet
+
+    reloaded = ApprovalManager(path)
+    assert reloaded.get(a.id).status == "deny"  # type: ignore[union-attr]
+    assert [p.id for p in reloaded.pending()] == [b.id]
+    # Startup folds the log into the snapshot.
+    assert path.exists() and not log.exists()
+
+
+def test_log_is_compacted_into_snapshot(tmp_path: Path):
+    path = tmp_path / "approvals.json"
+    mgr = ApprovalManager(path, snapshot_every=4)
+    ids = [_create(mgr).id for _ in range(5)]
+    assert len(path.with_suffix(".jsonl").read_text("utf-8").splitlines()) == 1
+    assert {a.id for a in ApprovalManager(path).pending()} == set(ids)
+
+
+def test_pending_expires_from_heap_without_rewrite(tmp_path: Path):
+    path = tmp_path / "approvals.json"
+    mgr = ApprovalManager(path)
+    stale = _create(mgr, timeout_ms=-1)
+    fresh = _create(mgr)
+    log = path.with_suffix(".jsonl")
+    assert [a.id for a in mgr.pending()] == [fresh.id]
+    assert mgr.get(stale.id).status == "expired"  # type: ignore[union-attr]
+    lines = len(log.read_text("utf-8").splitlines())
+    mgr.pending()
+    assert len(log.read_text("utf-8").splitlines()) == lines  # nothing changed, nothing written
+
+
+def test_gc_drops_finished_records_past_retention(tmp_path: Path):
+    mgr = ApprovalManager(tmp_path / "approvals.json", retention_ms=1000)
+    done = _create(mgr)
+    mgr.resolve(done.id, "allow", resolved_by="test")
+    mgr.consume(done.id)
+    waiting = _create(mgr)
+    assert mgr.gc(now=done.consumed_at_ms + 500) == 0  # type: ignore[operator]
+    assert mgr.gc(now=done.consumed_at_ms + 2000) == 1  # type: ignore[operator]
+    assert mgr.get(done.id) is None
+    assert mgr.get(waiting.id) is not None
+    assert ApprovalManager(tmp_path / "approvals.json").get(done.id) is None
+
+
+def test_wait_returns_decision_or_expiry(tmp_path: Path):
+    import asyncio
+
+    mgr = ApprovalManager(tmp_path / "approvals.json")
+
+    async def _go():
+        a = _create(mgr)
+        asyncio.get_running_loop().call_later(0.01, mgr.resolve, a.id, "allow", "test")
+        allowed = await mgr.wait(a.id)
+        short = _create(mgr, timeout_ms=20)
+        expired = await mgr.wait(short.id)
+        return allowed, expired, short
+
+    allowed, expired, short = asyncio.run(_go())
+    assert allowed == "allow"
+    assert expired == "expired"
+    assert mgr.get(short.id).status == "expired"  # type: ignore[union-attr]
+    assert not mgr.is_awaited(short.id)
@@ -0,0 +1,135 @@
+"""Tests for rolling summarization of evicted session history."""
+from __future__ import annotations
+
+import asyncio
+from pathlib import Path
+
+from rovot.agent.compaction import compact, schedule_compaction, wait_for_compaction
+from rovot.agent.context import ContextBuilder, Message
+from rovot.agent.sessions import SessionCache, SessionStore, SessionSummary
+from rovot.providers.base import ChatResponse
+
+
+class _RecordingProvider:
+    def __init__(self):
+        self.prompts: list[str] = []
+
+    async def chat(self, messages, tools=None):
+        self.prompts.append(messages[-1]["content"])
+        return ChatResponse(content=f"summary #{len(self.prompts)}", tool_calls=[], usage={})
+
+
+def _fill(store: SessionStore, n: int):
+    session = store.create()
+    for i in range(n):
+        session.append(Message(role="user", content=f"msg{i}"))
+    return session
+
+
+def test_compaction_is_incremental(tmp_path: Path):
+    store = SessionStore(root=tmp_path, cache=SessionCache(max_sessions=0))
+    session = _fill(store, 10)
+    provider = _RecordingProvider()
+
+    summary = asyncio.run(compact(session, provider, 4))
+    assert summary == SessionSummary(covered=4, text="summary #1")
+    assert "msg3" in provider.prompts[0] and "msg4" not in provider.prompts[0]
+
+    summary = asyncio.run(compact(session, provider, 7))
+    assert summary.covered == 7
+    # Only the newly evicted messages are sent, together with the old summary.
+    assert "summary #1" in provider.prompts[1]
+    assert "msg3" not in provider.prompts[1]
+    assert all(f"msg{i}" in provider.prompts[1] for i in (4, 5, 6))
+
+    # Already covered: no model call.
+    asyncio.run(compact(session, provider, 7))
+    assert len(provider.prompts) == 2
+    assert session.summary_path == tmp_path / f"{session.id}.summary.json"
+    assert session.read_summary() == SessionSummary(covered=7, text="summary #2")
+
+
+def test_schedule_runs_in_background(tmp_path: Path):
+    store = SessionStore(root=tmp_path)
+    session = _fill(store, 5)
+    provider = _RecordingProvider()
+
+    async def _go():
+        schedule_compaction(session, provider, 3)
+        schedule_compaction(session, provider, 3)  # deduplicated while in flight
+        await wait_for_compaction(session)
+
+    asyncio.run(_go())
+    assert len(provider.prompts) == 1
+    assert session.read_summary().covered == 3
+
+
+def test_summary_replaces_omission_marker():
+    builder = ContextBuilder(system_prompt="SYS", max_context_messages=10)
+    history = [Message(role="user", content="latest")]
+
+    ctx = builder.build(history, None, omitted=5)
+    assert ctx.system_prompt.startswith("[Earlier conversation omitted]")
+
+    ctx = builder.build(history, None, omitted=5, summary="user likes tea")
+    assert "omitted" not in ctx.system_prompt
+    assert ctx.system_prompt.startswith("SYS")
+    assert ctx.system_prompt.endswith("user likes tea")
+
+
+def test_budget_trim_past_the_summary_is_still_marked():
+    builder = ContextBuilder(system_prompt="SYS", max_context_messages=2)
+    history = [Message(role="user", content=str(i)) for i in range(4)]
+
+    ctx = builder.build(history, None, omitted=5, summary="user likes tea")
+    assert [m.content for m in ctx.messages] == ["2", "3"]
+    assert "user likes tea" in ctx.system_prompt
+    assert ctx.system_prompt.endswith("[Messages after this summary omitted]")
+
+
+def test_lagging_summary_still_marks_the_uncovered_messages():
+    builder = ContextBuilder(system_prompt="SYS", max_context_messages=10)
+    history = [Message(role="user", content="latest")]
+
+    # Background compaction has only summarized 3 of the 5 omitted messages.
+    ctx = builder.build(history, None, omitted=5, summary="user likes tea", covered=3)
+    assert "user likes tea" in ctx.system_prompt
+    assert ctx.system_prompt.endswith("[Messages after this summary omitted]")
+
+    ctx = builder.build(history, None, omitted=5, summary="user likes tea", covered=5)
+    assert "omitted" not in ctx.system_prompt
+
+
+def test_compaction_starts_after_the_turn_in_its_session(tmp_path: Path):
+    from types import SimpleNamespace
+
+    from rovot.config import AppConfig
+    from rovot.inference_scheduler import inference_session
+    from rovot.server.routes.chat import _compact_after_turn, _load_history
+
+    sessions: list[str | None] = []
+
+    class _Provider(_RecordingProvider):
+        async def chat(self, messages, tools=None):
+            sessions.append(inference_session.get())
+            return await super().chat(messages, tools)
+
+    store = SessionStore(root=tmp_path)
+    session = _fill(store, 5)
+    provider = _Provider()
+    state = SimpleNamespace(config_store=SimpleNamespace(config=AppConfig(max_context_messages=3)))
+    agent = SimpleNamespace(provider=provider)
+
+    async def _turn():
+        history, omitted, _, covered = _load_history(state, session)
+        await asyncio.sleep(0)
+        assert provider.prompts == []  # loading history never starts a model call
+        inference_session.set(session.id)
+        session.append(Message(role="assistant", content="reply"))
+        _compact_after_turn(state, session, agent)
+        await wait_for_compaction(session)
+        return omitted, covered
+
+    assert asyncio.run(_turn()) == (2, 0)
+    assert sessions == [session.id]
+    assert session.read_summary().covered == 3
@@ -0,0 +1,211 @@
+"""Tests for resumable, segmented model downloads."""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+
+import httpx
+
+from rovot import downloads
+from rovot.downloads import QUEUE_FILENAME, DownloadManager
+
+URL = "https://huggingface.co/org/repo/resolve/main/tiny.gguf"
+BLOB = bytes(range(256)) * 400  # 100 KiB
+
+
+class _Server:
+    """Range-capable mock of the Hugging Face resolve endpoint."""
+
+    def __init__(self, blob: bytes = BLOB, sha256: str | None = None):
+        self.blob = blob
+        self.sha256 = sha256 or hashlib.sha256(blob).hexdigest()
+        self.served = 0
+        self.ranges: list[str] = []
+        self.fail_after: int | None = None  # drop the connection after this many bytes
+        # Range start -> status codes to answer with before serving it.
+        self.errors: dict[int, list[int]] = {}
+        self.chunk_delay = 0.0
+
+    def _body(self, data: bytes):
+        async def gen():
+            for i in range(0, len(data), 4096):
+                await asyncio.sleep(self.chunk_delay)
+                if self.fail_after is not None and self.served >= self.fail_after:
+                    raise httpx.ReadError("connection reset")
+                piece = data[i : i + 4096]
+                self.served += len(piece)
+                yield piece
+
+        return gen()
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        headers = {
+            "accept-ranges": "bytes",
+            "x-linked-etag": f'"{self.sha256}"',
+            "content-length": str(len(self.blob)),
+        }
+        if request.method == "HEAD":
+            return httpx.Response(200, headers=headers)
+        rng = request.headers.get("range")
+        self.ranges.append(rng)
+        start, end = (int(x) for x in rng.removeprefix("bytes=").split("-"))
+        if self.errors.get(start):
+            return httpx.Response(self.errors[start].pop(0))
+        data = self.blob[start : end + 1]
+        headers["content-length"] = str(len(data))
+        headers["content-range"] = f"bytes {start}-{end}/{len(self.blob)}"
+        return httpx.Response(206, headers=headers, content=self._body(data))
+
+    def manager(self, tmp_path, **kwargs) -> tuple[DownloadManager, list[tuple[str, dict]]]:
+        events: list[tuple[str, dict]] = []
+
+        async def emit(event, payload):
+            events.append((event, payload))
+
+        transport = httpx.MockTransport(self.handler)
+        mgr = DownloadManager(
+            tmp_path,
+            emit,
+            client_factory=lambda: httpx.AsyncClient(transport=transport),
+            retry_delay=0,
+            **kwargs,
+        )
+        return mgr, events
+
+
+def _small_segments(monkeypatch):
+    monkeypatch.setattr(downloads, "MIN_SEGMENT_BYTES", 16 << 10)
+    monkeypatch.setattr(downloads, "CHUNK_BYTES", 4096)
+
+
+def test_segmented_download_is_verified_and_renamed(tmp_path, monkeypatch):
+    _small_segments(monkeypatch)
+    server = _Server()
+    mgr, events = server.manager(tmp_path, max_segments=4)
+
+    assert mgr.add("tiny.gguf", URL) == "downloading"
+    asyncio.run(mgr.process())
+
+    assert (tmp_path / "tiny.gguf").read_bytes() == BLOB
+    assert not (tmp_path / "tiny.gguf.part").exists()
+    assert len(server.ranges) == 4
+    assert events[-1] == ("model_download_complete", {"filename": "tiny.gguf"})
+    assert json.loads((tmp_path / QUEUE_FILENAME).read_text()) == []
+
+
+def test_interrupted_download_resumes_from_partial_file(tmp_path, monkeypatch):
+    _small_segments(monkeypatch)
+    monkeypatch.setattr(downloads, "MAX_RETRIES", 0)
+    server = _Server()
+    server.fail_after = 40 << 10
+    mgr, events = server.manager(tmp_path, max_segments=1)
+
+    mgr.add("tiny.gguf", URL)
+    asyncio.run(mgr.process())
+    assert events[-1][0] == "model_download_error"
+    assert events[-1][1]["resumable"] is True
+    assert (tmp_path / "tiny.gguf.part").exists()
+    assert not (tmp_path / "tiny.gguf").exists()
+
+    # A fresh manager (daemon restart) picks the job up from the queue file.
+    server.fail_after = None
+    server.served = 0
+    mgr, events = server.manager(tmp_path, max_segments=1)
+    assert mgr.jobs()[0]["bytes_downloaded"] == 40 << 10
+    mgr.add("tiny.gguf", URL)
+    asyncio.run(mgr.process())
+
+    assert (tmp_path / "tiny.gguf").read_bytes() == BLOB
+    assert server.served == len(BLOB) - (40 << 10)
+    assert server.ranges[-1] == f"bytes={40 << 10}-{len(BLOB) - 1}"
+
+
+def test_resume_continues_jobs_left_running_at_shutdown(tmp_path, monkeypatch):
+    _small_segments(monkeypatch)
+    server = _Server()
+    mgr, _ = server.manager(tmp_path)
+    mgr.add("tiny.gguf", URL)
+    mgr._jobs["tiny.gguf"].status = "downloading"
+    mgr._save()
+
+    mgr, events = server.manager(tmp_path)
+
+    async def _go():
+        task = mgr.resume()
+        assert task is not None
+        await task
+
+    asyncio.run(_go())
+    assert (tmp_path / "tiny.gguf").read_bytes() == BLOB
+    assert events[-1][0] == "model_download_complete"
+
+
+def test_hash_mismatch_discards_the_download(tmp_path, monkeypatch):
+    _small_segments(monkeypatch)
+    server = _Server(sha256="0" * 64)
+    mgr, events = server.manager(tmp_path)
+
+    mgr.add("tiny.gguf", URL)
+    asyncio.run(mgr.process())
+
+    assert not (tmp_path / "tiny.gguf").exists()
+    assert not (tmp_path / "tiny.gguf.part").exists()
+    assert events[-1][0] == "model_download_error"
+    assert "SHA-256 mismatch" in events[-1][1]["error"]
+
+
+def test_transient_server_errors_are_retried(tmp_path, monkeypatch):
+    _small_segments(monkeypatch)
+    server = _Server()
+    server.errors = {0: [503, 429]}
+    mgr, events = server.manager(tmp_path, max_segments=4)
+
+    mgr.add("tiny.gguf", URL)
+    asyncio.run(mgr.process())
+
+    assert (tmp_path / "tiny.gguf").read_bytes() == BLOB
+    assert events[-1][0] == "model_download_complete"
+
+
+def test_failed_segment_stops_the_others(tmp_path, monkeypatch):
+    _small_segments(monkeypatch)
+    server = _Server()
+    server.chunk_delay = 0.01
+    server.errors = {0: [404]}  # not retryable
+    mgr, events = server.manager(tmp_path, max_segments=4)
+
+    async def _go():
+        mgr.add("tiny.gguf", URL)
+        await mgr.process()
+        done = mgr.jobs()[0]["bytes_downloaded"]
+        others = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        await asyncio.sleep(0.1)
+        return done, others, mgr.jobs()[0]["bytes_downloaded"]
+
+    done, others, later = asyncio.run(_go())
+    assert events[-1][0] == "model_download_error"
+    assert "404" in events[-1][1]["error"]
+    assert others == []
+    assert later == done
+
+
+def test_adding_a_running_download_leaves_it_alone(tmp_path, monkeypatch):
+    _small_segments(monkeypatch)
+    server = _Server()
+    server.chunk_delay = 0.01
+    mgr, _ = server.manager(tmp_path)
+
+    async def _go():
+        mgr.add("tiny.gguf", URL)
+        worker = asyncio.create_task(mgr.process())
+        await asyncio.sleep(0.05)
+        status = mgr.add("tiny.gguf", URL + "?other")
+        part_exists = mgr.part_path("tiny.gguf").exists()
+        await worker
+        return status, part_exists
+
+    status, part_exists = asyncio.run(_go())
+    assert status == "downloading"
+    assert part_exists
+    assert (tmp_path / "tiny.gguf").read_bytes() == BLOB
@@ -0,0 +1,115 @@
+"""Tests for bounded exec output capture, timeouts and progress streaming."""
+from __future__ import annotations
+
+import asyncio
+import sys
+import time
+
+from rovot.agent.tools.exec_runner import ExecLimits, OutputBuffer, run_bounded
+
+
+def test_output_buffer_keeps_head_and_tail():
+    buf = OutputBuffer(20)
+    for i in range(1000):
+        buf.write(f"{i:04d}\n".encode())
+    text = buf.text()
+    assert buf.total == 5000 and buf.truncated
+    assert text.startswith("0000\n0001\n")
+    assert text.endswith("0998\n0999\n")
+    assert "[4980 bytes omitted]" in text
+
+
+def test_large_output_is_truncated_not_buffered():
+    code = "import sys\nfor i in range(200000): sys.stdout.write(f'line {i}\\n')"
+    result = asyncio.run(
+        run_bounded([sys.executable, "-c", code], limits=ExecLimits(max_output_bytes=4096))
+    )
+    assert result["exit_code"] == 0
+    assert len(result["stdout"]) < 4200
+    assert result["stdout"].startswith("line 0\n")
+    assert result["stdout"].endswith("line 199999\n")
+    assert result["output_bytes"]["stdout"] > 2_000_000
+
+
+def test_idle_timeout_kills_the_process_group():
+    # The shell's background child shares the group and must die too.
+    script = "sleep 30 & echo started; wait"
+    t0 = time.monotonic()
+    result = asyncio.run(
+        run_bounded(["sh", "-c", script], limits=ExecLimits(timeout=20, idle_timeout=0.5))
+    )
+    assert time.monotonic() - t0 < 5
+    assert result["timed_out"] == "idle"
+    assert result["stdout"] == "started\n"
+    assert "no output for 0.5s" in result["stderr"]
+
+
+def test_wall_timeout_applies_even_with_steady_output():
+    code = "import time\nwhile True:\n    print('tick', flush=True)\n    time.sleep(0.05)"
+    result = asyncio.run(
+        run_bounded(
+            [sys.executable, "-c", code], limits=ExecLimits(timeout=0.6, idle_timeout=5)
+        )
+    )
+    assert result["timed_out"] == "wall"
+    assert "tick" in result["stdout"]
+
+
+def test_lines_are_streamed_in_batches():
+    batches: list[tuple[str, list[str]]] = []
+    code = (
+        "import sys, time\n"
+        "print('a'); print('b', flush=True); time.sleep(0.3)\n"
+        "print('err', file=sys.stderr, flush=True); sys.stdout.write('no newline')"
+    )
+    result = asyncio.run(
+        run_bounded(
+            [sys.executable, "-c", code],
+            limits=ExecLimits(progress_interval=0.1),
+            on_lines=lambda stream, lines: batches.append((stream, lines)),
+        )
+    )
+    assert result["exit_code"] == 0
+    streamed = {
+        name: [line for s, lines in batches if s == name for line in lines]
+        for name in ("stdout", "stderr")
+    }
+    assert streamed == {"stdout": ["a", "b", "no newline"], "stderr": ["err"]}
+
+
+def test_lines_are_flushed_while_the_command_is_quiet():
+    seen: list[tuple[float, list[str]]] = []
+    code = "import time\nprint('first', flush=True)\ntime.sleep(1)"
+
+    async def _go():
+        t0 = time.monotonic()
+        await run_bounded(
+            [sys.executable, "-c", code],
+            limits=ExecLimits(progress_interval=0.1),
+            on_lines=lambda stream, lines: seen.append((time.monotonic() - t0, lines)),
+        )
+
+    asyncio.run(_go())
+    assert seen[0][1] == ["first"]
+    assert seen[0][0] < 0.8  # not held back until the process exits
+
+
+def test_cancelled_run_still_cleans_up():
+    killed: list[bool] = []
+
+    async def _on_kill():
+        killed.append(True)
+
+    async def _go():
+        task = asyncio.create_task(
+            run_bounded(["sleep", "30"], limits=ExecLimits(), on_kill=_on_kill)
+        )
+        await asyncio.sleep(0.2)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    asyncio.run(_go())
+    assert killed == [True]
@@ -0,0 +1,72 @@
+"""Tests for the shared provider HTTP client pool."""
+from __future__ import annotations
+
+import asyncio
+import json
+
+import httpx
+
+from rovot.config import HttpPoolConfig
+from rovot.providers import http_pool
+from rovot.providers.openai_compat import OpenAICompatProvider
+
+
+def test_client_reused_per_base_url():
+    async def _run():
+        a = http_pool.get_http_client("http://localhost:1234/v1")
+        b = http_pool.get_http_client("http://localhost:1234/v1/")
+        c = http_pool.get_http_client("http://localhost:5678/v1")
+        d = http_pool.get_http_client("http://localhost:1234/v1", HttpPoolConfig(max_connections=2))
+        assert a is b
+        assert a is not c
+        assert a is not d
+        # New pool settings replace the client; the old one is closed.
+        await asyncio.sleep(0)
+        assert a.is_closed and not d.is_closed
+        assert len(http_pool._clients) == 2
+        await http_pool.close_http_clients()
+        assert d.is_closed and c.is_closed
+        assert http_pool.get_http_client("http://localhost:1234/v1") is not a
+        await http_pool.close_http_clients()
+
+    asyncio.run(_run())
+
+
+def test_client_not_shared_across_event_loops():
+    async def _get():
+        return http_pool.get_http_client("http://localhost:1234/v1")
+
+    first = asyncio.run(_get())
+    second = asyncio.run(_get())
+    assert first is not second
+    assert list(http_pool._clients.values())[0][0] is second
+    asyncio.run(http_pool.close_http_clients())
+
+
+def test_provider_calls_share_one_client(monkeypatch):
+    requests: list[httpx.Request] = []
+
+    def _handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        body = {"choices": [{"message": {"content": "hi"}}]}
+        return httpx.Response(200, content=json.dumps(body))
+
+    clients: list[httpx.AsyncClient] = []
+
+    def _get_client(base_url, pool=None):
+        if not clients:
+            clients.append(httpx.AsyncClient(transport=httpx.MockTransport(_handler)))
+        return clients[0]
+
+    monkeypatch.setattr("rovot.providers.openai_compat.get_http_client", _get_client)
+
+    async def _run():
+        provider = OpenAICompatProvider(base_url="http://local/v1", model="m")
+        for _ in range(3):
+            resp = await provider.chat([{"role": "user", "content": "hello"}])
+            assert resp.content == "hi"
+        await clients[0].aclose()
+
+    asyncio.run(_run())
+    assert len(requests) == 3
+    assert len(clients) == 1
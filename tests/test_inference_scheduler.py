@@ -0,0 +1,111 @@
+"""Tests for built-in model admission control."""
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from rovot.inference_scheduler import InferenceQueueFull, InferenceScheduler
+
+
+def test_sessions_are_served_round_robin():
+    scheduler = InferenceScheduler(max_queue=10)
+    order: list[str] = []
+
+    async def _request(session: str, label: str, gate: asyncio.Event | None = None):
+        async with scheduler.slot(session):
+            order.append(label)
+            if gate is not None:
+                await gate.wait()
+
+    async def _run():
+        gate = asyncio.Event()
+        first = asyncio.create_task(_request("a", "a0", gate))
+        await asyncio.sleep(0)
+        tasks = [asyncio.create_task(_request("a", f"a{i}")) for i in range(1, 4)]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(_request("b", "b0")))
+        await asyncio.sleep(0)
+        assert scheduler.queue_depth() == 4
+        gate.set()
+        await asyncio.gather(first, *tasks)
+
+    asyncio.run(_run())
+    # Session b does not wait behind every queued request from session a.
+    assert order == ["a0", "a1", "b0", "a2", "a3"]
+    metrics = scheduler.metrics()
+    assert metrics["admitted"] == 5
+    assert metrics["queue_depth"] == 0
+    assert metrics["active"] == 0
+
+
+def test_full_queue_rejects_with_retry_after():
+    scheduler = InferenceScheduler(max_queue=1)
+
+    async def _hold(gate: asyncio.Event):
+        async with scheduler.slot("a"):
+            await gate.wait()
+
+    async def _run():
+        gate = asyncio.Event()
+        holder = asyncio.create_task(_hold(gate))
+        waiter = asyncio.create_task(_hold(gate))
+        await asyncio.sleep(0)
+        with pytest.raises(InferenceQueueFull) as info:
+            async with scheduler.slot("b"):
+                pass
+        assert info.value.retry_after >= 1
+        gate.set()
+        await asyncio.gather(holder, waiter)
+
+    asyncio.run(_run())
+    assert scheduler.metrics()["rejected"] == 1
+
+
+def test_cancelled_waiter_leaves_queue():
+    scheduler = InferenceScheduler(max_queue=4)
+
+    async def _run():
+        gate = asyncio.Event()
+
+        async def _hold():
+            async with scheduler.slot("a"):
+                await gate.wait()
+
+        holder = asyncio.create_task(_hold())
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(_hold())
+        await asyncio.sleep(0)
+        assert scheduler.queue_depth() == 1
+        waiter.cancel()
+        await asyncio.sleep(0)
+        assert scheduler.queue_depth() == 0
+        gate.set()
+        await holder
+        # The slot is free again for new requests.
+        async with scheduler.slot("b"):
+            assert scheduler.metrics()["active"] == 1
+
+    asyncio.run(_run())
+
+
+def test_chat_route_returns_429_when_internal_queue_full(tmp_path, monkeypatch):
+    from types import SimpleNamespace
+
+    from fastapi import HTTPException
+
+    from rovot.config import ConfigStore, ModelProviderMode
+    from rovot.internal_model import get_internal_provider
+    from rovot.server.routes.chat import _admit
+
+    store = ConfigStore(path=tmp_path / "config.json")
+    store.config.model.provider_mode = ModelProviderMode.INTERNAL
+    state = SimpleNamespace(config_store=store)
+    scheduler = InferenceScheduler(max_queue=0)
+    scheduler._active = 1
+    monkeypatch.setattr(get_internal_provider(), "scheduler", scheduler)
+
+    with pytest.raises(HTTPException) as info:
+        _admit(state)  # type: ignore[arg-type]
+    assert info.value.status_code == 429
+    assert int(info.value.headers["Retry-After"]) >= 1
@@ -0,0 +1,188 @@
+"""Tests for grammar-constrained tool calling with the built-in model."""
+from __future__ import annotations
+
+import asyncio
+import json
+
+import pytest
+
+from rovot.providers import internal as internal_provider
+from rovot.providers.base import ToolCallAssembler
+from rovot.providers.grammar import tool_call_grammar
+from rovot.providers.internal import InternalProvider
+
+TOOLS = [
+    {
+        "type": "function",
+        "function": {
+            "name": "fs.read",
+            "description": "Read a file",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "path": {"type": "string"},
+                    "limit": {"type": "integer"},
+                    "mode": {"enum": ["text", "bytes"]},
+                },
+                "required": ["path"],
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {"name": "web.search", "parameters": {"type": "object", "properties": {}}},
+    },
+]
+
+
+def test_grammar_constrains_names_and_arguments():
+    grammar = tool_call_grammar(TOOLS)
+    rules = dict(line.split(" ::= ", 1) for line in grammar.strip().splitlines())
+
+    assert rules["root"] == "calls | text"
+    assert rules["call"] == "call-fs-read | call-web-search"
+    assert '"\\"fs.read\\""' in rules["call-fs-read"]
+    args = rules["fs-read-args"]
+    # Required key first and unconditional; optional keys are optional and ordered.
+    assert args.startswith('"{" ws "\\"path\\"" ws ":" ws string ( ws "," ws "\\"limit\\""')
+    assert '( "\\"text\\"" | "\\"bytes\\"" )' in args
+    # A schema without properties falls back to any JSON object.
+    assert rules["call-web-search"].endswith('ws object ws "}"')
+    # Every referenced rule is defined.
+    referenced = {
+        tok for body in rules.values() for tok in body.split() if tok[0].isalpha()
+    }
+    assert referenced <= set(rules)
+
+
+def test_grammar_all_optional_properties():
+    grammar = tool_call_grammar(
+        [{"name": "t", "parameters": {"properties": {"a": {"type": "string"}, "b": {}}}}]
+    )
+    rules = dict(line.split(" ::= ", 1) for line in grammar.strip().splitlines())
+    assert rules["t-args"] == (
+        '"{" ws ( "\\"a\\"" ws ":" ws string ( ws "," ws "\\"b\\"" ws ":" ws value )? '
+        '| ( "\\"b\\"" ws ":" ws value )? ) ws "}"'
+    )
+
+
+@pytest.fixture
+def fake_model(monkeypatch):
+    seen: dict = {}
+
+    class _Model:
+        output = ""
+
+        def is_loaded(self):
+            return True
+
+        async def chat_stream(self, messages, model=None, grammar=None):
+            seen["messages"] = messages
+            seen["grammar"] = grammar
+            for i in range(0, len(self.output), 4):
+                yield self.output[i : i + 4]
+
+    fake = _Model()
+    monkeypatch.setattr(internal_provider, "get_internal_provider", lambda: fake)
+    return fake, seen
+
+
+def test_chat_parses_grammar_constrained_tool_call(fake_model):
+    fake, seen = fake_model
+    fake.output = json.dumps(
+        {"tool_calls": [{"name": "fs.read", "arguments": {"path": "notes.md"}}]}
+    )
+    history = [
+        {"role": "system", "content": "You are Rovot."},
+        {"role": "user", "content": "read it"},
+        {
+            "role": "assistant",
+            "content": "",
+            "tool_calls": [{"id": "c1", "name": "web.search", "arguments": {}}],
+        },
+        {"role": "tool", "tool_call_id": "c1", "content": "no results"},
+    ]
+
+    resp = asyncio.run(InternalProvider().chat(history, TOOLS))
+
+    assert resp.content == ""
+    assert [(tc["name"], tc["arguments"]) for tc in resp.tool_calls] == [
+        ("fs.read", {"path": "notes.md"})
+    ]
+    assert seen["grammar"].startswith("root ::= calls | text")
+    msgs = seen["messages"]
+    assert "fs.read" in msgs[0]["content"]
+    assert json.loads(msgs[2]["content"]) == {
+        "tool_calls": [{"name": "web.search", "arguments": {}}]
+    }
+    assert msgs[3] == {"role": "user", "content": "[web.search result]\nno results"}
+
+
+def test_stream_events_streams_text_and_buffers_calls(fake_model):
+    fake, seen = fake_model
+
+    async def _collect():
+        return [e async for e in InternalProvider().stream_events([], TOOLS)]
+
+    fake.output = "Hello there, friend"
+    events = asyncio.run(_collect())
+    assert "".join(e.text for e in events if e.type == "text") == "Hello there, friend"
+    assert len([e for e in events if e.type == "text"]) > 1
+    assert events[-1].finish_reason == "stop"
+
+    fake.output = '{"tool_calls": [{"name": "web.search", "arguments": {"q": "x"}}]}'
+    events = asyncio.run(_collect())
+    assert not [e for e in events if e.type == "text"]
+    assembler = ToolCallAssembler()
+    for e in events:
+        if e.type == "tool_call":
+            assembler.add(e)
+    assert [(tc["name"], tc["arguments"]) for tc in assembler.tool_calls()] == [
+        ("web.search", {"q": "x"})
+    ]
+    assert events[-1].finish_reason == "tool_calls"
+
+
+def test_no_grammar_without_tools(fake_model):
+    fake, seen = fake_model
+    fake.output = "plain"
+    resp = asyncio.run(InternalProvider().chat([{"role": "user", "content": "hi"}]))
+    assert resp.content == "plain"
+    assert seen["grammar"] is None
+
+
+def test_grammar_for_the_real_tool_set_compiles(tmp_path):
+    llama_cpp = pytest.importorskip("llama_cpp")
+    from rovot.config import ConfigStore, ModelProviderMode, Settings
+    from rovot.secrets import SecretsStore
+    from rovot.server.deps import AppState
+    from rovot.server.routes.chat import _build_agent
+
+    settings = Settings(data_dir=tmp_path / "data", workspace_dir=tmp_path / "ws")
+    settings.data_dir.mkdir(parents=True)
+    settings.workspace_dir.mkdir(parents=True)
+    cfg = ConfigStore(path=settings.data_dir / "config.json")
+    cfg.load()
+    cfg.config.model.provider_mode = ModelProviderMode.INTERNAL
+    cfg.config.connectors.browser_enabled = True
+    cfg.config.connectors.macos_automation_enabled = True
+    secrets = SecretsStore(service="rovot", fallback_path=settings.data_dir / "secrets.json")
+    secrets.use_keychain = False
+    state = AppState(
+        settings=settings,
+        config_store=cfg,
+        secrets=secrets,
+        auth_token="t",
+        startup_ts=0.0,
+        pid=1,
+        approvals=None,  # type: ignore[arg-type]
+        policy=None,  # type: ignore[arg-type]
+        ws=None,  # type: ignore[arg-type]
+        audit=None,
+    )
+    tools = asyncio.run(_build_agent(state))._tools.definitions()
+    assert tools
+
+    # llama.cpp's parser is stricter than our rule-shape checks above.
+    grammar = llama_cpp.LlamaGrammar.from_string(tool_call_grammar(tools), verbose=False)
+    assert grammar is not None
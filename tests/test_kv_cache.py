@@ -0,0 +1,91 @@
+"""Tests for the prompt-prefix KV-cache used by the built-in model."""
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+from pathlib import Path
+
+import pytest
+
+from rovot.kv_cache import PrefixStateCache
+
+
+@dataclass
+class _State:
+    label: str
+    llama_state_size: int = 100
+
+
+SYSTEM = list(range(100, 140))
+
+
+def test_longest_prefix_hit_counts_saved_tokens():
+    cache = PrefixStateCache()
+    assert cache  # Llama guards cache use with `if self.cache`
+    cache[SYSTEM + [1, 2]] = _State("turn1")
+    cache[SYSTEM + [1, 2, 3, 4, 5]] = _State("turn2")
+
+    state = cache[SYSTEM + [1, 2, 3, 4, 5, 6, 7]]
+    assert state.label == "turn2"
+    # Only a state llama-cpp actually restores counts.
+    assert cache.stats()["saved_tokens"] == 0
+    cache.confirm(state)
+    assert cache.stats()["saved_tokens"] == len(SYSTEM) + 5
+
+    # A different conversation still reuses the shared system-prompt prefix.
+    state = cache[SYSTEM + [9]]
+    assert state.label in {"turn1", "turn2"}
+    cache.confirm(state)
+    # Returned but not restored (llama-cpp had the prefix evaluated already).
+    cache[SYSTEM + [1, 2]]
+    with pytest.raises(KeyError):
+        cache[[1, 2, 3]]
+    stats = cache.stats()
+    assert stats["lookups"] == 4
+    assert stats["hits"] == 2 and stats["misses"] == 1 and stats["hit_rate"] == 0.5
+    assert stats["saved_tokens"] == 2 * len(SYSTEM) + 5
+
+
+def test_ram_budget_evicts_least_recently_used():
+    cache = PrefixStateCache(capacity_bytes=250)
+    cache[SYSTEM + [1]] = _State("a")
+    cache[[7] * 20 + [2]] = _State("b")
+    cache[SYSTEM + [1]]  # touch a
+    cache[[8] * 20 + [3]] = _State("c")
+
+    assert cache.stats()["ram_entries"] == 2
+    assert SYSTEM + [1] in cache
+    assert [7] * 20 + [2] not in cache
+
+
+def test_evicted_states_spill_to_disk_and_survive_restart(tmp_path: Path):
+    cache = PrefixStateCache(capacity_bytes=150, disk_dir=tmp_path)
+    cache[SYSTEM + [1]] = _State("a")
+    cache[[7] * 20] = _State("b")
+    assert cache.stats()["disk_entries"] == 1
+
+    reopened = PrefixStateCache(capacity_bytes=150, disk_dir=tmp_path)
+    assert reopened[SYSTEM + [1, 2]].label == "a"
+    assert reopened.stats()["disk_hits"] == 1
+
+
+def test_disk_entries_are_capped(tmp_path: Path):
+    cache = PrefixStateCache(capacity_bytes=0, disk_dir=tmp_path, max_disk_entries=2)
+    for i in range(5):
+        cache[[i] * 20] = _State(str(i))
+    assert cache.stats()["disk_entries"] == 2
+    assert len(list(tmp_path.glob("*.state"))) == 2
+
+
+def test_disk_cap_applies_to_states_found_at_startup(tmp_path: Path):
+    cache = PrefixStateCache(capacity_bytes=0, disk_dir=tmp_path, max_disk_entries=10)
+    for i in range(5):  # the last one stays in RAM
+        cache[[i] * 20] = _State(str(i))
+    for i, path in enumerate(sorted(tmp_path.glob("*.tokens"), key=lambda p: p.read_text())):
+        os.utime(path, (1000 + i, 1000 + i))  # written in key order
+
+    reopened = PrefixStateCache(capacity_bytes=0, disk_dir=tmp_path, max_disk_entries=2)
+    assert reopened.stats()["disk_entries"] == 2
+    assert len(list(tmp_path.glob("*.state"))) == 2
+    assert reopened[[3] * 20].label == "3"  # the newest states are kept
+    assert [0] * 20 not in reopened
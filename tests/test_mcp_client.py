@@ -0,0 +1,157 @@
+"""Tests for the multiplexed MCP stdio client against a scripted fake server."""
+from __future__ import annotations
+
+import asyncio
+import sys
+import time
+
+from rovot.connectors.mcp_client import McpClient, McpServerConfig
+
+# Answers each tools/call on its own task, so responses can arrive out of order.
+# Tools: sleep(seconds), spam(lines) to stderr, fail(),
+# cancelled() -> ids seen in notifications/cancelled.
+FAKE_SERVER = r'''
+import asyncio, json, sys
+
+cancelled = []
+
+def out(msg):
+    sys.stdout.write(json.dumps(msg) + "\n")
+    sys.stdout.flush()
+
+async def call(req):
+    name = req["params"]["name"]
+    args = req["params"]["arguments"]
+    if name == "sleep":
+        await asyncio.sleep(args["seconds"])
+        note = {"slept": args["seconds"]}
+        out({"jsonrpc": "2.0", "method": "notifications/message", "params": note})
+        text = f"slept {args['seconds']}"
+    elif name == "spam":
+        # Far more than a pipe buffer; blocks forever unless the client drains stderr.
+        for i in range(args["lines"]):
+            sys.stderr.write(f"log line {i} " + "x" * 100 + "\n")
+        sys.stderr.flush()
+        text = "done"
+    elif name == "fail":
+        out({"jsonrpc": "2.0", "id": req["id"], "error": {"code": -1, "message": "boom"}})
+        return
+    else:
+        text = json.dumps(cancelled)
+    content = [{"type": "text", "text": text}]
+    out({"jsonrpc": "2.0", "id": req["id"], "result": {"content": content}})
+
+async def main():
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader()
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+    tasks = set()
+    while line := await reader.readline():
+        req = json.loads(line)
+        method = req.get("method")
+        if method == "initialize":
+            out({"jsonrpc": "2.0", "id": req["id"], "result": {"capabilities": {}}})
+            # A server-initiated ping must be answered, not mistaken for a response.
+            out({"jsonrpc": "2.0", "id": "srv-1", "method": "ping"})
+        elif method == "tools/list":
+            out({"jsonrpc": "2.0", "id": req["id"], "result": {"tools": [{"name": "sleep"}]}})
+        elif method == "tools/call":
+            task = asyncio.create_task(call(req))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        elif method == "ping":
+            out({"jsonrpc": "2.0", "id": req["id"], "result": {}})
+        elif method == "notifications/cancelled":
+            cancelled.append(req["params"]["requestId"])
+
+asyncio.run(main())
+'''
+
+
+def _client(tmp_path) -> McpClient:
+    script = tmp_path / "fake_mcp.py"
+    script.write_text(FAKE_SERVER)
+    return McpClient(McpServerConfig(name="fake", command=[sys.executable, str(script)]))
+
+
+def test_calls_are_multiplexed_and_notifications_routed(tmp_path):
+    client = _client(tmp_path)
+    notes: list[dict] = []
+
+    async def _go():
+        client.on_notification("notifications/message", notes.append)
+        await client.start()
+        try:
+            t0 = time.monotonic()
+            finished: list[str] = []
+
+            async def call(seconds):
+                finished.append(await client.call_tool("sleep", {"seconds": seconds}))
+
+            await asyncio.gather(call(0.6), call(0.3), call(0.0))
+            elapsed = time.monotonic() - t0
+            err = await client.call_tool("fail", {})
+            return finished, elapsed, err
+        finally:
+            await client.stop()
+
+    finished, elapsed, err = asyncio.run(_go())
+    assert client._tools == [{"name": "sleep"}]
+    # Completion order follows the server, not the send order.
+    assert finished == ["slept 0.0", "slept 0.3", "slept 0.6"]
+    assert elapsed < 1.2
+    assert sorted(n["slept"] for n in notes) == [0.0, 0.3, 0.6]
+    assert err == {"error": {"code": -1, "message": "boom"}}
+
+
+def test_timeout_sends_cancellation_and_leaves_client_usable(tmp_path):
+    client = _client(tmp_path)
+
+    async def _go():
+        await client.start()
+        try:
+            slow = await client.call_tool("sleep", {"seconds": 5}, timeout=0.2)
+            pending_after = len(client._pending)
+            seen = await client.call_tool("cancelled", {})
+            return slow, pending_after, seen
+        finally:
+            await client.stop()
+
+    slow, pending_after, seen = asyncio.run(_go())
+    assert "timed out" in slow["error"]
+    assert pending_after == 0
+    assert seen == "[3]"  # initialize=1, tools/list=2, the timed-out call=3
+
+
+def test_pending_calls_fail_when_server_exits(tmp_path):
+    client = _client(tmp_path)
+
+    async def _go():
+        await client.start()
+        call = asyncio.create_task(client.call_tool("sleep", {"seconds": 5}))
+        await asyncio.sleep(0.1)
+        client._proc.kill()
+        result = await asyncio.wait_for(call, 5)
+        await client.stop()
+        return result
+
+    result = asyncio.run(_go())
+    assert "exited" in result["error"]["message"]
+
+
+def test_stderr_is_drained_into_a_bounded_tail(tmp_path):
+    client = _client(tmp_path)
+
+    async def _go():
+        await client.start()
+        try:
+            result = await client.call_tool("spam", {"lines": 5000}, timeout=10)
+            await client.ping()
+            await asyncio.sleep(0.1)
+            return result
+        finally:
+            await client.stop()
+
+    assert asyncio.run(_go()) == "done"
+    assert len(client.stderr_tail) == 200
+    assert client.stderr_tail[-1].startswith("log line 4999 ")
@@ -0,0 +1,237 @@
+"""Tests for lazy start, health checks and restart backoff of MCP servers."""
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+
+from rovot.agent.tools.builtin_mcp import register_mcp_tools
+from rovot.agent.tools.registry import ToolRegistry
+from rovot.connectors.mcp_client import McpServerConfig
+from rovot.connectors.mcp_supervisor import McpSupervisor
+from rovot.policy.approvals import ApprovalManager
+from rovot.policy.engine import PolicyEngine
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class _FakeClient:
+    """Stands in for McpClient; ``fail_starts`` makes the next N starts raise."""
+
+    instances: list["_FakeClient"] = []
+    fail_starts = 0
+    hang_starts = 0
+
+    def __init__(self, config: McpServerConfig):
+        self.config = config
+        self._tools = [{"name": "echo"}]
+        self.alive = False
+        self.ping_ok = True
+        self.stderr_tail: deque[str] = deque(["ready"])
+        self.handlers: dict = {}
+        _FakeClient.instances.append(self)
+
+    def on_notification(self, method, handler) -> None:
+        self.handlers[method] = handler
+
+    async def list_tools(self):
+        return self._tools
+
+    @property
+    def running(self) -> bool:
+        return self.alive
+
+    async def start(self) -> None:
+        if _FakeClient.fail_starts:
+            _FakeClient.fail_starts -= 1
+            raise OSError("spawn failed")
+        if _FakeClient.hang_starts:
+            _FakeClient.hang_starts -= 1
+            await asyncio.Event().wait()  # never answers initialize
+        self.alive = True
+
+    async def stop(self) -> None:
+        self.alive = False
+
+    async def ping(self, timeout: float = 10.0) -> None:
+        if not self.ping_ok:
+            raise asyncio.TimeoutError()
+
+    async def call_tool(self, tool_name, arguments):
+        return f"{tool_name}:{arguments['text']}"
+
+
+def _supervisor(clock: _Clock, catalog_path=None) -> McpSupervisor:
+    _FakeClient.instances = []
+    _FakeClient.fail_starts = 0
+    _FakeClient.hang_starts = 0
+    return McpSupervisor(
+        ping_interval=30, start_timeout=0.1, backoff_base=1, backoff_max=8, tick=3600,
+        client_factory=_FakeClient, clock=clock, catalog_path=catalog_path,
+    )
+
+
+CFG = McpServerConfig(name="fs", command=["fake"])
+
+
+def test_server_starts_on_first_call_and_reports_latency():
+    clock = _Clock()
+    sup = _supervisor(clock)
+
+    async def _go():
+        await sup.configure([CFG])
+        assert sup.status()[0]["status"] == "stopped"
+        assert not _FakeClient.instances
+        result = await sup.call_tool("fs", "echo", {"text": "hi"})
+        await sup.shutdown()
+        return result
+
+    assert asyncio.run(_go()) == "echo:hi"
+    assert len(_FakeClient.instances) == 1
+
+
+def test_crashed_server_restarts_with_backoff():
+    clock = _Clock()
+    sup = _supervisor(clock)
+
+    async def _go():
+        await sup.configure([CFG])
+        await sup.ensure("fs")
+        _FakeClient.instances[-1].alive = False  # crash
+        _FakeClient.fail_starts = 1
+
+        await sup.check()
+        st = sup.status()[0]
+        assert st["status"] == "backoff" and st["retry_in_seconds"] == 1
+        # Calls fail fast while backing off.
+        assert "restarting" in (await sup.call_tool("fs", "echo", {"text": "x"}))["error"]
+
+        clock.now += 1
+        await sup.check()  # restart attempt fails -> longer backoff
+        st = sup.status()[0]
+        assert st["status"] == "backoff" and st["retry_in_seconds"] == 2
+        assert "spawn failed" in st["last_error"]
+
+        clock.now += 2
+        await sup.check()
+        st = sup.status()[0]
+        await sup.shutdown()
+        return st
+
+    st = asyncio.run(_go())
+    assert st["status"] == "running"
+    assert st["restarts"] == 2
+    assert st["stderr_tail"] == ["ready"]
+
+
+def test_unresponsive_server_is_restarted_after_failed_ping():
+    clock = _Clock()
+    sup = _supervisor(clock)
+
+    async def _go():
+        await sup.configure([CFG])
+        await sup.ensure("fs")
+        _FakeClient.instances[-1].ping_ok = False
+        clock.now += 30
+        await sup.check()
+        assert not _FakeClient.instances[0].alive
+        clock.now += 1
+        await sup.check()
+        st = sup.status()[0]
+        await sup.shutdown()
+        return st
+
+    st = asyncio.run(_go())
+    assert st["status"] == "running"
+    assert st["restarts"] == 1
+    assert len(_FakeClient.instances) == 2
+
+
+def test_hung_start_times_out_and_backs_off():
+    clock = _Clock()
+    sup = _supervisor(clock)
+
+    async def _go():
+        await sup.configure([CFG])
+        _FakeClient.hang_starts = 1
+        first = await sup.call_tool("fs", "echo", {"text": "x"})
+        st = sup.status()[0]
+        clock.now += 1
+        second = await sup.call_tool("fs", "echo", {"text": "y"})
+        await sup.shutdown()
+        return first, st, second
+
+    first, st, second = asyncio.run(_go())
+    assert "no response within 0.1s" in first["error"]
+    assert st["status"] == "backoff" and st["retry_in_seconds"] == 1
+    assert second == "echo:y"
+
+
+def test_removed_server_is_stopped():
+    clock = _Clock()
+    sup = _supervisor(clock)
+
+    async def _go():
+        await sup.configure([CFG])
+        await sup.ensure("fs")
+        await sup.configure([])
+        await sup.shutdown()
+
+    asyncio.run(_go())
+    assert sup.status() == []
+    assert not _FakeClient.instances[0].alive
+
+
+def test_persisted_catalog_advertises_tools_without_starting(tmp_path):
+    path = tmp_path / "mcp_catalog.json"
+
+    async def _first():
+        sup = _supervisor(_Clock(), path)
+        await sup.configure([CFG])
+        catalog = await sup.catalog()  # unknown server: started to discover tools
+        await sup.shutdown()
+        return catalog
+
+    async def _second(cfg):
+        sup = _supervisor(_Clock(), path)
+        await sup.configure([cfg])
+        catalog = await sup.catalog()
+        await sup.shutdown()
+        return catalog
+
+    assert asyncio.run(_first()) == {"fs": [{"name": "echo"}]}
+    assert asyncio.run(_second(CFG)) == {"fs": [{"name": "echo"}]}
+    assert not _FakeClient.instances  # advertised from the cache
+    # A different command is a different catalog.
+    changed = McpServerConfig(name="fs", command=["fake", "--v2"])
+    asyncio.run(_second(changed))
+    assert len(_FakeClient.instances) == 1
+
+
+def test_list_changed_updates_registry_in_place(tmp_path):
+    sup = _supervisor(_Clock())
+    registry = ToolRegistry(PolicyEngine(ApprovalManager(tmp_path / "approvals.json")))
+
+    async def _go():
+        await sup.configure([CFG])
+        register_mcp_tools(registry, sup, await sup.catalog())
+        before = registry.names()
+        client = _FakeClient.instances[-1]
+        client._tools = [{"name": "echo"}, {"name": "grep", "description": "search"}]
+        client.handlers["notifications/tools/list_changed"]({})
+        await asyncio.sleep(0.01)
+        after = registry.names()
+        result = await registry._tools["mcp_fs__echo"].fn(text="hi")
+        await sup.shutdown()
+        return before, after, result
+
+    before, after, result = asyncio.run(_go())
+    assert before == ["mcp_fs__echo"]
+    assert after == ["mcp_fs__echo", "mcp_fs__grep"]
+    assert result == "echo:hi"
+    assert sup.status()[0]["tools"] == ["echo", "grep"]
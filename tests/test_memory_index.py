@@ -0,0 +1,182 @@
+"""Tests for BM25 retrieval over persistent memory files."""
+from __future__ import annotations
+
+import asyncio
+import os
+from pathlib import Path
+
+from rovot.agent import memory, memory_index
+from rovot.agent.context import ContextBuilder, Message
+from rovot.agent.memory_index import MemoryIndex, chunk_markdown
+
+
+def _write(root: Path, name: str, text: str) -> None:
+    path = root / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, "utf-8")
+
+
+def test_chunks_split_on_headings_and_size():
+    text = "# Editor\nUses vim.\n\n# Pets\nHas a cat named Miso.\n\n" + "word " * 400
+    chunks = chunk_markdown(text, max_chars=300)
+    assert chunks[0] == ("Editor", "Uses vim.")
+    assert chunks[1][0] == "Pets" and chunks[1][1].startswith("Has a cat")
+    assert all(len(body) <= 300 for _, body in chunks)
+
+
+def test_search_ranks_relevant_chunk_first(tmp_path: Path):
+    _write(tmp_path, "prefs.md", "# Editor\nThe user prefers neovim with tabs.\n")
+    _write(tmp_path, "pets.md", "# Pets\nThe user has a cat named Miso.\n")
+    _write(tmp_path, "work/project.md", "Deploys go through the staging cluster first.\n")
+    index = MemoryIndex(tmp_path)
+
+    hits = index.search("what is my cat called?", k=2)
+    assert hits[0].path == "pets.md"
+    assert "Miso" in hits[0].text
+    assert index.search("staging deploys")[0].path == "work/project.md"
+    assert index.search("unrelated quantum") == []
+
+
+def test_index_persists_and_updates_incrementally(tmp_path: Path):
+    _write(tmp_path, "a.md", "alpha notes")
+    _write(tmp_path, "b.md", "beta notes")
+    index = MemoryIndex(tmp_path)
+    assert index.refresh() == 2
+    assert (tmp_path / ".index.json").exists()
+
+    reloaded = MemoryIndex(tmp_path)
+    # Unchanged files are not re-read after a restart.
+    assert reloaded.refresh() == 0
+    assert reloaded.search("beta")[0].path == "b.md"
+
+    _write(tmp_path, "b.md", "gamma notes now")
+    stat = (tmp_path / "b.md").stat()
+    os.utime(tmp_path / "b.md", ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    (tmp_path / "a.md").unlink()
+    assert reloaded.refresh() == 2
+    assert reloaded.search("beta") == []
+    assert reloaded.search("gamma")[0].path == "b.md"
+    assert reloaded.paths() == ["b.md"]
+
+
+def test_write_and_delete_update_index(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(memory, "MEMORY_DIR", tmp_path)
+    memory.write_memory("tea.md", "Favourite drink: oolong tea")
+    index = memory.get_memory_index()
+    assert index.stats()["files"] == 1
+    assert "oolong" in asyncio.run(memory.recall_memory("which tea do I like?"))
+
+    memory.delete_memory("tea.md")
+    assert index.stats()["files"] == 0
+    assert asyncio.run(memory.recall_memory("which tea do I like?")) == ""
+
+
+def test_writes_append_to_a_log_until_compaction(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(memory_index, "COMPACT_MIN_ENTRIES", 3)
+    _write(tmp_path, "a.md", "alpha notes")
+    index = MemoryIndex(tmp_path)
+    index.refresh()
+    snapshot = (tmp_path / ".index.json").read_bytes()
+
+    _write(tmp_path, "b.md", "beta notes")
+    index.update("b.md")
+    (tmp_path / "a.md").unlink()
+    index.remove("a.md")
+    # Single-file changes do not rewrite the snapshot.
+    assert (tmp_path / ".index.json").read_bytes() == snapshot
+    assert len((tmp_path / ".index.log").read_text("utf-8").splitlines()) == 2
+
+    reloaded = MemoryIndex(tmp_path)
+    assert reloaded.paths() == ["b.md"]
+    assert reloaded.refresh() == 0
+    assert reloaded.search("beta")[0].path == "b.md"
+
+    for name in ("c.md", "d.md"):
+        _write(tmp_path, name, f"notes {name}")
+        reloaded.update(name)
+    # The fourth change found a full log and folded it into the snapshot.
+    assert not (tmp_path / ".index.log").exists()
+    assert MemoryIndex(tmp_path).paths() == ["b.md", "c.md", "d.md"]
+
+
+def test_recall_injects_only_relevant_chunks(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(memory, "MEMORY_DIR", tmp_path)
+    memory.write_memory("pets.md", "The user has a cat named Miso.")
+    memory.write_memory("car.md", "The user drives a blue bicycle, not a car.")
+    builder = ContextBuilder(system_prompt="SYS")
+    history = [Message(role="user", content="Remind me of my cat's name")]
+
+    block = asyncio.run(builder.recall(history))
+    assert "Miso" in block and "bicycle" not in block
+    assert "car.md" in block  # still listed so the agent can read it
+    ctx = builder.build(history, None, memory=block)
+    assert ctx.system_prompt.startswith("SYS") and "Miso" in ctx.system_prompt
+
+
+class _FakeEmbedder:
+    name = "fake"
+
+    def __init__(self):
+        self.calls = 0
+
+    async def embed(self, texts):
+        self.calls += 1
+        return [[1.0, 0.0] if "feline" in t or "cat" in t else [0.0, 1.0] for t in texts]
+
+
+def test_embeddings_blend_with_bm25(tmp_path: Path):
+    _write(tmp_path, "pets.md", "The user has a cat named Miso.")
+    _write(tmp_path, "car.md", "The user drives a bicycle.")
+    embedder = _FakeEmbedder()
+    index = MemoryIndex(tmp_path, embedder=embedder)
+
+    # No lexical overlap with "feline"; the embedding still finds the cat.
+    hits = asyncio.run(index.search_async("feline friend"))
+    assert hits[0].path == "pets.md"
+    calls = embedder.calls
+    asyncio.run(index.search_async("feline friend"))
+    assert embedder.calls == calls + 1  # chunk vectors were cached; only the query
+
+
+def test_listing_uses_manifest_with_prefix_and_paging(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(memory, "MEMORY_DIR", tmp_path)
+    for name in ("a.md", "projects/x.md", "projects/y.md", "projects/z.md"):
+        memory.write_memory(name, f"notes for {name}\n" + "detail " * 100)
+
+    # Listing never opens unchanged files; it only stats them.
+    def _no_read(self):
+        raise AssertionError(f"read {self}")
+
+    monkeypatch.setattr(Path, "read_bytes", _no_read)
+    page = memory.list_memories(prefix="projects/", limit=2)
+    assert [m["path"] for m in page["memories"]] == ["projects/x.md", "projects/y.md"]
+    assert page["total"] == 3 and page["next_offset"] == 2
+    first = page["memories"][0]
+    assert first["content_preview"].startswith("notes for projects/x.md")
+    assert len(first["content_preview"]) == 200
+    assert len(first["sha256"]) == 64 and first["size_bytes"] > 200
+
+    page = memory.list_memories(prefix="projects/", offset=2, limit=2)
+    assert [m["path"] for m in page["memories"]] == ["projects/z.md"]
+    assert page["next_offset"] is None
+    assert memory.list_memories()["total"] == 4
+
+
+def test_route_lists_everything_without_a_limit(tmp_path: Path, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    from rovot.server.app import create_app
+
+    monkeypatch.setenv("ROVOT_DATA_DIR", str(tmp_path / "data"))
+    monkeypatch.setenv("ROVOT_WORKSPACE_DIR", str(tmp_path / "ws"))
+    monkeypatch.setattr(memory, "MEMORY_DIR", tmp_path / "memory")
+    for i in range(120):
+        memory.write_memory(f"note-{i:03d}.md", "x")
+
+    app = create_app()
+    headers = {"Authorization": f"Bearer {app.state.rovot_state.auth_token}"}
+    with TestClient(app) as client:
+        listing = client.get("/memory", headers=headers).json()
+        page = client.get("/memory?limit=50", headers=headers).json()
+    assert len(listing["memories"]) == 120 and listing["next_offset"] is None
+    assert len(page["memories"]) == 50 and page["next_offset"] == 50
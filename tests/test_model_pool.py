@@ -0,0 +1,161 @@
+"""Tests for keeping several built-in models resident under a RAM budget."""
+from __future__ import annotations
+
+import asyncio
+import time
+from pathlib import Path
+
+import pytest
+
+from rovot import internal_model
+from rovot.internal_model import InternalModelProvider, requested_model
+
+
+class _FakeLlama:
+    def __init__(self, name: str, embedding: bool = False):
+        self.name = name
+        self.embedding = embedding
+        self.metadata: dict[str, str] = {}
+
+    def set_cache(self, cache) -> None:
+        self.cache = cache
+
+    def create_chat_completion(self, **kwargs):
+        assert not self.embedding, "generation on an embedding-mode context"
+        yield {"choices": [{"delta": {"content": self.name}}]}
+
+    def embed(self, texts):
+        if not self.embedding:
+            raise RuntimeError("Llama model must be created with embedding=True")
+        return [[float(len(t))] for t in texts]
+
+
+@pytest.fixture
+def pool(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> InternalModelProvider:
+    monkeypatch.setattr(internal_model, "MODELS_DIR", tmp_path)
+    for name, size in (("small.gguf", 100), ("medium.gguf", 200), ("large.gguf", 300)):
+        (tmp_path / name).write_bytes(b"\0" * size)
+    provider = InternalModelProvider(ram_budget_bytes=400)
+    monkeypatch.setattr(
+        provider,
+        "_create_llama",
+        lambda path, n_ctx, n_gpu_layers, verbose, embedding: _FakeLlama(path.name, embedding),
+    )
+    # Keep the KV estimate out of the arithmetic so sizes equal file sizes.
+    monkeypatch.setattr(internal_model, "_estimate_kv_bytes", lambda *a, **k: 0)
+    return provider
+
+
+def test_models_stay_resident_within_budget(pool: InternalModelProvider):
+    assert pool.load_model("small.gguf") == []
+    assert pool.load_model("medium.gguf") == []
+    assert [m["filename"] for m in pool.resident_models()] == ["small.gguf", "medium.gguf"]
+    assert pool.loaded_model_name() == "medium.gguf"
+
+    # Switching back is free: no reload, just a new active model.
+    llm = pool._models["small.gguf"].llm
+    assert pool.load_model("small.gguf") == []
+    assert pool._llm is llm
+
+
+def test_least_recently_used_model_is_evicted(pool: InternalModelProvider):
+    pool.load_model("small.gguf")
+    pool.load_model("medium.gguf")
+    pool.load_model("small.gguf")  # medium is now least recently used
+
+    assert pool.load_model("large.gguf") == ["medium.gguf"]
+    assert [m["filename"] for m in pool.resident_models()] == ["small.gguf", "large.gguf"]
+    assert pool.resident_bytes() <= pool.ram_budget_bytes
+
+
+def test_request_can_name_a_model(pool: InternalModelProvider):
+    from rovot.providers.internal import InternalProvider
+
+    events: list[tuple[str, dict]] = []
+
+    async def _listener(event: str, payload: dict) -> None:
+        events.append((event, payload))
+
+    pool.add_listener(_listener)
+    pool.ram_budget_bytes = 500
+    pool.load_model("small.gguf")
+    pool.load_model("medium.gguf")
+
+    async def _run():
+        requested_model.set("large.gguf")
+        return await InternalProvider().chat([{"role": "user", "content": "hi"}])
+
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr("rovot.providers.internal.get_internal_provider", lambda: pool)
+        resp = asyncio.run(_run())
+
+    assert resp.content == "large.gguf"
+    # A named request does not change the default model.
+    assert pool.loaded_model_name() == "medium.gguf"
+    assert ("model_evicted", {"filename": "small.gguf"}) in events
+    assert ("model_evicted", {"filename": "medium.gguf"}) not in events
+    assert ("model_load_complete", {"filename": "large.gguf"}) in events
+
+
+def test_kv_estimate_uses_gguf_metadata():
+    meta = {
+        "general.architecture": "llama",
+        "llama.block_count": "32",
+        "llama.embedding_length": "4096",
+        "llama.attention.head_count": "32",
+        "llama.attention.head_count_kv": "8",
+    }
+    # K and V, f16, 32 layers, 1024-wide KV rows.
+    assert internal_model._estimate_kv_bytes(4096, 0, meta) == 2 * 2 * 32 * 4096 * 1024
+
+
+def test_embedding_model_is_separate_from_chat_models(pool: InternalModelProvider):
+    pool.load_model("small.gguf")
+    assert asyncio.run(pool.embed(["ab"])) is None  # no embedding model loaded
+
+    pool.load_embedding_model("medium.gguf")
+    chat = pool._models["small.gguf"].llm
+    assert not chat.embedding
+    assert asyncio.run(pool.embed(["ab", "c"])) == [[2.0], [1.0]]
+
+    # With embeddings enabled the chat model still generates.
+    assert asyncio.run(pool.chat_complete([{"role": "user", "content": "hi"}])) == "small.gguf"
+    assert pool.loaded_model_name() == "small.gguf"
+
+    # The embedding model counts against the budget and pushes chat models out.
+    assert pool.resident_bytes() == 300
+    assert pool.load_model("large.gguf") == ["small.gguf"]
+    assert pool.embedding_model_name() == "medium.gguf"
+    assert [m["embedding"] for m in pool.resident_models()] == [False, True]
+
+def test_route_and_request_loads_do_not_overlap(
+    pool: InternalModelProvider, monkeypatch: pytest.MonkeyPatch
+):
+    active = 0
+    overlap = False
+    contexts: dict[str, int] = {}
+
+    def _slow_llama(path, n_ctx, n_gpu_layers, verbose, embedding):
+        nonlocal active, overlap
+        active += 1
+        overlap = overlap or active > 1
+        time.sleep(0.05)
+        active -= 1
+        contexts[path.name] = n_ctx
+        return _FakeLlama(path.name, embedding)
+
+    monkeypatch.setattr(pool, "_create_llama", _slow_llama)
+
+    async def _go():
+        loop = asyncio.get_running_loop()
+        # As the load route does: a plain executor call, next to a named request.
+        route = loop.run_in_executor(None, lambda: pool.load_model("small.gguf", n_ctx=2048))
+        await asyncio.sleep(0.01)
+        await asyncio.gather(route, pool.ensure_model("medium.gguf"))
+
+    asyncio.run(_go())
+    assert not overlap
+
+    # Per-request loads reuse the context size of the last explicit load.
+    asyncio.run(pool.ensure_model("large.gguf"))
+    assert contexts["large.gguf"] == 2048
@@ -5,3 +5,49 @@ def test_tool_args_parsing_string_json():
     args_raw = json.dumps({"a": 1})
     parsed = json.loads(args_raw)
     assert parsed["a"] == 1
+
+
+def _args_chunk(fragment: str) -> dict:
+    return {
+        "choices": [{"delta": {"tool_calls": [{"index": 0, "function": {"arguments": fragment}}]}}]
+    }
+
+
+def test_streamed_tool_call_fragments_are_assembled():
+    from rovot.providers.base import ToolCallAssembler
+    from rovot.providers.openai_compat import _chunk_events
+
+    chunks = [
+        {"choices": [{"delta": {"content": "Let me check."}}]},
+        {
+            "choices": [
+                {
+                    "delta": {
+                        "tool_calls": [
+                            {
+                                "index": 0,
+                                "id": "call_1",
+                                "function": {"name": "fs.read", "arguments": ""},
+                            }
+                        ]
+                    }
+                }
+            ]
+        },
+        _args_chunk('{"pa'),
+        _args_chunk('th": "a"}'),
+        {"choices": [{"delta": {}, "finish_reason": "tool_calls"}]},
+        {"choices": [], "usage": {"prompt_tokens": 10, "completion_tokens": 5}},
+    ]
+    events = [e for c in chunks for e in _chunk_events(c)]
+    assert [e.type for e in events] == [
+        "text", "tool_call", "tool_call", "tool_call", "finish", "usage"
+    ]
+
+    assembler = ToolCallAssembler()
+    for e in events:
+        if e.type == "tool_call":
+            assembler.add(e)
+    assert assembler.tool_calls() == [
+        {"id": "call_1", "name": "fs.read", "arguments": {"path": "a"}}
+    ]
@@ -0,0 +1,88 @@
+"""Tests for rate-limited progress reporting."""
+from __future__ import annotations
+
+import asyncio
+
+from rovot.progress import ProgressReporter
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _reporter(total: int, **kwargs):
+    events: list[dict] = []
+    clock = _Clock()
+
+    async def emit(event, payload):
+        events.append(payload)
+
+    reporter = ProgressReporter(
+        emit, "model_download_progress", {"filename": "m.gguf"}, total, clock=clock, **kwargs
+    )
+    return reporter, events, clock
+
+
+def test_chunks_are_coalesced_to_cadence():
+    total = 26 << 30
+    reporter, events, clock = _reporter(total, interval=0.5, min_step=0.01)
+
+    async def _go():
+        chunk = 64 << 10
+        # 1 GB/s for 1.2 s in 64 KB chunks: ~19k chunks.
+        for _ in range(int(1.2 * (1 << 30)) // chunk):
+            clock.now += chunk / (1 << 30)
+            await reporter.advance(chunk)
+
+    asyncio.run(_go())
+    assert 2 <= len(events) <= 4
+    last = events[-1]
+    assert last["filename"] == "m.gguf"
+    assert abs(last["bytes_per_sec"] - (1 << 30)) < (1 << 30) * 0.01
+    expected_eta = (total - last["done"]) / (1 << 30)
+    assert abs(last["eta_seconds"] - expected_eta) < 0.5
+
+
+def test_percent_step_and_finish():
+    reporter, events, clock = _reporter(
+        1000, interval=60, min_step=0.1, done_key="bytes_downloaded", total_key="total_bytes"
+    )
+
+    async def _go():
+        for _ in range(100):
+            clock.now += 0.01
+            await reporter.advance(9)
+        await reporter.finish()
+
+    asyncio.run(_go())
+    # One event per 10% step over the first 900 bytes, then the final 100% event.
+    assert len(events) == 9
+    assert events[-1]["progress"] == 1.0
+    assert events[-1]["bytes_downloaded"] == 1000 and events[-1]["total_bytes"] == 1000
+    assert events[-1]["eta_seconds"] == 0.0
+
+
+def test_resumed_work_does_not_count_towards_throughput():
+    events: list[dict] = []
+    clock = _Clock()
+
+    async def emit(event, payload):
+        events.append(payload)
+
+    reporter = ProgressReporter(
+        emit, "model_download_progress", {"filename": "m.gguf"}, 1000,
+        clock=clock, interval=0.5, start=900,
+    )
+
+    async def _go():
+        clock.now += 0.5
+        await reporter.advance(10)
+
+    asyncio.run(_go())
+    assert events[0]["progress"] == 0.91
+    assert events[0]["bytes_per_sec"] == 20
+    assert events[0]["eta_seconds"] == 4.5
@@ -0,0 +1,161 @@
+"""Tests for the warm sandbox container pool, using a local fake runtime."""
+from __future__ import annotations
+
+import asyncio
+from pathlib import Path
+
+from rovot.agent.tools.exec_runner import ExecLimits
+from rovot.agent.tools.sandbox_pool import SandboxPool
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class _FakeRuntime:
+    """"Containers" are names; commands run on the host and report which one they used."""
+
+    def __init__(self, start_delay: float = 0.0):
+        self.start_delay = start_delay
+        self.running: set[str] = set()
+        self.removed: list[str] = []
+
+    async def start(self, workspace: Path, name: str) -> None:
+        await asyncio.sleep(self.start_delay)
+        self.running.add(name)
+
+    def exec_args(self, name: str, command: str) -> list[str]:
+        assert name in self.running
+        return ["sh", "-c", f"echo {name}; {command}"]
+
+    async def remove(self, name: str) -> None:
+        self.running.discard(name)
+        self.removed.append(name)
+
+    async def remove_leftovers(self, workspace: Path) -> None:
+        for name in sorted(n for n in self.running if n.startswith("leftover")):
+            await self.remove(name)
+
+
+def _container(result: dict) -> str:
+    return result["stdout"].splitlines()[0]
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0.01)
+
+
+def test_commands_reuse_warm_containers(tmp_path: Path):
+    runtime = _FakeRuntime()
+    pool = SandboxPool(runtime, tmp_path, size=1)
+
+    async def _go():
+        pool.warm()
+        await _settle()
+        assert pool.stats()["idle"] == 1
+        results = []
+        for i in range(3):
+            results.append(await pool.run(f"echo {i}", ExecLimits()))
+            await _settle()
+        stats = pool.stats()
+        await pool.close()
+        return results, stats
+
+    results, stats = asyncio.run(_go())
+    assert [r["stdout"].splitlines()[1] for r in results] == ["0", "1", "2"]
+    assert len({_container(r) for r in results}) == 1
+    assert stats["started"] == 1 and stats["idle"] == 1
+    assert runtime.running == set()  # close() removed it
+
+
+def test_container_is_recycled_after_max_uses(tmp_path: Path):
+    runtime = _FakeRuntime()
+    pool = SandboxPool(runtime, tmp_path, size=1, max_uses=2)
+
+    async def _go():
+        names = []
+        for _ in range(4):
+            names.append(_container(await pool.run("true", ExecLimits())))
+            await _settle()
+        await pool.close()
+        return names
+
+    names = asyncio.run(_go())
+    assert names[0] == names[1] != names[2] == names[3]
+    assert names[0] in runtime.removed
+
+
+def test_timed_out_command_discards_its_container(tmp_path: Path):
+    runtime = _FakeRuntime()
+    pool = SandboxPool(runtime, tmp_path, size=1)
+
+    async def _go():
+        slow = await pool.run("sleep 10", ExecLimits(timeout=0.3))
+        await _settle()
+        after = await pool.run("true", ExecLimits())
+        await pool.close()
+        return slow, after
+
+    slow, after = asyncio.run(_go())
+    assert slow["timed_out"] == "wall"
+    assert _container(slow) in runtime.removed
+    assert _container(after) != _container(slow)
+
+
+def test_idle_containers_expire(tmp_path: Path):
+    runtime = _FakeRuntime()
+    clock = _Clock()
+    pool = SandboxPool(runtime, tmp_path, size=2, idle_timeout=60, clock=clock)
+
+    async def _go():
+        pool.warm()
+        await _settle()
+        warm = set(runtime.running)
+        clock.now += 61
+        pool.warm()  # prunes before topping up
+        await _settle()
+        await pool.close()
+        return warm
+
+    warm = asyncio.run(_go())
+    assert len(warm) == 2
+    assert warm <= set(runtime.removed[:2])
+    assert runtime.removed[2:]  # the replacements, removed by close()
+
+
+def test_start_failure_is_reported_not_raised(tmp_path: Path):
+    runtime = _FakeRuntime(start_delay=5)
+    pool = SandboxPool(runtime, tmp_path, size=0, start_timeout=0.1)
+
+    async def _go():
+        result = await pool.run("true", ExecLimits())
+        await pool.close()
+        return result
+
+    result = asyncio.run(_go())
+    assert result["exit_code"] is None
+    assert "Sandbox unavailable" in result["stderr"]
+    assert len(runtime.removed) == 1
+
+
+def test_leftover_containers_are_removed_before_the_first_start(tmp_path: Path):
+    runtime = _FakeRuntime()
+    runtime.running = {"leftover-1", "leftover-2"}  # from a daemon that crashed
+    pool = SandboxPool(runtime, tmp_path, size=2)
+
+    async def _go():
+        pool.warm()
+        await _settle()
+        started = set(runtime.running)
+        await pool.run("true", ExecLimits())
+        await pool.close()
+        return started
+
+    started = asyncio.run(_go())
+    assert runtime.removed[:2] == ["leftover-1", "leftover-2"]
+    assert len(started) == 2 and not any(n.startswith("leftover") for n in started)
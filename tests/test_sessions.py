@@ -0,0 +1,152 @@
+"""Tests for the indexed, cached session store."""
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+from rovot.agent.context import ContextBuilder, Message
+from rovot.agent.sessions import SessionCache, SessionStore
+
+
+def _fill(store: SessionStore, n: int):
+    session = store.create()
+    for i in range(n):
+        session.append(Message(role="user", content=f"msg{i}"))
+    return session
+
+
+def test_tail_count_range_from_index(tmp_path: Path):
+    # max_sessions=0 disables caching so every read goes through the index.
+    store = SessionStore(root=tmp_path, cache=SessionCache(max_sessions=0))
+    session = _fill(store, 10)
+
+    assert session.index_path.exists()
+    assert session.count() == 10
+    assert [m.content for m in session.tail(3)] == ["msg7", "msg8", "msg9"]
+    assert [m.content for m in session.range(2, 5)] == ["msg2", "msg3", "msg4"]
+    assert [m.content for m in session.tail(50)] == [f"msg{i}" for i in range(10)]
+    assert session.tail(0) == []
+    assert session.content_chars() == sum(len(f"msg{i}") for i in range(10))
+
+
+def test_legacy_transcript_gets_index(tmp_path: Path):
+    path = tmp_path / "legacy.jsonl"
+    lines = [json.dumps({"role": "user", "content": f"old{i}"}) for i in range(4)]
+    path.write_text("\n".join(lines) + "\n", "utf-8")
+
+    store = SessionStore(root=tmp_path, cache=SessionCache(max_sessions=0))
+    session = store.get("legacy")
+    assert session.count() == 4
+    assert session.tail(1)[0].content == "old3"
+
+    session.append(Message(role="assistant", content="new"))
+    assert session.count() == 5
+    assert [m.content for m in session.tail(2)] == ["old3", "new"]
+
+
+def test_stale_index_is_rebuilt(tmp_path: Path):
+    store = SessionStore(root=tmp_path, cache=SessionCache(max_sessions=0))
+    session = _fill(store, 3)
+    # Simulate a crash between writing the transcript and the index.
+    with session.path.open("a", encoding="utf-8") as f:
+        f.write(json.dumps({"role": "user", "content": "unindexed"}) + "\n")
+
+    assert session.count() == 4
+    assert session.tail(1)[0].content == "unindexed"
+
+
+def test_append_updates_cached_history(tmp_path: Path):
+    cache = SessionCache()
+    store = SessionStore(root=tmp_path, cache=cache)
+    session = _fill(store, 2)
+
+    assert len(session.read_all()) == 2
+    hits = cache.hits
+    session.append(Message(role="assistant", content="cached"))
+    history = session.read_all()
+    assert [m.content for m in history] == ["msg0", "msg1", "cached"]
+    assert cache.hits == hits + 1
+
+    # A second store instance shares the same process-wide cache entry.
+    other = SessionStore(root=tmp_path, cache=cache).get(session.id)
+    assert other.count() == 3
+
+
+def test_external_write_invalidates_cache(tmp_path: Path):
+    cache = SessionCache()
+    store = SessionStore(root=tmp_path, cache=cache)
+    session = _fill(store, 2)
+    session.read_all()
+
+    with session.path.open("a", encoding="utf-8") as f:
+        f.write(json.dumps({"role": "user", "content": "external"}) + "\n")
+
+    assert session.read_all()[-1].content == "external"
+
+
+def test_lru_evicts_oldest_session(tmp_path: Path):
+    cache = SessionCache(max_sessions=1)
+    store = SessionStore(root=tmp_path, cache=cache)
+    first = _fill(store, 1)
+    second = _fill(store, 1)
+
+    misses = cache.misses
+    first.read_all()
+    assert cache.misses == misses + 1
+    second.read_all()
+    assert cache.misses == misses + 2
+
+
+def test_context_builder_marks_omitted_history():
+    builder = ContextBuilder(max_context_messages=10)
+    history = [Message(role="user", content="recent")]
+    ctx = builder.build(history, None, omitted=5)
+    assert len(ctx.messages) == 1
+    assert "[Earlier conversation omitted]" in ctx.system_prompt
+
+
+# ── Blob-backed images ────────────────────────────────────────────────────────
+
+def test_images_stored_as_blob_references(tmp_path: Path):
+    import base64
+
+    from rovot.agent.blobs import BlobStore
+    from rovot.agent.context import ImageContent
+
+    blobs = BlobStore(tmp_path / "blobs")
+    store = SessionStore(
+        root=tmp_path / "sessions", cache=SessionCache(max_sessions=0), blobs=blobs
+    )
+    session = store.create()
+    b64 = base64.b64encode(b"\x89PNG fake screenshot").decode()
+    for _ in range(2):
+        session.append(
+            Message(role="user", content="look", images=[ImageContent(base64_data=b64)])
+        )
+
+    raw = session.path.read_text("utf-8")
+    assert b64 not in raw
+    # Identical screenshots are stored once.
+    assert len([p for p in (tmp_path / "blobs").rglob("*") if p.is_file()]) == 1
+
+    history = session.read_all()
+    assert history[0].images[0].base64_data == ""
+    digest = history[0].images[0].sha256
+    assert digest and blobs.exists(digest)
+
+    builder = ContextBuilder(max_context_messages=1, blobs=blobs)
+    ctx = builder.build(history, None)
+    assert ctx.messages[0].images[0].base64_data == b64
+    # Hydration returns copies; the loaded history keeps only references.
+    assert history[1].images[0].base64_data == ""
+    provider_msgs = ContextBuilder.to_provider_messages(ctx)
+    assert provider_msgs[1]["content"][1]["image_url"]["url"].endswith(b64)
+
+
+def test_blob_store_rejects_bad_digest(tmp_path: Path):
+    import pytest
+
+    from rovot.agent.blobs import BlobStore
+
+    with pytest.raises(ValueError):
+        BlobStore(tmp_path).get("../../etc/passwd")
@@ -7,7 +7,7 @@ import pytest
 from rovot.providers.internal import InternalProvider
 
 
-async def _fake_chat_stream(messages, temperature=0.7, max_tokens=1024):
+async def _fake_chat_stream(messages, temperature=0.7, max_tokens=1024, model=None):
     for token in ["Hello", " ", "world"]:
         yield token
 
@@ -74,3 +74,84 @@ def test_internal_provider_chat_collects_stream():
     # Cleanup
     internal._llm = None
     internal._loaded_model_path = None
+
+
+class _SlowLlama:
+    """Fake llama.cpp model whose stream blocks the calling thread per token."""
+
+    def __init__(self, tokens, delay=0.02):
+        self.tokens = tokens
+        self.delay = delay
+        self.produced = 0
+        self.closed = False
+        self.threads: set[str] = set()
+
+    def create_chat_completion(self, **kwargs):
+        import threading
+        import time
+
+        self.threads.add(threading.current_thread().name)
+
+        def _gen():
+            try:
+                for token in self.tokens:
+                    time.sleep(self.delay)
+                    self.produced += 1
+                    yield {"choices": [{"delta": {"content": token}}]}
+            finally:
+                self.closed = True
+
+        return _gen()
+
+
+def test_chat_stream_generates_off_the_event_loop():
+    from rovot.internal_model import InternalModelProvider
+
+    internal = InternalModelProvider()
+    llm = _SlowLlama(["a", "b", "c", "d"])
+    internal._llm = llm
+
+    async def _run():
+        ticks = 0
+        done = asyncio.Event()
+
+        async def _ticker():
+            nonlocal ticks
+            while not done.is_set():
+                ticks += 1
+                await asyncio.sleep(0.005)
+
+        ticker = asyncio.create_task(_ticker())
+        text = await internal.chat_complete([{"role": "user", "content": "hi"}])
+        done.set()
+        await ticker
+        return text, ticks
+
+    text, ticks = asyncio.run(_run())
+    assert text == "abcd"
+    # The loop kept running while tokens were generated (~80ms of blocking work).
+    assert ticks >= 5
+    assert llm.threads == {"rovot-inference"}
+
+
+def test_chat_stream_stops_generation_when_consumer_leaves():
+    import time
+    from contextlib import aclosing
+
+    from rovot.internal_model import InternalModelProvider
+
+    internal = InternalModelProvider()
+    llm = _SlowLlama([str(i) for i in range(50)], delay=0.01)
+    internal._llm = llm
+
+    async def _run():
+        async with aclosing(internal.chat_stream([{"role": "user", "content": "hi"}])) as s:
+            async for _ in s:
+                break
+
+    asyncio.run(_run())
+    deadline = time.monotonic() + 2
+    while not llm.closed and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert llm.closed
+    assert llm.produced < 50
@@ -0,0 +1,113 @@
+"""Tests for token-based context budgeting."""
+from __future__ import annotations
+
+from rovot.agent.context import ContextBuilder, ImageContent, Message
+from rovot.agent.tokens import (
+    IMAGE_TOKENS,
+    MESSAGE_OVERHEAD,
+    CharTokenizer,
+    TokenBudgeter,
+    register_tokenizer,
+    tokenizer_for_model,
+)
+
+
+class _WordTokenizer:
+    name = "words"
+
+    def __init__(self):
+        self.calls = 0
+
+    def count(self, text: str) -> int:
+        self.calls += 1
+        return len(text.split())
+
+
+def _msgs(n: int, words: int = 10) -> list[Message]:
+    return [
+        Message(role="user", content=" ".join([f"m{i}"] + ["w"] * (words - 1))) for i in range(n)
+    ]
+
+
+def test_fit_packs_newest_messages_into_budget():
+    budgeter = TokenBudgeter(_WordTokenizer(), max_tokens=50)
+    msgs = _msgs(10)
+    # system (2) + overhead (4) leaves 44: three 14-token messages fit.
+    fitted = budgeter.fit("be brief", None, msgs)
+    assert fitted == msgs[-3:]
+    assert budgeter.count("be brief", None, fitted) <= 50
+
+
+def test_tool_schemas_and_images_count_against_budget():
+    budgeter = TokenBudgeter(CharTokenizer(), max_tokens=10_000)
+    tools = [{"type": "function", "function": {"name": "x", "parameters": {"a": "b" * 4000}}}]
+    assert budgeter.tools_tokens(tools) > 1000
+    with_image = Message(role="user", content="look", images=[ImageContent(sha256="0" * 64)])
+    assert budgeter.message_tokens(with_image) == MESSAGE_OVERHEAD + 1 + IMAGE_TOKENS
+    calls = Message(role="assistant", content="", tool_calls=[{"name": "x", "arguments": {}}])
+    assert budgeter.message_tokens(calls) > MESSAGE_OVERHEAD
+
+
+def test_counts_are_memoized_per_message():
+    tokenizer = _WordTokenizer()
+    budgeter = TokenBudgeter(tokenizer, max_tokens=10_000)
+    history = _msgs(20)
+    budgeter.fit("sys", None, history)
+    assert budgeter.tokenized == 20
+
+    history.append(Message(role="assistant", content="new reply"))
+    calls = tokenizer.calls
+    budgeter.fit("sys", None, history)
+    assert budgeter.tokenized == 21
+    assert tokenizer.calls == calls + 1
+
+
+def test_fit_keeps_latest_message_and_skips_orphan_tool_results():
+    budgeter = TokenBudgeter(_WordTokenizer(), max_tokens=30)
+    msgs = [
+        Message(role="assistant", content="", tool_calls=[{"id": "c", "name": "t"}]),
+        Message(role="tool", content="result", tool_call_id="c"),
+        Message(role="user", content=" ".join(["w"] * 15)),
+    ]
+    assert budgeter.fit("s", None, msgs) == msgs[-1:]
+    huge = [Message(role="user", content=" ".join(["w"] * 500))]
+    assert budgeter.fit("s", None, huge) == huge
+
+
+def test_context_builder_marks_budget_trim():
+    builder = ContextBuilder(
+        system_prompt="sys", budgeter=TokenBudgeter(_WordTokenizer(), max_tokens=40)
+    )
+    ctx = builder.build(_msgs(5), None)
+    assert len(ctx.messages) == 2
+    assert ctx.system_prompt.startswith("[Earlier conversation omitted]")
+
+
+def test_pluggable_tokenizer_for_openai_models():
+    assert isinstance(tokenizer_for_model("qwen2.5-7b"), CharTokenizer)
+    register_tokenizer("mytok-", lambda model: _WordTokenizer())
+    assert isinstance(tokenizer_for_model("mytok-large"), _WordTokenizer)
+
+
+def test_chat_budget_follows_the_model(monkeypatch):
+    from rovot.config import AppConfig, ModelProviderMode
+    from rovot.internal_model import InternalModelProvider
+    from rovot.server.routes import chat
+
+    provider = InternalModelProvider()
+    monkeypatch.setattr(chat, "get_internal_provider", lambda: provider)
+    monkeypatch.setattr(provider, "loaded_n_ctx", lambda name=None: 2048)
+
+    cfg = AppConfig()
+    cfg.model.provider_mode = ModelProviderMode.INTERNAL
+    assert chat._budgeter(cfg).max_tokens == 2048 - 1024
+    cfg.response_reserve_tokens = 4096  # larger than the window
+    assert chat._budgeter(cfg).max_tokens == 1024
+    cfg.max_context_tokens = 500
+    assert chat._budgeter(cfg).max_tokens == 500
+
+    # Remote windows are unknown: only an explicit setting budgets them.
+    cfg.model.provider_mode = ModelProviderMode.CLOUD
+    assert chat._budgeter(cfg).max_tokens == 500
+    cfg.max_context_tokens = 0
+    assert chat._budgeter(cfg) is None
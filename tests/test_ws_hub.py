@@ -0,0 +1,93 @@
+"""Tests for per-client WebSocket send queues."""
+from __future__ import annotations
+
+import asyncio
+import json
+
+from rovot.server.ws import WebSocketHub
+
+
+class _FakeWs:
+    def __init__(self, stalled: bool = False):
+        self.sent: list[dict] = []
+        self.closed_with: int | None = None
+        self.gate = asyncio.Event()
+        if not stalled:
+            self.gate.set()
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text: str):
+        await self.gate.wait()
+        self.sent.append(json.loads(text))
+
+    async def close(self, code: int = 1000):
+        self.closed_with = code
+
+
+async def _settle():
+    await asyncio.sleep(0.01)
+
+
+def test_stalled_client_does_not_delay_others():
+    async def _go():
+        hub = WebSocketHub(max_queue=4)
+        fast, stalled = _FakeWs(), _FakeWs(stalled=True)
+        await hub.connect(fast, scopes=[])
+        await hub.connect(stalled, scopes=[])
+        for i in range(3):
+            # Returns immediately even though one client never reads.
+            await asyncio.wait_for(hub.broadcast("chat.reply", {"n": i}), 0.1)
+        await _settle()
+        return hub, fast, stalled
+
+    hub, fast, stalled = asyncio.run(_go())
+    assert [m["payload"]["n"] for m in fast.sent] == [0, 1, 2]
+    assert stalled.sent == []
+    depths = [c["queue_depth"] for c in hub.metrics()["clients"]]
+    assert sorted(depths) == [0, 2]  # one message is in flight on the stalled socket
+
+
+def test_overflow_disconnects_slow_client():
+    async def _go():
+        hub = WebSocketHub(max_queue=2)
+        stalled = _FakeWs(stalled=True)
+        await hub.connect(stalled, scopes=[])
+        for i in range(5):
+            await hub.broadcast("chat.reply", {"n": i})
+            await _settle()
+        return hub, stalled
+
+    hub, stalled = asyncio.run(_go())
+    assert stalled.closed_with == 1013
+    assert hub.metrics()["clients"] == []
+    assert not hub._closers  # the close task was tracked and has finished
+    assert hub.metrics()["slow_disconnects"] == 1
+
+
+def test_progress_events_are_coalesced():
+    async def _go():
+        hub = WebSocketHub(max_queue=2)
+        ws = _FakeWs(stalled=True)
+        await hub.connect(ws, scopes=[])
+        await hub.broadcast("chat.reply", {"n": 0})  # taken by the writer, stuck in send
+        await _settle()
+        for p in (0.1, 0.2, 0.3):
+            await hub.broadcast("model_download_progress", {"filename": "a.gguf", "progress": p})
+        await hub.broadcast("model_download_progress", {"filename": "b.gguf", "progress": 0.5})
+        # Queue is full now; further progress is dropped rather than disconnecting.
+        await hub.broadcast("model_download_progress", {"filename": "c.gguf", "progress": 0.9})
+        stats = hub.metrics()["clients"][0]
+        ws.gate.set()
+        await _settle()
+        return stats, ws
+
+    stats, ws = asyncio.run(_go())
+    assert stats["coalesced"] == 2 and stats["dropped"] == 1
+    progress = [m["payload"] for m in ws.sent if m["event"] == "model_download_progress"]
+    assert progress == [
+        {"filename": "a.gguf", "progress": 0.3},
+        {"filename": "b.gguf", "progress": 0.5},
+    ]
+    assert ws.closed_with is None